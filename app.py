@@ -3,10 +3,13 @@ import asyncio
 from io import StringIO
 import contextlib
 import json
+import uuid
 import nest_asyncio
 
-from main import main as run_main
-from semantic_kernel.agents import ChatHistoryAgentThread
+from src.agent.agent_message import AgentMessage
+from src.agent.message_log import MessageLog
+from src.agent.warmup import WARMUP_ENABLED, get_warmup, start_warmup
+from src.services.document_reference import DEFAULT_UPLOAD_MODE, UPLOAD_MODES, describe_document, with_document
 
 # Apply nest_asyncio to allow nested event loops
 nest_asyncio.apply()
@@ -16,13 +19,34 @@ def get_message_content(message) -> str:
         return ""
     return str(message.content)
 
+# Messages drawn per chat page / trace page; older ones are a click away instead of redrawn every rerun
+CHAT_PAGE_SIZE = 30
+TRACE_PAGE_SIZE = 20
+TIMELINE_STEPS = 40
+TIMELINE_LABELS = {
+    "function": "⚙️ Function",
+    "result": "📤 Result",
+    "assistant": "🤖 Assistant",
+    "user": "🧑 User",
+    "system": "⚡ System",
+}
+
 # Page config
 st.set_page_config(page_title="Kainos Underwriting Assistant", layout="wide")
 st.title("Kainos Agentic Underwriting Assistant")
 
+# main (Semantic Kernel, boto3, the embedding model) is imported on first use; the warm-up loads it
+# in the background while the page is already interactive
+if WARMUP_ENABLED:
+    start_warmup()
+
 # Initialize session state variables
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+if "message_log" not in st.session_state:
+    st.session_state.message_log = MessageLog()
+if "chat_window" not in st.session_state:
+    st.session_state.chat_window = CHAT_PAGE_SIZE
 if "agent_thread" not in st.session_state:
     st.session_state.agent_thread = None
 if "metrics" not in st.session_state:
@@ -31,6 +55,8 @@ if "claim_text" not in st.session_state:
     st.session_state.claim_text = None
 if "output" not in st.session_state:
     st.session_state.output = ""
+if "upload_mode" not in st.session_state:
+    st.session_state.upload_mode = DEFAULT_UPLOAD_MODE
 
 # Sidebar
 st.sidebar.image("knos.png", width=200)
@@ -41,54 +67,94 @@ st.sidebar.text("I'm an agentic insurance underwriting assistant; able to suppor
 # --- Clear history ---
 st.sidebar.markdown("---")
 if st.sidebar.button("🧹 Clear Chat History"):
-    st.session_state.messages = []
+    st.session_state.message_log = MessageLog()
+    st.session_state.chat_window = CHAT_PAGE_SIZE
     st.session_state.agent_thread = None
     st.session_state.metrics = {"total_tokens": 0, "total_steps": 0}
     st.session_state.document_appended = None
     st.session_state.claim_text = None   
+    from src.agent.agent_factory import get_agent_factory
+    get_agent_factory().drop_session(st.session_state.session_id)
     uploaded_file = None     
     st.success("Chat history and uploaded memory cleared")
 
+if get_warmup().state == "running":
+    st.sidebar.caption("⏳ Loading models and connecting to AWS in the background…")
+
+# --- Upload mode ---
+st.sidebar.radio(
+    "Send uploaded documents as",
+    UPLOAD_MODES,
+    key="upload_mode",
+    format_func=lambda mode: "Reference (id + summary)" if mode == "reference" else "Full text inline",
+)
+
 # --- Display the contents of claim_text for debugging ---
 if st.session_state.get("claim_text"):
+    reference = describe_document(st.session_state.claim_text)
+    st.sidebar.caption(f"`{reference.document_id}` · {reference.chars:,} chars · ~{reference.approx_tokens:,} tokens")
     st.sidebar.markdown("#### Uploaded Claim Document Content:")
     st.sidebar.code(st.session_state.claim_text, language="text")
 
 # --- Chat Input ---
 user_input = st.chat_input("Type your message and press Enter...")
 
-# --- Append document to user input only the first time after upload ---
+# --- Attach document to user input only the first time after upload ---
+# Reference mode sends an id and a short summary; the agent pulls the rest through its tools
 if (
     user_input is not None and user_input.strip()
     and st.session_state.get("claim_text")
     and not st.session_state.get("document_appended", False)
 ):
-    user_input = (
-        f"{user_input}\n\n"
-        "-----\n"
-        "Uploaded Document Contents:\n"
-        "-----\n"
-        "```text\n"
-        f"{st.session_state.claim_text.rstrip()}\n\n"
-        "-----\n"# Ensures the last line gets its own newline
-        "```\n"
-    )
+    user_input = with_document(user_input, st.session_state.claim_text, st.session_state.upload_mode)
     st.session_state.document_appended = True
 
-async def handle_user_input(user_input):
+def render_message(message):
+    content = get_message_content(message)
+    if content:
+        with st.chat_message(message.role.lower()):
+            name = message.name or message.role
+            st.markdown(f"**{name}:** {content}")
+
+async def handle_user_input(user_input, steps_container, text_placeholder):
+    # Waits on the warm-up's import if it is still running
+    from main import main_stream as run_main_stream
+    # Text deltas repaint one placeholder; tool activity is listed above it as it happens
     buffer = StringIO()
+    text = ""
+    response = None
     with contextlib.redirect_stdout(buffer):
-        response = await run_main(
+        async for event in run_main_stream(
             user_input,
             st.session_state.agent_thread,
-            st.session_state.claim_text 
-        )
+            st.session_state.claim_text,
+            st.session_state.session_id
+        ):
+            if event.type == "text":
+                text += event.content
+                text_placeholder.markdown(text + "▌")
+            elif event.type == "function_call":
+                steps_container.caption(f"⚙️ Calling `{event.name}`")
+            elif event.type == "function_result":
+                steps_container.caption(f"📤 `{event.name}` returned")
+                # The next LLM request starts a fresh assistant message
+                text = ""
+                text_placeholder.empty()
+            elif event.type == "done":
+                response = event.data
+    text_placeholder.markdown(text)
     output = buffer.getvalue()
     if response:
-        st.session_state.messages.extend(response.messages)
+        st.session_state.message_log.extend(response.messages)
         st.session_state.agent_thread = response.thread
         st.session_state.metrics["total_tokens"] = response.metrics.get("total_tokens", 0)
         st.session_state.metrics["total_steps"] = response.metrics.get("steps", 0)
+        st.session_state.metrics["tool_calls"] = response.metrics.get("tool_calls", {})
+        st.session_state.metrics["trace"] = response.metrics.get("trace")
+        st.session_state.metrics["history"] = response.metrics.get("history", {})
+        st.session_state.metrics["answer_cache"] = response.metrics.get("answer_cache", {})
+        if response.metrics.get("answer_cache", {}).get("hit"):
+            steps_container.caption("♻️ Reused an earlier answer to a similar question (no model call)")
     return output
 
 def run_async(coroutine):
@@ -99,46 +165,51 @@ def run_async(coroutine):
         asyncio.set_event_loop(loop)
     return loop.run_until_complete(coroutine)
 
-if user_input is not None and user_input.strip():
-    # Use the run_async helper function
-    st.session_state.output = run_async(handle_user_input(user_input))
-
 # --- Tabs ---
 tab_main, tab_diag, tab_hiw = st.tabs(["💬 Main", "🛠 Diagnostics", "How it works"])
 
 with tab_main:
+    message_log = st.session_state.message_log
+    hidden = max(0, len(message_log) - st.session_state.chat_window)
+    if hidden:
+        if st.button(f"Show earlier messages ({hidden} hidden)"):
+            st.session_state.chat_window += CHAT_PAGE_SIZE
+            st.rerun()
+    for message in message_log.messages[hidden:]:
+        render_message(message)
     if user_input is not None and user_input.strip():
-        for message in st.session_state.messages:
-            content = get_message_content(message)
-            if content:
-                with st.chat_message(message.role.lower()):
-                    name = message.name or message.role
-                    st.markdown(f"**{name}:** {content}")
-    else:
+        render_message(AgentMessage(role="user", content=user_input))
+        with st.chat_message("assistant"):
+            steps_container = st.container()
+            text_placeholder = st.empty()
+            # Use the run_async helper function
+            st.session_state.output = run_async(handle_user_input(user_input, steps_container, text_placeholder))
+    elif not len(message_log):
         st.warning("Please enter a prompt.")
 
 with tab_diag:
     st.markdown("## Message Timeline")
-    if st.session_state.messages:
-        timeline_steps = []
-        for message in st.session_state.messages:
-            role = message.role.lower()
-            if hasattr(message, 'function_call') and message.function_call:
-                timeline_steps.append("⚙️ Function")
-            elif hasattr(message, 'function_response') and message.function_response:
-                timeline_steps.append("📤 Result")
-            elif role == "assistant":
-                timeline_steps.append("🤖 Assistant")
-            elif role == "user":
-                timeline_steps.append("🧑 User")
-            elif role == "system":
-                timeline_steps.append("⚡ System")
-            else:
-                timeline_steps.append("💬 " + role.title())
-        st.markdown(" ➔ ".join(timeline_steps))
+    message_log = st.session_state.message_log
+    if len(message_log):
+        kinds = message_log.kinds[-TIMELINE_STEPS:]
+        timeline_steps = [TIMELINE_LABELS.get(kind, "💬 " + kind.title()) for kind in kinds]
+        earlier = len(message_log.kinds) - len(kinds)
+        st.markdown((f"… {earlier} earlier ➔ " if earlier else "") + " ➔ ".join(timeline_steps))
 
     st.markdown("## Message Trace")
-    for i, message in enumerate(st.session_state.messages):
+    # One page of expanders per rerun; full bodies are only decompressed when asked for
+    page_count = message_log.page_count(TRACE_PAGE_SIZE)
+    page = 0
+    if page_count > 1:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=page_count, step=1) - 1
+        st.caption(f"{len(message_log)} steps, {TRACE_PAGE_SIZE} per page")
+    stored = message_log.stats()
+    if stored["payloads"] or stored["dropped_payloads"]:
+        st.caption(
+            f"{stored['payloads']} large bodies kept compressed ({stored['payload_bytes'] / 1024:.0f} KB), "
+            f"{stored['dropped_payloads']} dropped to stay under the session budget"
+        )
+    for i, message in message_log.page(page, TRACE_PAGE_SIZE):
         with st.expander(f"Step {i + 1}: {message.role.title()}", expanded=False):
             content = get_message_content(message)
             if content:
@@ -150,49 +221,151 @@ with tab_diag:
                 st.code(json.dumps(message.function_call["arguments"], indent=2), language="json")
             if message.function_response:
                 st.markdown("**🛠 Function Result:**")
-                st.code(str(message.function_response), language="markdown")
+                st.code(message.function_response, language="markdown")
+            for name in message.offloaded:
+                if st.checkbox(f"Show full {name.replace('_', ' ')}", key=f"full-{i}-{name}"):
+                    full_text = message_log.full_text(i, name)
+                    if full_text is None:
+                        st.info("No longer kept; only the preview above remains")
+                    else:
+                        st.code(full_text, language="markdown")
             if message.metadata:
                 st.markdown("**📊 Metadata:**")
                 st.json(message.metadata)
 
     st.markdown("## Metrics")
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     with col1:
         current_total = st.session_state.metrics.get("total_tokens", 0)
         st.metric("Total Tokens", current_total)
     with col2:
-        total_steps = len(st.session_state.messages)
+        total_steps = len(message_log)
         st.metric("Total Steps", total_steps)
+    with col3:
+        # Time the last turn's tool calls would have taken back to back, minus what they actually took
+        tool_calls = st.session_state.metrics.get("tool_calls") or {}
+        overlap_ms = tool_calls.get("busy_ms", 0) - tool_calls.get("wall_ms", 0)
+        st.metric("Tool Time Overlapped", f"{overlap_ms:.0f} ms")
+
+    with st.expander("✂️ History Reduction", expanded=False):
+        history = st.session_state.metrics.get("history") or {}
+        if history:
+            col_before, col_after, col_saved = st.columns(3)
+            col_before.metric("History Tokens Before", history.get("tokens_before", 0))
+            col_after.metric("History Tokens Sent", history.get("tokens_after", 0))
+            col_saved.metric("Tokens Saved (session)", history.get("total_tokens_saved", 0), delta=history.get("tokens_saved", 0))
+            if history.get("turns_dropped"):
+                st.caption(f"{history['turns_dropped']} older turn(s) condensed into the running summary this turn")
+        else:
+            st.info("No history reduction yet")
+
+    with st.expander("♻️ Answer Cache", expanded=False):
+        answer_cache = st.session_state.metrics.get("answer_cache") or {}
+        if answer_cache:
+            if answer_cache.get("hit"):
+                st.success(
+                    f"Last answer reused from “{answer_cache['cached_question']}” "
+                    f"(similarity {answer_cache['similarity']:.3f}, {answer_cache['age_seconds']:.0f}s old)"
+                )
+            else:
+                st.caption("Last answer came from the agent")
+            col_hits, col_rate, col_entries = st.columns(3)
+            col_hits.metric("Cache Hits (process)", answer_cache.get("hits", 0))
+            col_rate.metric("Hit Rate", f"{answer_cache.get('hit_rate', 0.0):.0%}")
+            col_entries.metric("Cached Answers", answer_cache.get("entries", 0))
+        else:
+            st.info("No answer cache lookups yet — questions are only cached once a document is uploaded")
+
+    with st.expander("⏱️ Latency Waterfall", expanded=False):
+        trace = st.session_state.metrics.get("trace")
+        if trace:
+            st.markdown(f"Last turn: `{trace['duration_ms']:.0f} ms` (trace `{trace['trace_id']}`)")
+            rows = [
+                {
+                    "span": f"{index:02d} {'  ' * row['depth']}{row['name']}",
+                    "kind": row["kind"],
+                    "start_ms": row["start_ms"],
+                    "end_ms": row["start_ms"] + row["duration_ms"],
+                    "duration_ms": row["duration_ms"],
+                }
+                for index, row in enumerate(trace["spans"])
+            ]
+            st.vega_lite_chart(
+                {
+                    "data": {"values": rows},
+                    "mark": "bar",
+                    "encoding": {
+                        "y": {"field": "span", "type": "nominal", "sort": None, "title": None},
+                        "x": {"field": "start_ms", "type": "quantitative", "title": "ms since turn start"},
+                        "x2": {"field": "end_ms"},
+                        "color": {"field": "kind", "type": "nominal"},
+                        "tooltip": [{"field": "span"}, {"field": "duration_ms"}],
+                    },
+                    "height": max(120, 22 * len(rows)),
+                },
+                use_container_width=True,
+            )
+            st.markdown("**Time by kind:**")
+            st.json(trace["totals"])
+        else:
+            st.info("No trace recorded yet")
 
     with st.expander("💰 Token Usage & Cost", expanded=False):
-        total_prompt_tokens = 0
-        total_completion_tokens = 0
-        for message in st.session_state.messages:
-            if message.metadata and "usage" in message.metadata:
-                usage = message.metadata["usage"]
-                total_prompt_tokens += usage.prompt_tokens
-                total_completion_tokens += usage.completion_tokens
+        # Running totals, updated as messages are added
+        totals = message_log.totals
+        total_prompt_tokens = totals["prompt_tokens"]
+        total_completion_tokens = totals["completion_tokens"]
+        total_cache_read_tokens = totals["cache_read_tokens"]
+        total_cache_write_tokens = totals["cache_write_tokens"]
         if total_prompt_tokens > 0 or total_completion_tokens > 0:
-            total_tokens = total_prompt_tokens + total_completion_tokens
+            total_tokens = total_prompt_tokens + total_cache_read_tokens + total_cache_write_tokens + total_completion_tokens
             PROMPT_COST_PER_1M = 0.1
             COMPLETION_COST_PER_1M = 0.4
+            # Bedrock bills cache reads at a tenth of the input rate and cache writes at 1.25x
+            CACHE_READ_COST_PER_1M = PROMPT_COST_PER_1M * 0.1
+            CACHE_WRITE_COST_PER_1M = PROMPT_COST_PER_1M * 1.25
             prompt_cost = (total_prompt_tokens * PROMPT_COST_PER_1M) / 1_000_000
+            cache_read_cost = (total_cache_read_tokens * CACHE_READ_COST_PER_1M) / 1_000_000
+            cache_write_cost = (total_cache_write_tokens * CACHE_WRITE_COST_PER_1M) / 1_000_000
             completion_cost = (total_completion_tokens * COMPLETION_COST_PER_1M) / 1_000_000
-            total_cost = prompt_cost + completion_cost
+            total_cost = prompt_cost + cache_read_cost + cache_write_cost + completion_cost
+            uncached_cost = (
+                (total_prompt_tokens + total_cache_read_tokens + total_cache_write_tokens) * PROMPT_COST_PER_1M
+                + total_completion_tokens * COMPLETION_COST_PER_1M
+            ) / 1_000_000
             st.markdown(f"""
             ### Current Request
-            - Prompt Tokens: `{total_prompt_tokens}`
+            - Prompt Tokens (fresh): `{total_prompt_tokens}`
+            - Prompt Tokens (cache read): `{total_cache_read_tokens}`
+            - Prompt Tokens (cache write): `{total_cache_write_tokens}`
             - Completion Tokens: `{total_completion_tokens}`
             - Total Tokens: `{total_tokens}`
             
             ### Cost Breakdown
             - Prompt Cost `${prompt_cost:.4f}`
+            - Cache Read Cost `${cache_read_cost:.4f}`
+            - Cache Write Cost `${cache_write_cost:.4f}`
             - Completion Cost `${completion_cost:.4f}`
-            - **Total Cost: `${total_cost:.4f}`**
+            - **Total Cost: `${total_cost:.4f}`** (without prompt caching: `${uncached_cost:.4f}`)
             """)
         else:
             st.info("No usage data available for current request")
 
+    with st.expander("🚀 Startup", expanded=False):
+        warmup = get_warmup().report()
+        if warmup["state"] == "pending":
+            st.info("Warm-up is off (WARMUP=0); everything loads on first use")
+        else:
+            st.markdown(f"Warm-up: `{warmup['state']}`" + (f" in `{warmup['total_seconds']:.2f} s`" if warmup["total_seconds"] else ""))
+            if warmup["stage_seconds"]:
+                st.markdown("**Stages (s):**")
+                st.json(warmup["stage_seconds"])
+            for stage, error in warmup["errors"].items():
+                st.warning(f"{stage}: {error}")
+        if warmup["import_seconds"]:
+            st.markdown("**Deferred imports (s):**")
+            st.json(warmup["import_seconds"])
+
     with st.expander("🖥️ Console Output", expanded=False):
         if st.session_state.output and st.session_state.output.strip():
             st.code(st.session_state.output, language="bash")
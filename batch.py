@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+import json
+
+from src.agent.agent_services import create_shared_services
+from src.agent.batch_pipeline import BATCH_WORKERS, DEFAULT_MODELS, MODELS, BatchPipeline
+
+# --- Bulk underwriting: structure extraction and the selected models for every submission, no chat
+# Run: python batch.py submissions/ --output results.jsonl --workers 8
+#      python batch.py submissions.jsonl --output results.jsonl --resume
+# The input is a directory of .txt/.md files or a JSONL file with "claim_text" (and optionally "id").
+# One JSON line per submission goes to --output as it finishes; --resume skips submissions that
+# already have an "ok" line, so a crashed run picks up where it stopped and retries the "partial"
+# (a model call failed) and "error" ones. The report goes to stdout.
+
+
+def parse_models(value: str):
+    return tuple(part.strip() for part in value.split(",") if part.strip())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="directory of submissions or a JSONL file")
+    parser.add_argument("--output", required=True, help="JSONL results file, also the checkpoint for --resume")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="submissions processed at once")
+    parser.add_argument(
+        "--models", type=parse_models, default=DEFAULT_MODELS,
+        help=f"comma-separated, any of {', '.join(MODELS)}"
+    )
+    parser.add_argument("--resume", action="store_true", help="append to --output, skipping completed submissions")
+    parser.add_argument("--limit", type=int, help="process at most this many submissions")
+    args = parser.parse_args()
+
+    pipeline = BatchPipeline(create_shared_services(), models=args.models, workers=args.workers)
+    report = asyncio.run(pipeline.run(args.input, args.output, resume=args.resume, limit=args.limit))
+    print(json.dumps(report, indent=2, default=str))
@@ -0,0 +1,401 @@
+import os
+import tempfile
+
+# Caches and trace export go to a scratch directory so every run starts cold; set before src is imported
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="iua-bench-")
+os.environ.setdefault("INDEX_CACHE_DIR", os.path.join(_SCRATCH_DIR, "index"))
+os.environ.setdefault("EXTRACTION_CACHE_PATH", os.path.join(_SCRATCH_DIR, "extractions.sqlite3"))
+os.environ.setdefault("TRACE_EXPORT_PATH", "")
+
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+import uuid
+from typing import List
+
+import numpy as np
+
+from benchmarks.fakes import (
+    FakeBedrockClient,
+    FakeDynamoDB,
+    FakeSageMakerRuntime,
+    HashingEmbeddings,
+    ScriptedBedrockRuntime,
+    make_dnb_records,
+)
+from main import main as run_turn
+from src.agent.agent_factory import AgentFactory, set_agent_factory
+from src.agent.agent_services import create_shared_services
+from src.agent.batch_pipeline import BatchPipeline
+from src.kernel_functions.failure_score_checker import DNB_KEY_ATTRIBUTE, DNB_TABLE_NAME
+from src.kernel_functions.insurance_premium_estimator import InsurancePremiumEstimator
+from src.kernel_functions.structure_claim_data import StructureClaimData
+from src.services.answer_cache import AnswerCache, set_answer_cache
+from src.services.document_reference import UPLOAD_MODES, with_document
+from src.services.extraction_cache import ExtractionCache
+
+# --- End-to-end agent turns against local stand-ins for Bedrock, SageMaker and DynamoDB
+# Run from the repo root: python -m benchmarks.agent_turns --sessions 1,4,16 --output bench.json
+# Every turn goes through main.main() and the real Semantic Kernel / Bedrock connector code; only the
+# network calls are replaced. Latencies are injected inside the fake clients (see benchmarks/fakes.py).
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "data", "claim_samples.jsonl")
+QUESTION = "What is the risk rating, failure score and likely premium for this company?"
+# Rewordings of QUESTION asked as the first turn of a new session, and whether the answer cache should
+# serve them; the reordered one scores below the threshold with the bag-of-words stand-in embeddings
+PARAPHRASES = [
+    ("what is the risk rating, failure score and likely premium for this company", True),
+    ("What's the risk rating, failure score and likely premium for this company?", True),
+    ("For this company, what is the risk rating, the failure score and the likely premium?", False),
+]
+DIFFERENT_QUESTIONS = [
+    "Summarise the export destinations for this company.",
+    "What coverage amount is being requested?",
+]
+# Questions that differ only in their figures score alike but must not share an answer
+NUMBER_VARIANTS = [
+    ("What would the likely annual premium be for this company if the requested coverage amount were raised to 10m?", False),
+    ("What would the likely annual premium be for this company if the requested coverage amount were raised to 20m?", False),
+    ("what would the likely annual premium be for this company if the requested coverage amount were raised to 10M", True),
+]
+FOLLOW_UP = "Can you explain that?"
+
+
+def load_claims() -> List[str]:
+    with open(SAMPLES_PATH, encoding="utf-8") as f:
+        return [json.loads(line)["claim_text"] for line in f if line.strip()]
+
+
+def pad_document(claim_text: str, kilobytes: int) -> str:
+    # Large submissions are mostly boilerplate around the few fields the agent needs
+    filler = "This section sets out the general terms, conditions and exclusions that apply to the policy. "
+    padding = filler * (kilobytes * 1024 // len(filler))
+    return f"{claim_text.rstrip()}\n\nGeneral Conditions\n{padding}\n" if padding else claim_text
+
+
+def percentiles(samples_ms: List[float]) -> dict:
+    if not samples_ms:
+        return {"count": 0}
+    values = np.asarray(samples_ms)
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.claims = [pad_document(claim, args.pad_document_kb) for claim in load_claims()]
+        self.dynamodb = FakeDynamoDB(latency_ms=args.dynamodb_ms)
+        records = make_dnb_records(args.dnb_rows, args.seed)
+        records += [
+            {"organisation_name": name, "failure_score": 42, "failure_score_commentary": "Benchmark company."}
+            for name in ("Acme Widgets Ltd.", "Initech", "Globex Corporation")
+        ]
+        self.dynamodb.put_records(DNB_TABLE_NAME, DNB_KEY_ATTRIBUTE, records)
+        self.bedrock = ScriptedBedrockRuntime(
+            first_token_ms=args.llm_first_token_ms,
+            per_token_ms=args.llm_token_ms,
+            answer_tokens=args.answer_tokens,
+        )
+        # Every other section repeats the same question, so the answer cache is off outside its own section
+        set_answer_cache(AnswerCache(enabled=False))
+
+    def create_services(self):
+        services = create_shared_services(
+            bedrock_runtime=self.bedrock,
+            bedrock=FakeBedrockClient(latency_ms=self.args.bedrock_control_ms),
+            sagemaker_client=FakeSageMakerRuntime(round_trip_ms=self.args.sagemaker_ms),
+            dynamodb=self.dynamodb,
+            embeddings=HashingEmbeddings(per_text_ms=self.args.embedding_ms),
+        )
+        services.chat_completion.prompt_cache = not self.args.no_prompt_cache
+        return services
+
+    def new_factory(self) -> AgentFactory:
+        factory = AgentFactory(max_sessions=max(64, self.args.memory_sessions * 2), create_services=self.create_services)
+        set_agent_factory(factory)
+        return factory
+
+    async def turn(self, session_id: str, claim_text: str, thread=None, first: bool = True):
+        # Same shape as the Streamlit app's first message after an upload
+        user_input = with_document(QUESTION, claim_text, self.args.upload_mode) if first else QUESTION
+        started = time.perf_counter()
+        response = await run_turn(user_input, thread, claim_text, session_id)
+        return (time.perf_counter() - started) * 1000, response
+
+    async def cold_warm(self) -> dict:
+        self.new_factory()
+        session_id = str(uuid.uuid4())
+        claim = self.claims[0]
+        cold_ms, response = await self.turn(session_id, claim)
+        warm_same_ms, _ = await self.turn(session_id, claim, response.thread, first=False)
+        warm_new_ms, _ = await self.turn(str(uuid.uuid4()), claim)
+        return {
+            "cold_first_turn_ms": round(cold_ms, 2),
+            "warm_same_session_ms": round(warm_same_ms, 2),
+            "warm_new_session_same_document_ms": round(warm_new_ms, 2),
+            "cold_trace_totals": response.metrics.get("trace", {}).get("totals"),
+        }
+
+    async def sequential(self) -> dict:
+        samples, tokens, cache_reads = [], [], []
+        for index in range(self.args.turns):
+            elapsed_ms, response = await self.turn(str(uuid.uuid4()), self.claims[index % len(self.claims)])
+            samples.append(elapsed_ms)
+            tokens.append(response.metrics["total_tokens"])
+            cache_reads.append(response.metrics["cache_read_tokens"])
+        return {
+            **percentiles(samples),
+            "mean_tokens_per_turn": round(float(np.mean(tokens)), 1),
+            "mean_cache_read_tokens_per_turn": round(float(np.mean(cache_reads)), 1),
+        }
+
+    async def concurrent(self, sessions: int) -> dict:
+        async def session(index: int) -> List[float]:
+            session_id, claim = str(uuid.uuid4()), self.claims[index % len(self.claims)]
+            elapsed, thread = [], None
+            for turn in range(self.args.turns_per_session):
+                elapsed_ms, response = await self.turn(session_id, claim, thread, first=turn == 0)
+                elapsed.append(elapsed_ms)
+                thread = response.thread
+            return elapsed
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(session(index) for index in range(sessions)))
+        wall_seconds = time.perf_counter() - started
+        samples = [elapsed for result in results for elapsed in result]
+        return {
+            "sessions": sessions,
+            "turns": len(samples),
+            "wall_seconds": round(wall_seconds, 3),
+            "turns_per_second": round(len(samples) / wall_seconds, 2),
+            "latency": percentiles(samples),
+        }
+
+    async def memory_per_session(self) -> dict:
+        factory = self.new_factory()
+        # Shared services and one-off caches are paid before measuring
+        await self.turn(str(uuid.uuid4()), self.claims[0])
+        gc.collect()
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        threads = []
+        for index in range(self.args.memory_sessions):
+            _, response = await self.turn(f"memory-{index}", self.claims[index % len(self.claims)])
+            threads.append(response.thread)
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            "sessions": self.args.memory_sessions,
+            "cached_sessions": factory.session_count(),
+            "bytes_per_session": int((current - baseline) / self.args.memory_sessions),
+            "peak_bytes": peak - baseline,
+        }
+
+    async def plugins(self) -> dict:
+        factory = self.new_factory()
+        services = factory.services
+        claim_data = {"organisation_name": "Acme Widgets Ltd.", "region_of_operation": "gb", "coverage_amount": "150000000"}
+        estimator = InsurancePremiumEstimator(runtime=services.sagemaker)
+        agent = factory.create_agent(self.claims[0])
+        rag = agent.kernel.get_plugin("VectorMemoryRAG")
+        structure = StructureClaimData(agent.kernel)
+
+        calls = {
+            "FailureScoreChecker.retrieve_failure_rating": lambda: services.failure_score_checker.retrieve_failure_rating(claim_data),
+            "RiskModel.assess_risk": lambda: services.risk_evaluator.assess_risk(claim_data),
+            "PremiumEstimator.estimate_size (mock)": lambda: services.premium_estimator.estimate_size(claim_data),
+            "InsurancePremiumEstimator.estimate_size (endpoint)": lambda: estimator.estimate_size(claim_data),
+            "VectorMemoryRAG.retrieve_chunks": lambda: rag["retrieve_chunks"].invoke(agent.kernel, query="coverage amount"),
+            "StructureClaimData.StructureClaimData": lambda: structure.StructureClaimData(self.claims[1]),
+        }
+        report = {}
+        for name, call in calls.items():
+            samples = []
+            for _ in range(self.args.plugin_calls):
+                started = time.perf_counter()
+                await call()
+                samples.append((time.perf_counter() - started) * 1000)
+            # The first call pays for caches and lazy loads; the rest show the steady state
+            report[name] = {"first_ms": round(samples[0], 2), "steady": percentiles(samples[1:])}
+        return report
+
+    async def prompt_cache(self) -> dict:
+        # One multi-turn session against a recording stub: where the checkpoints sit and what they save
+        shared_bedrock, self.bedrock = self.bedrock, ScriptedBedrockRuntime(
+            first_token_ms=self.args.llm_first_token_ms,
+            per_token_ms=self.args.llm_token_ms,
+            answer_tokens=self.args.answer_tokens,
+            record_requests=True,
+        )
+        try:
+            self.new_factory()
+            session_id, thread = str(uuid.uuid4()), None
+            totals = dict.fromkeys(("prompt_tokens", "cache_read_tokens", "cache_write_tokens", "completion_tokens"), 0)
+            for turn in range(self.args.turns_per_session):
+                _, response = await self.turn(session_id, self.claims[0], thread, first=turn == 0)
+                thread = response.thread
+                for key in totals:
+                    totals[key] += response.metrics[key]
+            requests = self.bedrock.requests
+        finally:
+            self.bedrock = shared_bedrock
+        last = requests[-1]
+        input_tokens = totals["prompt_tokens"] + totals["cache_read_tokens"] + totals["cache_write_tokens"]
+        return {
+            "requests": len(requests),
+            "last_request_cache_points": {
+                "tools": sum("cachePoint" in tool for tool in last.get("toolConfig", {}).get("tools", [])),
+                "system": sum("cachePoint" in block for block in last.get("system", [])),
+                "messages": sum("cachePoint" in block for message in last["messages"] for block in message["content"]),
+            },
+            **totals,
+            "cached_input_share": round(totals["cache_read_tokens"] / input_tokens, 3) if input_tokens else 0.0,
+        }
+
+    async def answer_cache(self) -> dict:
+        # Cached answers are scoped to the document and the conversation so far, so rewordings only hit
+        # as the first turn of a new session; each turn records whether it was expected to hit
+        cache = AnswerCache(enabled=True)
+        set_answer_cache(cache)
+        try:
+            self.new_factory()
+            rows = []
+
+            async def ask(question: str, claim_text: str, expect_hit: bool, session_id: str = None, thread=None):
+                user_input = with_document(question, claim_text, self.args.upload_mode) if thread is None else question
+                started = time.perf_counter()
+                response = await run_turn(user_input, thread, claim_text, session_id or str(uuid.uuid4()))
+                lookup = response.metrics["answer_cache"]
+                rows.append({
+                    "question": question,
+                    "expected_hit": expect_hit,
+                    "hit": lookup["hit"],
+                    "similarity": lookup.get("similarity"),
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "total_tokens": response.metrics["total_tokens"],
+                })
+                return response
+
+            first_session, other_session = str(uuid.uuid4()), str(uuid.uuid4())
+            first = await ask(QUESTION, self.claims[0], False, first_session)
+            for question, expect_hit in PARAPHRASES:
+                await ask(question, self.claims[0], expect_hit)
+            for question in DIFFERENT_QUESTIONS:
+                await ask(question, self.claims[0], False)
+            # Same wording with other figures, then the first figures reworded
+            for question, expect_hit in NUMBER_VARIANTS:
+                await ask(question, self.claims[0], expect_hit)
+            # The same follow-up after different conversations; the second one opens with a question
+            # already answered above, so only its follow-up misses
+            await ask(FOLLOW_UP, self.claims[0], False, first_session, first.thread)
+            other = await ask(DIFFERENT_QUESTIONS[0], self.claims[0], True, other_session)
+            await ask(FOLLOW_UP, self.claims[0], False, other_session, other.thread)
+            await ask(QUESTION, self.claims[1], False)
+        finally:
+            set_answer_cache(AnswerCache(enabled=False))
+        hits = [row["elapsed_ms"] for row in rows if row["hit"]]
+        misses = [row["elapsed_ms"] for row in rows if not row["hit"]]
+        return {
+            "threshold": cache.threshold,
+            "turns": rows,
+            "expected_hits": sum(row["expected_hit"] for row in rows),
+            "hits": sum(row["hit"] for row in rows),
+            "unexpected": sum(row["hit"] != row["expected_hit"] for row in rows),
+            "hit_ms": percentiles(hits),
+            "miss_ms": percentiles(misses),
+            "stats": cache.stats(),
+        }
+
+    async def batch(self) -> dict:
+        # Bulk pipeline over distinct submissions (so the extraction cache does not short-circuit), then
+        # a resume from a checkpoint cut off mid-line
+        input_path = os.path.join(_SCRATCH_DIR, "batch_submissions.jsonl")
+        with open(input_path, "w", encoding="utf-8") as f:
+            for index in range(self.args.batch_submissions):
+                claim_text = f"{self.claims[index % len(self.claims)].rstrip()}\nSubmission reference: B-{index:05d}\n"
+                f.write(json.dumps({"id": f"B-{index:05d}", "claim_text": claim_text}) + "\n")
+
+        report = {"workers": []}
+        for workers in self.args.batch_workers:
+            output_path = os.path.join(_SCRATCH_DIR, f"batch_results_{workers}.jsonl")
+            # A fresh cache per run, so every worker count extracts every submission
+            cache = ExtractionCache(os.path.join(_SCRATCH_DIR, f"batch_extractions_{workers}.sqlite3"))
+            pipeline = BatchPipeline(self.create_services(), workers=workers, cache=cache, progress=None)
+            report["workers"].append(await pipeline.run(input_path, output_path))
+
+        with open(output_path, "rb") as f:
+            lines = f.read().splitlines(keepends=True)
+        kept = len(lines) // 2
+        with open(output_path, "wb") as f:
+            f.writelines(lines[:kept])
+            f.write(lines[kept][: len(lines[kept]) // 2])
+        pipeline = BatchPipeline(self.create_services(), workers=self.args.batch_workers[-1], cache=cache, progress=None)
+        resumed = await pipeline.run(input_path, output_path, resume=True)
+        with open(output_path, encoding="utf-8") as f:
+            ids = [json.loads(line)["id"] for line in f]
+        report["resume"] = {
+            "skipped": resumed["skipped"],
+            "processed": resumed["processed"],
+            "output_lines": len(ids),
+            "distinct_ids": len(set(ids)),
+        }
+        return report
+
+    async def run(self) -> dict:
+        return {
+            "start": await self.cold_warm(),
+            "sequential": await self.sequential(),
+            "concurrency": [await self.concurrent(sessions) for sessions in self.args.sessions],
+            "memory": await self.memory_per_session(),
+            "plugins": await self.plugins(),
+            "prompt_cache": await self.prompt_cache(),
+            "answer_cache": await self.answer_cache(),
+            "batch": await self.batch(),
+        }
+
+
+def parse_sessions(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20, help="sequential turns for the latency percentiles")
+    parser.add_argument("--sessions", type=parse_sessions, default=[1, 4, 16], help="comma-separated concurrent session counts")
+    parser.add_argument("--turns-per-session", type=int, default=3)
+    parser.add_argument("--memory-sessions", type=int, default=20)
+    parser.add_argument("--plugin-calls", type=int, default=20)
+    parser.add_argument("--upload-mode", choices=UPLOAD_MODES, default="reference", help="how the first message carries the document")
+    parser.add_argument("--batch-submissions", type=int, default=100)
+    parser.add_argument("--batch-workers", type=parse_sessions, default=[1, 8], help="comma-separated worker counts for the batch pipeline")
+    parser.add_argument("--no-prompt-cache", action="store_true", help="send requests without cache checkpoints")
+    parser.add_argument("--pad-document-kb", type=int, default=0, help="append boilerplate to every sample claim")
+    parser.add_argument("--llm-first-token-ms", type=float, default=400.0)
+    parser.add_argument("--llm-token-ms", type=float, default=10.0)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--bedrock-control-ms", type=float, default=50.0)
+    parser.add_argument("--sagemaker-ms", type=float, default=40.0)
+    parser.add_argument("--dynamodb-ms", type=float, default=8.0)
+    parser.add_argument("--embedding-ms", type=float, default=0.5, help="per text")
+    parser.add_argument("--dnb-rows", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON report to this path")
+    args = parser.parse_args()
+
+    report = {"config": vars(args), "results": asyncio.run(Harness(args).run())}
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
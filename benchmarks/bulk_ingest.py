@@ -0,0 +1,115 @@
+import os
+import tempfile
+
+# Each run gets its own index cache directory so nothing is shared between them; set before src is imported
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="iua-bulk-")
+os.environ.setdefault("TRACE_EXPORT_PATH", "")
+
+import argparse
+import json
+import sys
+import time
+from functools import partial
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+
+from benchmarks.fakes import HashingEmbeddings
+from src.services.bulk_ingest import BulkDocument
+from src.services.index_cache import IndexCache
+
+if TYPE_CHECKING:
+    from src.kernel_functions.vector_memory_rag_plugin import VectorMemoryRAGPlugin
+
+# --- Bulk ingestion: one add_document call per document against the process pool, and a check that
+# both leave the vector store with the same chunks, vectors and search results
+# Run from the repo root: python -m benchmarks.bulk_ingest --documents 2000 --workers 4
+# The hashing stand-in spends its per-text cost sleeping, so the speed-up shows the pipeline overlap;
+# with the real model it is bounded by the number of cores.
+# Spawned workers re-import this module, so the plugin (and Semantic Kernel) is only imported when used.
+
+WORDS = (
+    "claim policy insured premium turnover liability property flood fire theft warehouse fleet "
+    "contractor revenue employees incident settlement exposure deductible renewal broker"
+).split()
+
+
+def make_documents(rng, count: int, paragraphs: int) -> List[BulkDocument]:
+    documents = []
+    for number in range(count):
+        sections = []
+        for paragraph in range(paragraphs):
+            sentences = [
+                " ".join(rng.choice(WORDS, rng.integers(8, 20))).capitalize() + "."
+                for _ in range(rng.integers(3, 8))
+            ]
+            sections.append(f"SECTION {paragraph + 1}:\n" + " ".join(sentences))
+        documents.append(BulkDocument(
+            text=f"Submission {number}\n\n" + "\n\n".join(sections),
+            document_id=f"doc-{number}",
+            metadata={"organisation_name": f"org-{number % 10}"},
+        ))
+    return documents
+
+
+def new_plugin(name: str, create_embeddings) -> "VectorMemoryRAGPlugin":
+    from src.kernel_functions.vector_memory_rag_plugin import VectorMemoryRAGPlugin
+    return VectorMemoryRAGPlugin(embeddings=create_embeddings(), index_cache=IndexCache(os.path.join(_SCRATCH_DIR, name)))
+
+
+def serial(documents: List[BulkDocument], create_embeddings) -> dict:
+    plugin = new_plugin("serial", create_embeddings)
+    started = time.perf_counter()
+    for document in documents:
+        plugin.add_document(document.text, document_id=document.document_id, metadata=document.metadata)
+    wall_seconds = time.perf_counter() - started
+    return {"plugin": plugin, "wall_seconds": round(wall_seconds, 3), "documents_per_second": round(len(documents) / wall_seconds, 2)}
+
+
+def same_contents(a: "VectorMemoryRAGPlugin", b: "VectorMemoryRAGPlugin", rng, queries: int) -> bool:
+    if a.store.document_ids != b.store.document_ids:
+        return False
+    for document_id in a.store.document_ids:
+        left, right = a.store._documents[document_id], b.store._documents[document_id]
+        if left.text_chunks != right.text_chunks or not np.array_equal(np.asarray(left.vectors), np.asarray(right.vectors)):
+            return False
+    query_vectors = a.embeddings.encode([" ".join(rng.choice(WORDS, 6)) for _ in range(queries)])
+    for left, right in zip(a.store.search(query_vectors, 5), b.store.search(query_vectors, 5)):
+        if [(h.document_id, h.chunk_index) for h in left] != [(h.document_id, h.chunk_index) for h in right]:
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--paragraphs", type=int, default=6)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--per-text-ms", type=float, default=0.5)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    documents = make_documents(rng, args.documents, args.paragraphs)
+    create_embeddings = partial(HashingEmbeddings, per_text_ms=args.per_text_ms)
+    baseline = serial(documents, create_embeddings)
+
+    bulk = {}
+    for workers in (int(w) for w in args.workers.split(",")):
+        plugin = new_plugin(f"bulk-{workers}", create_embeddings)
+        report = plugin.add_documents(documents, workers=workers, create_embeddings=create_embeddings, progress=sys.stderr)
+        report.pop("document_ids")
+        report["matches_serial"] = same_contents(baseline["plugin"], plugin, rng, args.queries)
+        # Second pass over the same documents: everything comes from the index cache
+        rerun = plugin.add_documents(documents, workers=workers, create_embeddings=create_embeddings)
+        report["warm_cache"] = {key: rerun[key] for key in ("cached", "encoded", "wall_seconds", "documents_per_second")}
+        bulk[workers] = report
+
+    print(json.dumps({
+        "config": vars(args),
+        "results": {
+            "serial": {key: value for key, value in baseline.items() if key != "plugin"},
+            "bulk": bulk,
+        },
+    }, indent=2))
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import time
+
+from src.kernel_functions.structure_claim_data import CLAIM_FIELDS
+from src.services.rule_extractor import CONFIDENCE_THRESHOLD, confident_fields, extract_fields
+
+# --- Rule fast path vs LLM-only StructureClaimData: latency and field accuracy
+# Run from the repo root: python -m benchmarks.claim_extraction --llm-latency-ms 2500
+# The LLM is not called; its latency is the measured mean of a Bedrock StructureClaimData call, passed in,
+# and the LLM is assumed to fill the fields the rules left open correctly.
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "data", "claim_samples.jsonl")
+
+# Labelled lines the rules must not take at face value: (text, field, expected value, or None when the
+# field has to be left to the LLM)
+LABELLED_EDGE_CASES = [
+    ("Coverage: 5 years", "coverage_amount", None),
+    ("Coverage - see Section 4.2 below", "coverage_amount", None),
+    ("Premium: 3% of annual turnover", "premium", None),
+    ("Sum insured: 2024 schedule applies", "coverage_amount", None),
+    ("Coverage: 2,500,000 GBP", "coverage_amount", "2500000"),
+    ("Premium: 45k", "premium", "45000"),
+    ("Company: Acme - a UK manufacturer", "organisation_name", "Acme"),
+    ("Company: Initech Ltd, a software house", "organisation_name", "Initech Ltd"),
+    ("Insured: " + "very long description of the business " * 3, "organisation_name", None),
+]
+
+
+def _same(field: str, actual: str, expected: str) -> bool:
+    if field in ("coverage_amount", "premium", "region_of_operation"):
+        return actual.strip().lower() == expected.strip().lower()
+    return actual.strip().rstrip(".").lower() == expected.strip().rstrip(".").lower()
+
+
+def edge_cases(threshold: float) -> dict:
+    failures = []
+    for text, field, expected in LABELLED_EDGE_CASES:
+        actual = confident_fields(extract_fields(text), threshold).get(field)
+        if actual != expected:
+            failures.append({"text": text, "field": field, "expected": expected, "actual": actual})
+    return {"cases": len(LABELLED_EDGE_CASES), "passed": len(LABELLED_EDGE_CASES) - len(failures), "failures": failures}
+
+
+def run(samples_path: str, llm_latency_ms: float, threshold: float, repeats: int) -> dict:
+    with open(samples_path, encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+
+    filled = correct = total_fields = llm_calls = 0
+    rule_ms = []
+    per_field = {field: {"filled": 0, "correct": 0} for field in CLAIM_FIELDS}
+    for sample in samples:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            fields = confident_fields(extract_fields(sample["claim_text"]), threshold)
+        rule_ms.append((time.perf_counter() - started) * 1000 / repeats)
+
+        total_fields += len(CLAIM_FIELDS)
+        if len(fields) < len(CLAIM_FIELDS):
+            llm_calls += 1
+        for field, value in fields.items():
+            ok = _same(field, value, sample["expected"].get(field, ""))
+            filled += 1
+            correct += ok
+            per_field[field]["filled"] += 1
+            per_field[field]["correct"] += ok
+
+    mean_rule_ms = sum(rule_ms) / len(rule_ms)
+    return {
+        "samples": len(samples),
+        "confidence_threshold": threshold,
+        "rule_extractor": {
+            "mean_latency_ms": round(mean_rule_ms, 4),
+            "max_latency_ms": round(max(rule_ms), 4),
+            "fields_filled": filled,
+            "field_coverage": round(filled / total_fields, 3),
+            "precision": round(correct / filled, 3) if filled else None,
+            "per_field": per_field,
+        },
+        "llm_calls": {"llm_only": len(samples), "with_fast_path": llm_calls},
+        "estimated_mean_latency_ms": {
+            "llm_only": llm_latency_ms,
+            "with_fast_path": round(mean_rule_ms + llm_latency_ms * llm_calls / len(samples), 2),
+        },
+        "labelled_edge_cases": edge_cases(threshold),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", default=SAMPLES_PATH)
+    parser.add_argument("--llm-latency-ms", type=float, default=2500.0)
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args.samples, args.llm_latency_ms, args.threshold, args.repeats), indent=2))
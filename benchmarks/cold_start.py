@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import List
+
+# --- Cold start: import cost of the app / agent entry points and the background warm-up
+# Run from the repo root: python -m benchmarks.cold_start --repeats 3
+# Every measurement runs in a fresh interpreter, so nothing is already in sys.modules.
+
+HEAVY_MODULES = ("semantic_kernel", "boto3", "botocore.config", "faiss", "torch", "sentence_transformers")
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+# The warm-up against the local stand-ins from benchmarks/fakes.py, as the app would start it
+WARMUP_PROBE = """
+import json, os, tempfile, time
+scratch = tempfile.mkdtemp(prefix="iua-cold-")
+os.environ.setdefault("INDEX_CACHE_DIR", os.path.join(scratch, "index"))
+os.environ.setdefault("EXTRACTION_CACHE_PATH", os.path.join(scratch, "extractions.sqlite3"))
+os.environ.setdefault("TRACE_EXPORT_PATH", "")
+started = time.perf_counter()
+from src.agent.warmup import WARMUP_STAGES, Warmup
+page_ready = time.perf_counter() - started
+
+def install_fakes():
+    from benchmarks.fakes import FakeBedrockClient, FakeDynamoDB, FakeSageMakerRuntime, HashingEmbeddings, ScriptedBedrockRuntime, make_dnb_records
+    from src.agent.agent_factory import AgentFactory, set_agent_factory
+    from src.agent.agent_services import create_shared_services
+    from src.kernel_functions.failure_score_checker import DNB_KEY_ATTRIBUTE, DNB_TABLE_NAME
+    dynamodb = FakeDynamoDB()
+    dynamodb.put_records(DNB_TABLE_NAME, DNB_KEY_ATTRIBUTE, make_dnb_records({dnb_rows}))
+    set_agent_factory(AgentFactory(create_services=lambda: create_shared_services(
+        bedrock_runtime=ScriptedBedrockRuntime(), bedrock=FakeBedrockClient(), sagemaker_client=FakeSageMakerRuntime(),
+        dynamodb=dynamodb, embeddings=HashingEmbeddings(),
+    )))
+
+# The real stages, with the stand-ins swapped in once the agent modules are imported
+warmup = Warmup([WARMUP_STAGES[0], ("install_fakes", install_fakes), *WARMUP_STAGES[1:]])
+warmup.run()
+print(json.dumps({{"page_imports_seconds": page_ready, **warmup.report()}}))
+"""
+
+
+def run_probe(code: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))},
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def median(values: List[float]) -> float:
+    values = sorted(values)
+    return round(values[len(values) // 2], 4)
+
+
+def import_cost(module: str, repeats: int) -> dict:
+    runs = [run_probe(IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)) for _ in range(repeats)]
+    return {"median_seconds": median([run["seconds"] for run in runs]), "heavy_modules_loaded": runs[-1]["loaded"]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--modules", default="src.agent.message_log,src.agent.warmup,src.services.document_reference,src.agent.agent_services,main",
+        help="comma-separated modules to time on their own"
+    )
+    parser.add_argument("--dnb-rows", type=int, default=5000)
+    parser.add_argument("--output", help="also write the JSON report to this path")
+    args = parser.parse_args()
+
+    report = {
+        "config": vars(args),
+        "results": {
+            "imports": {module: import_cost(module, args.repeats) for module in args.modules.split(",") if module},
+            "warmup": run_probe(WARMUP_PROBE.format(dnb_rows=args.dnb_rows)),
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
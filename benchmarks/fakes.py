@@ -0,0 +1,355 @@
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional
+
+import botocore.session
+import numpy as np
+from botocore.exceptions import ParamValidationError
+from botocore.validate import ParamValidator
+
+# --- Deterministic local stand-ins for the AWS clients and the embedding model
+# Each fake sleeps a configurable latency inside the client call, i.e. on the thread the real
+# boto3 call would block, so the event loop sees the same off-loop waits as in production.
+
+EXTRACTION_PROMPT_MARKER = "Extract the following fields"
+_DOCUMENT_ID_RE = re.compile(r"Uploaded document: `(doc-[0-9a-f]+)`")
+FAKE_EMBEDDING_DIMENSION = 384
+# Bedrock only caches prefixes of at least this many tokens (Claude 3.7 Sonnet)
+CACHE_MIN_TOKENS = 1024
+_WORD_RE = re.compile(r"\w+")
+
+
+def _sleep_ms(milliseconds: float):
+    if milliseconds > 0:
+        time.sleep(milliseconds / 1000)
+
+
+def _words(text: str) -> int:
+    return len(_WORD_RE.findall(text))
+
+
+_bedrock_runtime_model = None
+
+
+def validate_request(operation_name: str, params: dict):
+    # The same client-side check boto3 runs before sending, so a malformed request fails here too
+    global _bedrock_runtime_model
+    if _bedrock_runtime_model is None:
+        _bedrock_runtime_model = botocore.session.get_session().get_service_model("bedrock-runtime")
+    shape = _bedrock_runtime_model.operation_model(operation_name).input_shape
+    report = ParamValidator().validate(params, shape)
+    if report.has_errors():
+        raise ParamValidationError(report=report.generate_report())
+
+
+def _prompt_prefixes(kwargs: dict):
+    # Walks the prompt in Bedrock's cache order (tools, system, messages) and returns its size in
+    # characters plus (chars, prefix hash, is cache point) at every content block boundary
+    digest, chars, boundaries = hashlib.sha256(), 0, []
+    blocks = [*kwargs.get("toolConfig", {}).get("tools", []), *kwargs.get("system", [])]
+    blocks += [{"role": message["role"], **block} for message in kwargs.get("messages", []) for block in message["content"]]
+    for block in blocks:
+        if "cachePoint" in block:
+            if boundaries:
+                boundaries[-1] = (*boundaries[-1][:2], True)
+            continue
+        encoded = json.dumps(block, sort_keys=True, default=str).encode()
+        digest.update(encoded)
+        chars += len(encoded)
+        boundaries.append((chars, digest.hexdigest(), False))
+    return chars, boundaries
+
+
+class ScriptedBedrockRuntime:
+    # Plays one fixed underwriting turn per user question, through the real BedrockChatCompletion
+    # connector: StructureClaimData first, then the independent lookups in one response, then an answer.
+    # Requests are validated against the Converse API shapes, like boto3 does, and can be recorded so
+    # tests of request shape can inspect exactly what would have been sent.
+    def __init__(
+        self,
+        first_token_ms: float = 400.0,
+        per_token_ms: float = 10.0,
+        answer_tokens: int = 120,
+        lookup_tools: Iterable[str] = (
+            "FailureScoreChecker-retrieve_failure_rating",
+            "RiskModel-assess_risk",
+            "PremiumEstimator-estimate_size",
+            "VectorMemoryRAG-retrieve_chunks",
+        ),
+        record_requests: bool = False,
+        validate_requests: bool = True
+    ):
+        self.first_token_ms = first_token_ms
+        self.per_token_ms = per_token_ms
+        self.answer_tokens = answer_tokens
+        self.lookup_tools = tuple(lookup_tools)
+        self.record_requests = record_requests
+        self.validate_requests = validate_requests
+        self.requests: List[dict] = []
+        self._lock = threading.Lock()
+        self._tool_ids = 0
+        # Prompt cache: hashes of the prefixes written so far
+        self._cached_prefixes = set()
+
+    def _record(self, operation_name: str, kwargs: dict):
+        if self.validate_requests:
+            validate_request(operation_name, kwargs)
+        if self.record_requests:
+            with self._lock:
+                self.requests.append(kwargs)
+
+    def _next_tool_id(self) -> str:
+        with self._lock:
+            self._tool_ids += 1
+            return f"tooluse_{self._tool_ids:06d}"
+
+    def _usage(self, kwargs: dict, output_tokens: int) -> dict:
+        # Like Bedrock: a hit is the longest cached prefix ending at any block boundary up to the last
+        # cache point; everything from there to the last cache point is written
+        prompt_chars, boundaries = _prompt_prefixes(kwargs)
+        checkpoints = [index for index, (_, _, is_cache_point) in enumerate(boundaries) if is_cache_point]
+        read = write = 0
+        if checkpoints:
+            with self._lock:
+                for chars, key, _ in boundaries[: checkpoints[-1] + 1]:
+                    if key in self._cached_prefixes:
+                        read = chars // 4
+                for index in checkpoints:
+                    chars, key, _ = boundaries[index]
+                    if chars // 4 >= CACHE_MIN_TOKENS and key not in self._cached_prefixes:
+                        self._cached_prefixes.add(key)
+                        write = max(write, chars // 4 - read)
+        input_tokens = prompt_chars // 4 - read - write
+        usage = {"inputTokens": input_tokens, "outputTokens": output_tokens, "totalTokens": prompt_chars // 4 + output_tokens}
+        if checkpoints:
+            usage.update(cacheReadInputTokens=read, cacheWriteInputTokens=write)
+        return usage
+
+    def _plan(self, kwargs: dict) -> dict:
+        messages = kwargs.get("messages", [])
+        last = messages[-1] if messages else {"content": []}
+        last_text = " ".join(block.get("text", "") for block in last.get("content", []))
+        if EXTRACTION_PROMPT_MARKER in last_text:
+            return {"text": json.dumps(self._claim_fields(last_text))}
+
+        tools = kwargs.get("toolConfig", {}).get("tools", [])
+        tool_names = {tool["toolSpec"]["name"] for tool in tools if "toolSpec" in tool}
+        results = [block["toolResult"] for block in last.get("content", []) if "toolResult" in block]
+        if not results and "StructureClaimData-StructureClaimData" in tool_names:
+            # A referenced upload is structured by id; a pasted one is passed back as text
+            reference = _DOCUMENT_ID_RE.search(last_text)
+            arguments = {"document_id": reference.group(1)} if reference else {"claim_text": last_text}
+            return {"tools": [("StructureClaimData-StructureClaimData", arguments)]}
+        if results and self._is_claim_data(results):
+            claim_data = json.loads(results[0]["content"][0]["text"])
+            calls = []
+            for name in self.lookup_tools:
+                if name not in tool_names:
+                    continue
+                arguments = {"query": "coverage and region"} if name.startswith("VectorMemoryRAG") else {"claim_data": claim_data}
+                calls.append((name, arguments))
+            if calls:
+                return {"tools": calls}
+        answer = " ".join(["token"] * self.answer_tokens)
+        return {"text": f"Underwriting summary: {answer}"}
+
+    @staticmethod
+    def _is_claim_data(results: List[dict]) -> bool:
+        try:
+            return "organisation_name" in json.loads(results[0]["content"][0]["text"])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def _claim_fields(prompt: str) -> dict:
+        # Echo back a blank value for every field the extraction prompt asks for
+        fields = re.findall(r'"(\w+)":\s*""', prompt)
+        return {field: "" for field in fields}
+
+    def _output_tokens(self, plan: dict) -> int:
+        if "text" in plan:
+            return max(1, _words(plan["text"]))
+        return 20 * len(plan["tools"])
+
+    def converse(self, **kwargs) -> dict:
+        self._record("Converse", kwargs)
+        plan = self._plan(kwargs)
+        output_tokens = self._output_tokens(plan)
+        _sleep_ms(self.first_token_ms + self.per_token_ms * output_tokens)
+        if "text" in plan:
+            content, stop = [{"text": plan["text"]}], "end_turn"
+        else:
+            content = [
+                {"toolUse": {"toolUseId": self._next_tool_id(), "name": name, "input": arguments}}
+                for name, arguments in plan["tools"]
+            ]
+            stop = "tool_use"
+        return {
+            "output": {"message": {"role": "assistant", "content": content}},
+            "stopReason": stop,
+            "usage": self._usage(kwargs, output_tokens),
+            "metrics": {"latencyMs": int(self.first_token_ms + self.per_token_ms * output_tokens)},
+        }
+
+    def converse_stream(self, **kwargs) -> dict:
+        # The whole generation time is spent here, off the event loop; the returned stream does not block
+        self._record("ConverseStream", kwargs)
+        plan = self._plan(kwargs)
+        output_tokens = self._output_tokens(plan)
+        _sleep_ms(self.first_token_ms + self.per_token_ms * output_tokens)
+        events = [{"messageStart": {"role": "assistant"}}]
+        if "text" in plan:
+            events.append({"contentBlockStart": {"start": {}, "contentBlockIndex": 0}})
+            for word in re.findall(r"\S+\s*", plan["text"]):
+                events.append({"contentBlockDelta": {"delta": {"text": word}, "contentBlockIndex": 0}})
+            events.append({"contentBlockStop": {"contentBlockIndex": 0}})
+            stop = "end_turn"
+        else:
+            for index, (name, arguments) in enumerate(plan["tools"]):
+                events.append({"contentBlockStart": {
+                    "start": {"toolUse": {"toolUseId": self._next_tool_id(), "name": name}},
+                    "contentBlockIndex": index,
+                }})
+                payload = json.dumps(arguments)
+                # Arguments arrive as JSON fragments, like the real service
+                for start in range(0, len(payload), 32):
+                    events.append({"contentBlockDelta": {
+                        "delta": {"toolUse": {"input": payload[start:start + 32]}},
+                        "contentBlockIndex": index,
+                    }})
+                events.append({"contentBlockStop": {"contentBlockIndex": index}})
+            stop = "tool_use"
+        events.append({"messageStop": {"stopReason": stop}})
+        events.append({"metadata": {"usage": self._usage(kwargs, output_tokens), "metrics": {"latencyMs": 0}}})
+        return {"stream": iter(events)}
+
+
+class FakeBedrockClient:
+    # The control-plane client; the connector asks it whether the model can stream on every request
+    def __init__(self, latency_ms: float = 50.0):
+        self.latency_ms = latency_ms
+
+    def get_foundation_model(self, modelIdentifier: str) -> dict:
+        _sleep_ms(self.latency_ms)
+        return {"modelDetails": {"modelId": modelIdentifier, "responseStreamingSupported": True}}
+
+
+class FakeSageMakerRuntime:
+    # Scores every CSV row the way a linear endpoint would: a fixed function of the first column
+    def __init__(self, round_trip_ms: float = 40.0, per_row_ms: float = 0.01):
+        self.round_trip_ms = round_trip_ms
+        self.per_row_ms = per_row_ms
+
+    def invoke_endpoint(self, EndpointName: str, ContentType: str, Body) -> dict:
+        body = Body.decode() if isinstance(Body, bytes) else Body
+        rows = body.splitlines()
+        _sleep_ms(self.round_trip_ms + self.per_row_ms * len(rows))
+        scores = [{"score": float(row.split(",")[0] or 0) * 0.01} for row in rows]
+        return {"Body": io.BytesIO(json.dumps({"predictions": scores}).encode())}
+
+
+class _ScanPaginator:
+    def __init__(self, table: "FakeDynamoDB", page_size: int):
+        self.table = table
+        self.page_size = page_size
+
+    def paginate(self, TableName: str, **kwargs) -> Iterable[dict]:
+        items = list(self.table.tables[TableName].values())
+        for start in range(0, max(len(items), 1), self.page_size):
+            _sleep_ms(self.table.latency_ms)
+            yield {"Items": items[start:start + self.page_size]}
+
+
+class FakeDynamoDB:
+    # In-memory low-level client holding items in DynamoDB's attribute-value format
+    def __init__(self, latency_ms: float = 8.0, page_size: int = 1000):
+        self.latency_ms = latency_ms
+        self.page_size = page_size
+        self.tables: Dict[str, Dict[str, dict]] = {}
+        self.calls = {"get_item": 0, "scan_pages": 0}
+
+    def put_records(self, table_name: str, key_attribute: str, records: Iterable[dict]):
+        table = self.tables.setdefault(table_name, {})
+        for record in records:
+            table[record[key_attribute]] = {
+                name: {"N": str(value)} if isinstance(value, (int, float)) else {"S": str(value)}
+                for name, value in record.items()
+            }
+
+    def get_paginator(self, operation_name: str) -> _ScanPaginator:
+        if operation_name != "scan":
+            raise ValueError(f"Unsupported paginator: {operation_name}")
+        self.calls["scan_pages"] += 1
+        return _ScanPaginator(self, self.page_size)
+
+    def get_item(self, TableName: str, Key: dict, ProjectionExpression: Optional[str] = None,
+                 ExpressionAttributeNames: Optional[dict] = None) -> dict:
+        _sleep_ms(self.latency_ms)
+        self.calls["get_item"] += 1
+        key = next(iter(Key.values()))["S"]
+        item = self.tables.get(TableName, {}).get(key)
+        if item is None:
+            return {}
+        if ExpressionAttributeNames:
+            wanted = set(ExpressionAttributeNames.values())
+            item = {name: value for name, value in item.items() if name in wanted}
+        return {"Item": item}
+
+
+class HashingEmbeddings:
+    # Stands in for EmbeddingService: bag-of-words feature hashing, normalised, with a fixed cost per text
+    def __init__(self, dimension: int = FAKE_EMBEDDING_DIMENSION, per_text_ms: float = 0.5):
+        self.model_name = f"hashing-{dimension}"
+        self.dimension = dimension
+        self.per_text_ms = per_text_ms
+        self._stats = {"requests": 0, "texts": 0}
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in _WORD_RE.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dimension] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        _sleep_ms(self.per_text_ms * len(texts))
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["texts"] += len(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.vstack([self._vector(text) for text in texts])
+
+    def submit(self, texts: List[str]) -> Future:
+        future = Future()
+        future.set_result(self.encode(texts))
+        return future
+
+    async def encode_async(self, texts: List[str]) -> np.ndarray:
+        return self.encode(texts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+def make_dnb_records(count: int, seed: int = 0) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    stems = ["Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Hooli", "Vandelay", "Soylent", "Tyrell"]
+    suffixes = ["Ltd", "PLC", "Inc", "Group", "Holdings"]
+    records = []
+    for index in range(count):
+        name = f"{stems[index % len(stems)]} {index // len(stems)} {suffixes[index % len(suffixes)]}"
+        records.append({
+            "organisation_name": name,
+            "failure_score": int(rng.integers(1, 100)),
+            "failure_score_commentary": "Synthetic commentary for benchmarking.",
+        })
+    return records
@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.kernel_functions.insurance_premium_estimator import InsurancePremiumEstimator
+from src.kernel_functions.mock_insurance_premium_estimator import MockInsurancePremiumEstimator
+from src.services.sagemaker_client import AsyncSageMakerRuntime
+
+# --- Per-row vs batched premium quoting throughput
+# Run from the repo root: python -m benchmarks.premium_portfolio --rows 20000
+# The endpoint is a local fake that sleeps a fixed round-trip per request plus a small cost per row.
+
+
+class FakeEndpointClient:
+    def __init__(self, round_trip_ms: float, per_row_ms: float):
+        self.round_trip_ms = round_trip_ms
+        self.per_row_ms = per_row_ms
+
+    def invoke_endpoint(self, EndpointName, ContentType, Body):
+        rows = Body.splitlines()
+        time.sleep((self.round_trip_ms + self.per_row_ms * len(rows)) / 1000)
+        scores = [{"score": float(row.split(",")[0]) * 0.01} for row in rows]
+        return {"Body": io.BytesIO(json.dumps({"predictions": scores}).encode())}
+
+
+def make_records(count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    regions = np.array(["gb", "usa", "eu", "asia", "africa", "latam"])
+    return [
+        {"coverage_amount": str(int(amount)), "region_of_operation": str(region)}
+        for amount, region in zip(rng.integers(1_000_000, 500_000_000, count), rng.choice(regions, count))
+    ]
+
+
+def throughput(rows: int, seconds: float) -> dict:
+    return {"rows": rows, "seconds": round(seconds, 4), "rows_per_second": round(rows / seconds, 1) if seconds else None}
+
+
+async def run(rows: int, endpoint_rows: int, round_trip_ms: float, per_row_ms: float, seed: int) -> dict:
+    records = make_records(rows, seed)
+    mock = MockInsurancePremiumEstimator(runtime=object())
+
+    started = time.perf_counter()
+    per_row = [await mock.estimate_size(record) for record in records]
+    mock_per_row = throughput(rows, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    batched = mock.estimate_portfolio(records)
+    mock_batched = throughput(rows, time.perf_counter() - started)
+    assert [r["estimated_insurance_premium"] for r in per_row] == [r["estimated_insurance_premium"] for r in batched]
+
+    frame = pd.DataFrame.from_records(records)
+    frame["coverage_amount"] = frame["coverage_amount"].astype("int64")
+    frame["region_of_operation"] = frame["region_of_operation"].astype("category")
+    started = time.perf_counter()
+    premiums = mock.premium_array(frame)
+    mock_columnar = throughput(rows, time.perf_counter() - started)
+    assert premiums.tolist() == [r["estimated_insurance_premium"] for r in per_row]
+
+    runtime = AsyncSageMakerRuntime(client=FakeEndpointClient(round_trip_ms, per_row_ms), timeout_seconds=60)
+    estimator = InsurancePremiumEstimator(runtime=runtime)
+    sample = records[:endpoint_rows]
+
+    started = time.perf_counter()
+    for record in sample:
+        await estimator.estimate_size(record)
+    endpoint_per_row = throughput(len(sample), time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await estimator.estimate_portfolio(sample)
+    endpoint_batched = throughput(len(sample), time.perf_counter() - started)
+
+    return {
+        "mock": {"per_row": mock_per_row, "batched": mock_batched, "columnar": mock_columnar},
+        "endpoint": {
+            "round_trip_ms": round_trip_ms,
+            "per_row": endpoint_per_row,
+            "batched": endpoint_batched,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--endpoint-rows", type=int, default=500)
+    parser.add_argument("--round-trip-ms", type=float, default=20.0)
+    parser.add_argument("--per-row-ms", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    report = asyncio.run(run(args.rows, args.endpoint_rows, args.round_trip_ms, args.per_row_ms, args.seed))
+    print(json.dumps(report, indent=2))
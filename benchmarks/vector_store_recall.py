@@ -0,0 +1,72 @@
+import argparse
+import json
+from typing import List
+
+import numpy as np
+
+from src.services.vector_store import VectorStore, recall_latency_report
+
+# --- Recall@k, latency and index memory per vector of each index type and storage against the exact
+# flat baseline. Compressed storage runs once per re-rank factor (0 = raw quantised distances).
+# Run from the repo root: python -m benchmarks.vector_store_recall --vectors 100000 --storage float32,sq8,pq
+
+
+def clustered_vectors(rng, centres: np.ndarray, count: int) -> np.ndarray:
+    # Sentence embeddings cluster by topic; uniform random vectors would understate ANN recall
+    picks = rng.integers(0, len(centres), count)
+    vectors = centres[picks] + 0.5 * rng.standard_normal((count, centres.shape[1]))
+    vectors = vectors.astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def run(
+    num_vectors: int,
+    dimension: int,
+    docs: int,
+    queries: int,
+    k: int,
+    seed: int,
+    index_types: List[str],
+    storages: List[str],
+    rerank_factors: List[int]
+):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((256, dimension)) / np.sqrt(dimension) * 4
+    shards = np.array_split(clustered_vectors(rng, centres, num_vectors), docs)
+    query_vectors = clustered_vectors(rng, centres, queries)
+
+    reports = []
+    for index_type in index_types:
+        for storage in storages:
+            store = VectorStore(dimension, index_type=index_type, storage=storage)
+            for doc_number, shard in enumerate(shards):
+                store.add_document(
+                    f"doc-{doc_number}",
+                    [f"chunk {i}" for i in range(len(shard))],
+                    shard,
+                    {"organisation_name": f"org-{doc_number % 10}"},
+                )
+            # Re-ranking only changes the search, so one build serves every factor
+            for rerank_factor in (rerank_factors if storage != "float32" else [0]):
+                store.rerank_factor = rerank_factor
+                reports.append(recall_latency_report(store, query_vectors, k))
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--index-types", default="flat,hnsw,ivf")
+    parser.add_argument("--storage", default="float32,fp16,sq8,pq")
+    parser.add_argument("--rerank-factors", default="0,4")
+    args = parser.parse_args()
+    print(json.dumps(run(
+        args.vectors, args.dimension, args.docs, args.queries, args.k, args.seed,
+        args.index_types.split(","), args.storage.split(","), [int(f) for f in args.rerank_factors.split(",")],
+    ), indent=2))
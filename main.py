@@ -1,94 +1,303 @@
-
 import asyncio
-from typing import List, Optional
+import json
+from typing import AsyncIterator, List, Optional
 from src.agent.agent_message import AgentMessage
 from src.agent.agent_response import AgentResponse
+from src.agent.agent_stream_event import AgentStreamEvent
+from src.agent.history_reducer import BudgetedChatHistoryAgentThread
 from semantic_kernel.agents import ChatHistoryAgentThread
-from semantic_kernel.contents import ChatMessageContent, FunctionCallContent, FunctionResultContent
+from semantic_kernel.contents import ChatMessageContent, FunctionCallContent, FunctionResultContent, StreamingTextContent
+from semantic_kernel.contents.utils.author_role import AuthorRole
 
-from src.agent.agent import make_agent
+from src.agent.agent import answer_signature
+from src.agent.agent_factory import get_agent_factory
+from src.services.answer_cache import answer_scope, get_answer_cache, history_digest
+from src.services.bedrock_chat_completion import BedrockCompletionUsage
+from src.services.document_reference import question_from
+from src.services.extraction_cache import get_extraction_cache
+from src.services.tracing import Span, span, trace_turn
 
-# --- Main async entrypoint
-async def main(
-    user_input: str, 
-    thread: Optional[ChatHistoryAgentThread] = None, 
-    claim_text: Optional[str] = None
-) -> AgentResponse:
+
+def _call_arguments(call: FunctionCallContent):
+    # Streamed tool calls arrive as JSON fragments; parse once the call is complete
+    if isinstance(call.arguments, str):
+        try:
+            return json.loads(call.arguments or "{}")
+        except json.JSONDecodeError:
+            return call.arguments
+    return call.arguments
+
+
+def tool_call_steps(results: List[FunctionResultContent]) -> List[dict]:
+    # Offsets are relative to the first call of the batch so overlapping calls are easy to spot
+    timings = [(result.metadata or {}).get("timing") for result in results]
+    starts = [timing["started_at"] for timing in timings if timing]
+    if not starts:
+        return [{} for _ in results]
+    origin = min(starts)
+    steps = []
+    for index, timing in enumerate(timings):
+        if not timing:
+            steps.append({})
+            continue
+        overlaps = [
+            other for other, peer in enumerate(timings)
+            if peer and other != index
+            and peer["started_at"] < timing["finished_at"] and timing["started_at"] < peer["finished_at"]
+        ]
+        steps.append({
+            "call_index": index,
+            "queued_ms": round((timing["started_at"] - timing["queued_at"]) * 1000, 1),
+            "start_ms": round((timing["started_at"] - origin) * 1000, 1),
+            "end_ms": round((timing["finished_at"] - origin) * 1000, 1),
+            "duration_ms": round((timing["finished_at"] - timing["started_at"]) * 1000, 1),
+            "timed_out": timing["timed_out"],
+            "overlaps_with": overlaps,
+        })
+    return steps
 
 
+def record_tool_batch(metrics: dict, steps: List[dict]):
+    # busy_ms > wall_ms is time saved by running the batch concurrently
+    timed = [step for step in steps if step]
+    tool_calls = metrics["tool_calls"]
+    tool_calls["batches"] += 1
+    tool_calls["calls"] += len(steps)
+    if timed:
+        tool_calls["busy_ms"] = round(tool_calls["busy_ms"] + sum(step["duration_ms"] for step in timed), 1)
+        tool_calls["wall_ms"] = round(tool_calls["wall_ms"] + max(step["end_ms"] for step in timed), 1)
+
+
+# --- Streaming entrypoint: yields text deltas and tool activity as they happen, then a "done" event
+async def main_stream(
+    user_input: str,
+    thread: Optional[ChatHistoryAgentThread] = None,
+    claim_text: Optional[str] = None,
+    session_id: Optional[str] = None
+) -> AsyncIterator[AgentStreamEvent]:
+
     messages: List[AgentMessage] = []
-    intermediate_steps: List[AgentMessage] = []
     metrics = {
         "total_tokens": 0,
         "prompt_tokens": 0,
         "completion_tokens": 0,
-        "steps": 0
+        "cache_read_tokens": 0,
+        "cache_write_tokens": 0,
+        "steps": 0,
+        "tool_calls": {"batches": 0, "calls": 0, "busy_ms": 0.0, "wall_ms": 0.0}
     }
 
-    agent = make_agent(claim_text) if claim_text else make_agent(None)
+    with trace_turn("agent.turn", session_id=session_id or "") as trace:
+        # A near-identical question about the same document is answered from the answer cache
+        answer_cache = get_answer_cache()
+        question = question_from(user_input)
+        cache_entry, hit = None, None
+        if answer_cache.enabled and claim_text and question:
+            with span("answer_cache.lookup", "cache") as lookup_span:
+                services = get_agent_factory().services
+                signature = answer_signature(services)
+                # A thread that was never created has no messages yet (and get_messages would create it)
+                history = ""
+                if thread is not None and thread.id is not None:
+                    history = history_digest([m.to_dict() async for m in thread.get_messages()])
+                scope = answer_scope(claim_text, signature, history)
+                vector = (await services.embeddings.encode_async([question]))[0]
+                hit = answer_cache.lookup(scope, signature, question, vector)
+                cache_entry = (scope, signature, vector)
+                if lookup_span is not None:
+                    lookup_span.set(hit=hit is not None)
+            if hit is not None:
+                metrics["answer_cache"] = {**hit.summary(), **answer_cache.stats()}
+                # The thread still gets both messages, so later turns see the exchange
+                if thread is None:
+                    thread = BudgetedChatHistoryAgentThread()
+                await thread.on_new_message(ChatMessageContent(role=AuthorRole.USER, content=user_input))
+                await thread.on_new_message(ChatMessageContent(role=AuthorRole.ASSISTANT, content=hit.answer.content, name=hit.answer.name))
+                messages.append(AgentMessage(role="user", content=user_input))
+                messages.append(AgentMessage(
+                    role="assistant",
+                    content=hit.answer.content,
+                    name=hit.answer.name,
+                    metadata={"answer_cache": hit.summary()}
+                ))
+                yield AgentStreamEvent(type="text", content=hit.answer.content)
+                metrics["steps"] = 1
+                metrics["extraction_cache"] = get_extraction_cache().stats()
+                trace.end_span(trace.root)
+                metrics["trace"] = trace.to_dict()
+                yield AgentStreamEvent(type="done", data=AgentResponse(messages=messages, thread=thread, metrics=metrics))
+                return
 
-    messages.append(AgentMessage(role="user", content=user_input))
+        # Warm path: shared clients/models, per-session agent reused until the document changes
+        with span("agent.get_agent", "setup"):
+            agent = get_agent_factory().get_agent(session_id, claim_text)
 
-    async def handle_intermediate(message: ChatMessageContent):
-        for item in message.items:
-            if isinstance(item, FunctionCallContent):
-                intermediate_steps.append(AgentMessage(
-                    role="function_call",
-                    name=item.name,
-                    function_call={"name": item.name, "arguments": item.arguments},
-                ))
-            elif isinstance(item, FunctionResultContent):
-                intermediate_steps.append(AgentMessage(
-                    role="function_response",
-                    name=item.name,
-                    function_response=item.result,
+        messages.append(AgentMessage(role="user", content=user_input))
+
+        # Older turns are compacted / summarised so the replayed history stays within its token budget
+        if thread is None:
+            thread = BudgetedChatHistoryAgentThread()
+        if isinstance(thread, BudgetedChatHistoryAgentThread):
+            with span("history.reduce", "setup"):
+                metrics["history"] = await thread.reduce_for_turn()
+
+        text_parts: List[str] = []
+        calls: List[FunctionCallContent] = []
+        # Usage and span of the finished LLM request, attached to the first message that request produced
+        pending_usage: List[BedrockCompletionUsage] = []
+        pending_spans: List[Span] = []
+        llm_span: Optional[Span] = None
+
+        def take_metadata() -> dict:
+            metadata = {}
+            if pending_usage:
+                metadata["usage"] = BedrockCompletionUsage(
+                    prompt_tokens=sum(u.prompt_tokens or 0 for u in pending_usage),
+                    completion_tokens=sum(u.completion_tokens or 0 for u in pending_usage),
+                    cache_read_tokens=sum(getattr(u, "cache_read_tokens", 0) for u in pending_usage),
+                    cache_write_tokens=sum(getattr(u, "cache_write_tokens", 0) for u in pending_usage),
+                )
+            if pending_spans:
+                metadata["span"] = pending_spans[-1].summary()
+            pending_usage.clear()
+            pending_spans.clear()
+            return metadata
+
+        def flush_text():
+            if text_parts:
+                messages.append(AgentMessage(
+                    role="assistant",
+                    content="".join(text_parts),
+                    name=agent.name,
+                    metadata=take_metadata()
                 ))
-            else:
-                intermediate_steps.append(AgentMessage(
-                    role=message.role.value,
-                    content=message.content
+                text_parts.clear()
+
+        def flush_calls() -> List[AgentStreamEvent]:
+            flush_text()
+            events = []
+            for call in calls:
+                arguments = _call_arguments(call)
+                messages.append(AgentMessage(
+                    role="function_call",
+                    name=call.name,
+                    function_call={"name": call.name, "arguments": arguments},
+                    metadata=take_metadata()
                 ))
+                events.append(AgentStreamEvent(type="function_call", name=call.name, data=arguments))
+            calls.clear()
+            return events
 
-    async for response in agent.invoke(
-        messages=user_input,
-        thread=thread,
-        on_intermediate_message=handle_intermediate
-    ):
-        message = AgentMessage(
-            role=response.role,
-            content=response.content,
-            name=getattr(response, "name", None)
-        )
-
-        if hasattr(response, "function_call") and response.function_call:
-            message.function_call = {
-                "name": response.function_call.name,
-                "arguments": response.function_call.arguments
-            }
-
-        if hasattr(response, "function_response") and response.function_response:
-            message.function_response = response.function_response
-
-        if hasattr(response, "metadata") and response.metadata:
-            message.metadata = response.metadata
-            if "usage" in message.metadata:
-                usage = message.metadata["usage"]
-                metrics["prompt_tokens"] += usage.prompt_tokens
-                metrics["completion_tokens"] += usage.completion_tokens
-                metrics["total_tokens"] = metrics["prompt_tokens"] + metrics["completion_tokens"]
-
-        messages.extend(intermediate_steps)
-        metrics["steps"] += len(intermediate_steps)
-        intermediate_steps.clear()
-        messages.append(message)
-        metrics["steps"] += 1
-        thread = response.thread
-
-    return AgentResponse(
+        def end_llm_span():
+            nonlocal llm_span
+            if llm_span is not None:
+                trace.end_span(llm_span)
+                pending_spans.append(llm_span)
+                llm_span = None
+
+        # Each Bedrock request in the auto-invoke loop is a span from the moment it is sent until its usage arrives
+        llm_span = trace.start_span("bedrock.converse_stream", "llm", trace.root)
+        async for response in agent.invoke_stream(messages=user_input, thread=thread):
+            thread = response.thread
+            message = response.message
+            if llm_span is not None and "ttft_ms" not in llm_span.attributes and message.items:
+                llm_span.set(ttft_ms=round(llm_span.duration_ms, 2))
+
+            for item in message.items:
+                if isinstance(item, StreamingTextContent):
+                    if item.text:
+                        text_parts.append(item.text)
+                        yield AgentStreamEvent(type="text", content=item.text)
+                elif isinstance(item, FunctionCallContent):
+                    # A chunk with an id opens a new call; the rest are argument fragments for the last one
+                    if item.id or item.name or not calls:
+                        calls.append(item)
+                    else:
+                        calls[-1] = calls[-1] + item
+
+            results = [item for item in message.items if isinstance(item, FunctionResultContent)]
+            if results:
+                end_llm_span()
+                # Results land in completion order; put them back in the order the model asked for them
+                call_order = {call.id: index for index, call in enumerate(calls)}
+                results.sort(key=lambda result: call_order.get(result.id, len(call_order)))
+                for event in flush_calls():
+                    yield event
+                steps = tool_call_steps(results)
+                record_tool_batch(metrics, steps)
+                for result, step in zip(results, steps):
+                    metadata = {"tool_call": step} if step else {}
+                    if "span" in (result.metadata or {}):
+                        metadata["span"] = result.metadata["span"]
+                    messages.append(AgentMessage(
+                        role="function_response",
+                        name=result.name,
+                        function_response=result.result,
+                        metadata=metadata
+                    ))
+                    yield AgentStreamEvent(type="function_result", name=result.name, data=result.result)
+                # The auto-invoke loop sends the next request as soon as the results are in
+                llm_span = trace.start_span("bedrock.converse_stream", "llm", trace.root)
+
+            usage = (message.metadata or {}).get("usage")
+            if usage is not None:
+                pending_usage.append(usage)
+                # Bedrock reports cached prefix tokens apart from the fresh input tokens
+                cache_read, cache_write = getattr(usage, "cache_read_tokens", 0), getattr(usage, "cache_write_tokens", 0)
+                if llm_span is not None:
+                    llm_span.set(
+                        prompt_tokens=usage.prompt_tokens or 0,
+                        completion_tokens=usage.completion_tokens or 0,
+                        cache_read_tokens=cache_read,
+                        cache_write_tokens=cache_write,
+                    )
+                end_llm_span()
+                metrics["prompt_tokens"] += usage.prompt_tokens or 0
+                metrics["completion_tokens"] += usage.completion_tokens or 0
+                metrics["cache_read_tokens"] += cache_read
+                metrics["cache_write_tokens"] += cache_write
+                metrics["total_tokens"] = (
+                    metrics["prompt_tokens"] + metrics["cache_read_tokens"]
+                    + metrics["cache_write_tokens"] + metrics["completion_tokens"]
+                )
+                yield AgentStreamEvent(type="usage", data=dict(metrics))
+
+        end_llm_span()
+        # Calls left over here were not auto-invoked (e.g. terminated by a filter)
+        for event in flush_calls():
+            yield event
+        flush_text()
+        if pending_usage or pending_spans:
+            messages[-1].metadata = {**(messages[-1].metadata or {}), **take_metadata()}
+
+        metrics["steps"] = len(messages) - 1
+        # Only a turn that ends in a plain answer is reused
+        if cache_entry is not None and messages[-1].role == "assistant" and messages[-1].content:
+            answer_cache.store(*cache_entry[:2], question, cache_entry[2], messages[-1].content, agent.name)
+        metrics["answer_cache"] = {"hit": False, **answer_cache.stats()}
+        metrics["extraction_cache"] = get_extraction_cache().stats()
+        trace.end_span(trace.root)
+        metrics["trace"] = trace.to_dict()
+
+    yield AgentStreamEvent(type="done", data=AgentResponse(
         messages=messages,
         thread=thread,
         metrics=metrics
-    )
+    ))
+
+
+# --- Main async entrypoint
+async def main(
+    user_input: str, 
+    thread: Optional[ChatHistoryAgentThread] = None, 
+    claim_text: Optional[str] = None,
+    session_id: Optional[str] = None
+) -> AgentResponse:
+    response = None
+    async for event in main_stream(user_input, thread, claim_text, session_id):
+        if event.type == "done":
+            response = event.data
+    return response
 
 # --- Debug runner
 if __name__ == "__main__":
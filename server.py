@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import asdict
+from typing import Optional
+
+from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from main import main_stream
+from src.agent.agent_factory import get_agent_factory
+from src.agent.agent_stream_event import AgentStreamEvent
+from src.agent.session_store import ServiceSession, SessionStore
+from src.agent.warmup import get_warmup, start_warmup
+from src.services.answer_cache import get_answer_cache
+from src.services.document_reference import UPLOAD_MODES, with_document
+from src.services.extraction_cache import get_extraction_cache
+from src.services.turn_limiter import TurnLimiter, TurnRejected
+
+# --- Headless HTTP service for the agent
+# Run: uvicorn server:app --host 0.0.0.0 --port 8000
+# Sessions live in the worker that created them, so behind a load balancer either run one worker
+# per instance or route on the session id (sticky sessions).
+
+SSE_PING_SECONDS = 15
+# A client that stops reading holds a turn slot; give up on it after this long
+SSE_SEND_TIMEOUT_SECONDS = float(os.environ.get("SSE_SEND_TIMEOUT_SECONDS", 30.0))
+
+logger = logging.getLogger("iua.server")
+
+
+def _json_default(value):
+    # Usage objects in message metadata are pydantic models
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return str(value)
+
+
+def dumps(value) -> str:
+    return json.dumps(value, default=_json_default)
+
+
+def event_payload(event: AgentStreamEvent) -> dict:
+    if event.type == "done":
+        # The thread stays in the session; clients get the messages and metrics of the turn
+        data = {"messages": [asdict(message) for message in event.data.messages], "metrics": event.data.metrics}
+    else:
+        data = event.data
+    return {"type": event.type, "content": event.content, "name": event.name, "data": data}
+
+
+class TurnEventSourceResponse(EventSourceResponse):
+    # Releases the session lock and turn slot however the response ends, including a client that
+    # disconnects before the first event is sent
+    def __init__(self, content, stack: AsyncExitStack, **kwargs):
+        super().__init__(content, **kwargs)
+        self.stack = stack
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.stack.aclose()
+
+
+class ServiceState:
+    def __init__(self):
+        self.sessions = SessionStore(on_drop=lambda session_id: get_agent_factory().drop_session(session_id))
+        self.limiter = TurnLimiter()
+        self.ready = False
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+        self.started_at = time.time()
+        self.counts = {"turns": 0, "turn_errors": 0, "client_disconnects": 0}
+        self.tokens = {"prompt_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0, "completion_tokens": 0}
+
+    async def warm_up(self):
+        # Clients, the embedding model and the DnB name index are built off the event loop, so
+        # /healthz answers straight away and /readyz flips once the first turn would be warm
+        warmup = start_warmup()
+        await asyncio.to_thread(warmup.wait)
+        self.warmup_seconds = warmup.total_seconds
+        if warmup.errors:
+            self.warmup_error = "; ".join(f"{stage}: {error}" for stage, error in warmup.errors.items())
+            logger.error("Warm-up failed: %s", self.warmup_error)
+        # Turns can run without a warm embedding model or name index, but not without the clients
+        self.ready = "aws_clients" not in warmup.errors
+
+    def record_turn(self, metrics: dict):
+        self.counts["turns"] += 1
+        for key in self.tokens:
+            self.tokens[key] += metrics.get(key, 0)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    app.state.service = ServiceState()
+    warm_up = asyncio.create_task(app.state.service.warm_up())
+    yield
+    warm_up.cancel()
+
+
+def _state(request: Request) -> ServiceState:
+    return request.app.state.service
+
+
+def _error(status_code: int, message: str, headers: Optional[dict] = None) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status_code, headers=headers)
+
+
+async def _body(request: Request) -> dict:
+    raw = await request.body()
+    if not raw:
+        return {}
+    try:
+        body = json.loads(raw)
+    except json.JSONDecodeError:
+        return {"_invalid": True}
+    return body if isinstance(body, dict) else {"_invalid": True}
+
+
+def _document_error(body: dict) -> Optional[JSONResponse]:
+    if body.get("_invalid"):
+        return _error(400, "Body must be a JSON object")
+    if body.get("upload_mode") not in (None, *UPLOAD_MODES):
+        return _error(400, f"upload_mode must be one of {', '.join(UPLOAD_MODES)}")
+    if body.get("claim_text") is not None and not isinstance(body["claim_text"], str):
+        return _error(400, "claim_text must be a string")
+    return None
+
+
+async def create_session(request: Request) -> JSONResponse:
+    body = await _body(request)
+    error = _document_error(body)
+    if error is not None:
+        return error
+    session = _state(request).sessions.create(body.get("claim_text"), body.get("upload_mode"))
+    return JSONResponse(session.summary(), status_code=201)
+
+
+async def get_session(request: Request) -> JSONResponse:
+    session = _state(request).sessions.get(request.path_params["session_id"])
+    if session is None:
+        return _error(404, "Unknown session")
+    return JSONResponse(session.summary())
+
+
+async def delete_session(request: Request) -> JSONResponse:
+    if not _state(request).sessions.drop(request.path_params["session_id"]):
+        return _error(404, "Unknown session")
+    return JSONResponse({"deleted": True})
+
+
+async def put_document(request: Request) -> JSONResponse:
+    session = _state(request).sessions.get(request.path_params["session_id"])
+    if session is None:
+        return _error(404, "Unknown session")
+    body = await _body(request)
+    error = _document_error(body)
+    if error is not None:
+        return error
+    if session.lock.locked():
+        return _error(409, "A turn is in progress for this session")
+    session.set_document(body.get("claim_text"), body.get("upload_mode"))
+    return JSONResponse(session.summary())
+
+
+async def _run_turn(state: ServiceState, session: ServiceSession, message: str):
+    user_input = message
+    if session.claim_text and not session.document_sent:
+        user_input = with_document(message, session.claim_text, session.upload_mode)
+    async for event in main_stream(user_input, session.thread, session.claim_text, session.session_id):
+        if event.type == "done":
+            session.thread = event.data.thread
+            session.document_sent = True
+            session.turns += 1
+            session.last_used = time.monotonic()
+            state.record_turn(event.data.metrics)
+        yield event
+
+
+async def post_turn(request: Request):
+    state = _state(request)
+    session = state.sessions.get(request.path_params["session_id"])
+    if session is None:
+        return _error(404, "Unknown session")
+    body = await _body(request)
+    message = body.get("message")
+    if not isinstance(message, str) or not message.strip():
+        return _error(400, "message must be a non-empty string")
+    if session.lock.locked():
+        return _error(409, "A turn is in progress for this session")
+
+    # Admission happens before any response is started, so overload is a plain 429/503 with Retry-After
+    stack = AsyncExitStack()
+    await stack.enter_async_context(session.lock)
+    try:
+        await stack.enter_async_context(state.limiter.slot())
+    except TurnRejected as rejected:
+        await stack.aclose()
+        status_code = 429 if rejected.reason == "queue_full" else 503
+        return _error(status_code, str(rejected), {"Retry-After": str(rejected.retry_after_seconds)})
+
+    stream = request.query_params.get("stream") == "1" or "text/event-stream" in request.headers.get("accept", "")
+    if not stream:
+        async with stack:
+            done = None
+            try:
+                async for event in _run_turn(state, session, message):
+                    if event.type == "done":
+                        done = event
+            except Exception as error:
+                state.counts["turn_errors"] += 1
+                logger.exception("Turn failed")
+                return _error(500, repr(error))
+        return JSONResponse(json.loads(dumps(event_payload(done)["data"])))
+
+    async def events():
+        # Released as soon as the turn ends, before the client sees the end of the stream
+        try:
+            async for event in _run_turn(state, session, message):
+                yield {"event": event.type, "data": dumps(event_payload(event))}
+        except asyncio.CancelledError:
+            state.counts["client_disconnects"] += 1
+            raise
+        except Exception as error:
+            state.counts["turn_errors"] += 1
+            logger.exception("Turn failed")
+            yield {"event": "error", "data": dumps({"error": repr(error)})}
+        finally:
+            await stack.aclose()
+
+    return TurnEventSourceResponse(events(), stack, ping=SSE_PING_SECONDS, send_timeout=SSE_SEND_TIMEOUT_SECONDS)
+
+
+async def healthz(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok"})
+
+
+async def readyz(request: Request) -> JSONResponse:
+    state = _state(request)
+    body = {"ready": state.ready, "warmup_seconds": state.warmup_seconds, "warmup_error": state.warmup_error}
+    # Saturated instances report not ready so the load balancer sends new sessions elsewhere
+    saturated = state.limiter.queued >= state.limiter.max_queued
+    return JSONResponse({**body, "saturated": saturated}, status_code=200 if state.ready and not saturated else 503)
+
+
+async def metrics(request: Request) -> JSONResponse:
+    state = _state(request)
+    factory = get_agent_factory()
+    report = {
+        "uptime_seconds": round(time.time() - state.started_at, 1),
+        "ready": state.ready,
+        "limiter": state.limiter.stats(),
+        **state.counts,
+        "tokens": state.tokens,
+        "sessions": state.sessions.stats(),
+        "cached_agents": factory.session_count(),
+        "warmup": get_warmup().report(),
+        "extraction_cache": get_extraction_cache().stats(),
+        "answer_cache": get_answer_cache().stats(),
+    }
+    if state.ready:
+        report["sagemaker"] = factory.services.sagemaker.latency_stats()
+    return JSONResponse(json.loads(dumps(report)))
+
+
+routes = [
+    Route("/healthz", healthz),
+    Route("/readyz", readyz),
+    Route("/metrics", metrics),
+    Route("/sessions", create_session, methods=["POST"]),
+    Route("/sessions/{session_id}", get_session, methods=["GET"]),
+    Route("/sessions/{session_id}", delete_session, methods=["DELETE"]),
+    Route("/sessions/{session_id}/document", put_document, methods=["PUT"]),
+    Route("/sessions/{session_id}/turns", post_turn, methods=["POST"]),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.environ.get("HOST", "127.0.0.1"), port=int(os.environ.get("PORT", 8000)))
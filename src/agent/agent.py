@@ -1,20 +1,19 @@
+import hashlib
+from typing import Optional
 
-
-import boto3
-import streamlit as st
 from semantic_kernel import Kernel
 from semantic_kernel.agents import ChatCompletionAgent
 from semantic_kernel.functions import KernelArguments
 from semantic_kernel.connectors.ai.bedrock.bedrock_prompt_execution_settings import BedrockChatPromptExecutionSettings
-from semantic_kernel.connectors.ai.bedrock.services.bedrock_chat_completion import BedrockChatCompletion
 from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
+from semantic_kernel.filters.filter_types import FilterTypes
 
-from src.kernel_functions.failure_score_checker import FailureScoreChecker
-from src.kernel_functions.risk_evaluator import RiskEvaluator
-from src.kernel_functions.insurance_premium_estimator import InsurancePremiumEstimator
+from src.agent.agent_services import SharedServices, create_shared_services
+from src.agent.tool_call_limiter import ToolCallLimiter
+from src.agent.tracing_filter import trace_kernel_function
 from src.kernel_functions.vector_memory_rag_plugin import VectorMemoryRAGPlugin
-from src.kernel_functions.structure_claim_data import StructureClaimData
-from src.kernel_functions.mock_insurance_premium_estimator import MockInsurancePremiumEstimator
+from src.kernel_functions.structure_claim_data import PROMPT_VERSION, StructureClaimData
+from src.services.document_reference import document_id_for, document_metadata
 
 AGENT_INSTRUCTIONS = """You are an expert insurance underwriting consultant. Your name, if asked, is 'IUA'.
  
@@ -26,6 +25,7 @@ You may be asked to:
 - Reference insights from a database to assist underwriting decisions
  
 If a large document has been pasted into the chat, use StructureClaimData to structure its contents and use the output for any function that takes a `claim_data` parameter.
+If the chat only references an uploaded document by id (e.g. `doc-1a2b3c4d5e6f`), call StructureClaimData with that document_id instead, and use retrieve_chunks to look up any other details from the document.
  
 Keep responses brief—no more than a few paragraphs—and always respond only to what the user has asked, when they ask it. 
 For example 
@@ -34,39 +34,53 @@ For example
 - If they only ask for insights from the database do not give risk or insurance premium scores.
 """
 
-def make_agent(claim_text):
-    kernel = Kernel()
-    runtime_client=boto3.client(
-        "bedrock-runtime",
-        aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],
-        aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"],
-        region_name=st.secrets["AWS_REGION"]
+def answer_signature(services: SharedServices) -> str:
+    # Everything besides the document and question that shapes an answer; cached answers made under
+    # another chat model, instructions or SageMaker / DynamoDB source are not reused
+    parts = (
+        services.chat_completion.ai_model_id,
+        AGENT_INSTRUCTIONS,
+        PROMPT_VERSION,
+        services.risk_evaluator.endpoint_name,
+        services.premium_estimator.endpoint_name,
+        services.failure_score_checker.table_name,
     )
-    client=boto3.client(
-        "bedrock",
-        aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],
-        aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"],
-        region_name=st.secrets["AWS_REGION"]
-    )
-    kernel.add_service(BedrockChatCompletion(
-        model_id="anthropic.claude-3-7-sonnet-20250219-v1:0",
-        runtime_client=runtime_client, client=client
-    ))
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
 
 
+def make_rag_plugin(services: SharedServices, claim_text: Optional[str]) -> VectorMemoryRAGPlugin:
     # 👉 Keep RAG setup for policy lookup
-    vector_memory_rag = VectorMemoryRAGPlugin()
+    vector_memory_rag = VectorMemoryRAGPlugin(embeddings=services.embeddings)
     if claim_text:
-        vector_memory_rag.add_document(claim_text)
+        vector_memory_rag.add_document(
+            claim_text, document_id=document_id_for(claim_text), metadata=document_metadata(claim_text)
+        )
+    return vector_memory_rag
+
+
+def make_agent(
+    claim_text: Optional[str],
+    services: Optional[SharedServices] = None,
+    vector_memory_rag: Optional[VectorMemoryRAGPlugin] = None
+) -> ChatCompletionAgent:
+    # Without shared services this is a cold build: new clients and a freshly loaded embedding model
+    services = services or create_shared_services()
+    vector_memory_rag = vector_memory_rag or make_rag_plugin(services, claim_text)
+
+    kernel = Kernel()
+    kernel.add_service(services.chat_completion)
 
     # --- Register plugins
-    kernel.add_plugin( FailureScoreChecker(), plugin_name="FailureScoreChecker")   
+    kernel.add_plugin(services.failure_score_checker, plugin_name="FailureScoreChecker")
     kernel.add_plugin(vector_memory_rag, plugin_name="VectorMemoryRAG")
-    kernel.add_plugin(RiskEvaluator(), plugin_name="RiskModel")
-    kernel.add_plugin(MockInsurancePremiumEstimator(), plugin_name="PremiumEstimator")
-    kernel.add_plugin(StructureClaimData(kernel), plugin_name="StructureClaimData")
+    kernel.add_plugin(services.risk_evaluator, plugin_name="RiskModel")
+    kernel.add_plugin(services.premium_estimator, plugin_name="PremiumEstimator")
+    documents = {document_id_for(claim_text): claim_text} if claim_text else None
+    kernel.add_plugin(StructureClaimData(kernel, documents=documents), plugin_name="StructureClaimData")
 
-    
+    # Independent calls from one model response run concurrently, capped and with timeouts
+    kernel.add_filter(FilterTypes.AUTO_FUNCTION_INVOCATION, ToolCallLimiter())
+    kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, trace_kernel_function)
 
     agent = ChatCompletionAgent(
         kernel=kernel,
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from semantic_kernel.agents import ChatCompletionAgent
+
+from src.agent.agent import make_agent, make_rag_plugin
+from src.agent.agent_services import SharedServices, create_shared_services
+
+MAX_CACHED_SESSIONS = 64
+
+
+def fingerprint_text(text: Optional[str]) -> Optional[str]:
+    if not text:
+        return None
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class AgentSession:
+    agent: ChatCompletionAgent
+    claim_fingerprint: Optional[str]
+
+
+class AgentFactory:
+    def __init__(
+        self,
+        max_sessions: int = MAX_CACHED_SESSIONS,
+        create_services: Callable[[], SharedServices] = create_shared_services
+    ):
+        self.max_sessions = max_sessions
+        self.create_services = create_services
+        self._services: Optional[SharedServices] = None
+        self._services_lock = threading.Lock()
+        self._sessions: "OrderedDict[str, AgentSession]" = OrderedDict()
+        self._sessions_lock = threading.Lock()
+
+    @property
+    def services(self) -> SharedServices:
+        # Built once per process; every session reuses the same clients and embedding model
+        if self._services is None:
+            with self._services_lock:
+                if self._services is None:
+                    self._services = self.create_services()
+        return self._services
+
+    def create_agent(self, claim_text: Optional[str]) -> ChatCompletionAgent:
+        services = self.services
+        return make_agent(claim_text, services, make_rag_plugin(services, claim_text))
+
+    def get_agent(self, session_id: Optional[str], claim_text: Optional[str]) -> ChatCompletionAgent:
+        if session_id is None:
+            return self.create_agent(claim_text)
+
+        claim_fingerprint = fingerprint_text(claim_text)
+        with self._sessions_lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.claim_fingerprint == claim_fingerprint:
+                self._sessions.move_to_end(session_id)
+                return session.agent
+
+        # Per-session state (RAG index, claim data) is rebuilt only when the document changes
+        agent = self.create_agent(claim_text)
+        with self._sessions_lock:
+            self._sessions[session_id] = AgentSession(agent=agent, claim_fingerprint=claim_fingerprint)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return agent
+
+    def drop_session(self, session_id: str):
+        with self._sessions_lock:
+            self._sessions.pop(session_id, None)
+
+    def session_count(self) -> int:
+        with self._sessions_lock:
+            return len(self._sessions)
+
+
+_factory: Optional[AgentFactory] = None
+_factory_lock = threading.Lock()
+
+
+def set_agent_factory(factory: Optional[AgentFactory]):
+    # Swaps the process-wide factory, e.g. for one wired to local stand-ins
+    global _factory
+    with _factory_lock:
+        _factory = factory
+
+
+def get_agent_factory() -> AgentFactory:
+    global _factory
+    if _factory is None:
+        with _factory_lock:
+            if _factory is None:
+                _factory = AgentFactory()
+    return _factory
@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import streamlit as st
+from semantic_kernel.connectors.ai.bedrock.services.bedrock_chat_completion import BedrockChatCompletion
+
+from src.services.bedrock_chat_completion import BedrockStreamingChatCompletion
+from src.services.embedding_service import EmbeddingService, get_embedding_service
+from src.services.lazy_imports import lazy_import
+from src.services.sagemaker_client import AsyncSageMakerRuntime
+from src.kernel_functions.failure_score_checker import DNB_REGION, FailureScoreChecker
+from src.kernel_functions.risk_evaluator import RiskEvaluator
+from src.kernel_functions.mock_insurance_premium_estimator import MockInsurancePremiumEstimator
+
+boto3 = lazy_import("boto3")
+botocore_config = lazy_import("botocore.config")
+
+CHAT_MODEL_ID = "anthropic.claude-3-7-sonnet-20250219-v1:0"
+
+# boto3 clients are thread-safe, so one pool is shared by every Streamlit session
+AWS_CLIENT_OPTIONS = {
+    "max_pool_connections": 32,
+    "retries": {"max_attempts": 3, "mode": "adaptive"},
+}
+
+
+@dataclass
+class SharedServices:
+    chat_completion: BedrockChatCompletion
+    sagemaker: AsyncSageMakerRuntime
+    embeddings: EmbeddingService
+    failure_score_checker: FailureScoreChecker
+    risk_evaluator: RiskEvaluator
+    premium_estimator: MockInsurancePremiumEstimator
+
+
+def aws_credentials() -> dict:
+    # Streamlit secrets when configured; headless workers (server.py) use boto3's default chain
+    # (environment variables, instance or task role) instead
+    if not st.secrets.load_if_toml_exists():
+        return {}
+    return {
+        "aws_access_key_id": st.secrets["AWS_ACCESS_KEY_ID"],
+        "aws_secret_access_key": st.secrets["AWS_SECRET_ACCESS_KEY"],
+        "region_name": st.secrets["AWS_REGION"],
+    }
+
+
+def aws_client_config():
+    # Built on first use so importing this module does not load botocore
+    return botocore_config.Config(**AWS_CLIENT_OPTIONS)
+
+
+def make_bedrock_client(service_name: str):
+    return boto3.client(service_name, config=aws_client_config(), **aws_credentials())
+
+
+def create_shared_services(
+    bedrock_runtime=None,
+    bedrock=None,
+    sagemaker_client=None,
+    dynamodb=None,
+    embeddings: Optional[EmbeddingService] = None
+) -> SharedServices:
+    # Any client left out is the real AWS one; benchmarks pass local stand-ins
+    chat_completion = BedrockStreamingChatCompletion(
+        model_id=CHAT_MODEL_ID,
+        runtime_client=bedrock_runtime or make_bedrock_client("bedrock-runtime"),
+        client=bedrock or make_bedrock_client("bedrock"),
+    )
+    sagemaker = AsyncSageMakerRuntime(client=sagemaker_client)
+    dynamodb = dynamodb or boto3.client("dynamodb", region_name=DNB_REGION, config=aws_client_config())
+
+    # Stateless plugins hold nothing but clients, so a single instance serves every session
+    return SharedServices(
+        chat_completion=chat_completion,
+        sagemaker=sagemaker,
+        embeddings=embeddings or get_embedding_service(),
+        failure_score_checker=FailureScoreChecker(client=dynamodb),
+        risk_evaluator=RiskEvaluator(runtime=sagemaker.client),
+        premium_estimator=MockInsurancePremiumEstimator(runtime=sagemaker.client),
+    )
@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+from typing import Optional, Any
+
+@dataclass
+class AgentStreamEvent:
+    type: str  # "text", "function_call", "function_result", "usage" or "done"
+    content: Optional[str] = None
+    name: Optional[str] = None
+    data: Optional[Any] = None
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, Sequence, Set, TextIO
+
+from semantic_kernel import Kernel
+from semantic_kernel.filters.filter_types import FilterTypes
+from semantic_kernel.filters.functions.function_invocation_context import FunctionInvocationContext
+
+from src.agent.agent_services import SharedServices
+from src.kernel_functions.insurance_premium_estimator import InsurancePremiumEstimator
+from src.kernel_functions.structure_claim_data import CLAIM_FIELDS, StructureClaimData, parse_claim_json
+from src.services.extraction_cache import ExtractionCache, get_extraction_cache
+from src.services.metrics import LatencyHistogram
+
+# --- Bulk underwriting without the chat loop: extraction, then the selected models, per submission
+BATCH_WORKERS = 8
+# Submissions read ahead of the workers; bounds memory however large the input is
+BATCH_READ_AHEAD = 2
+MODELS = ("failure_score", "risk", "premium", "premium_endpoint")
+DEFAULT_MODELS = ("failure_score", "risk", "premium")
+SUBMISSION_SUFFIXES = (".txt", ".md")
+
+
+@dataclass
+class Submission:
+    submission_id: str
+    load: Callable[[], str]
+
+
+def _invalid(message: str) -> Callable[[], str]:
+    def load() -> str:
+        raise ValueError(message)
+    return load
+
+
+def parse_submission_line(line: str, line_number: int) -> Submission:
+    # A line that is not a JSON object with a string "claim_text" still becomes a submission, whose
+    # load raises, so it is recorded as an error instead of stopping the batch
+    submission_id = f"line-{line_number}"
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as error:
+        return Submission(submission_id, _invalid(f"Line {line_number} is not valid JSON: {error}"))
+    if not isinstance(record, dict):
+        return Submission(submission_id, _invalid(f"Line {line_number} is not a JSON object"))
+    submission_id = str(record.get("id") or submission_id)
+    claim_text = record.get("claim_text")
+    if not isinstance(claim_text, str):
+        return Submission(submission_id, _invalid(f"Line {line_number} has no \"claim_text\" string"))
+    return Submission(submission_id, lambda: claim_text)
+
+
+def iter_submissions(path: str) -> Iterator[Submission]:
+    # A directory yields one submission per text file (read when a worker picks it up); a JSONL
+    # file yields one per line with "claim_text" and an optional "id"
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(SUBMISSION_SUFFIXES):
+                    file_path = os.path.join(root, name)
+
+                    def load(file_path=file_path) -> str:
+                        with open(file_path, encoding="utf-8", errors="replace") as f:
+                            return f.read()
+                    yield Submission(os.path.relpath(file_path, path), load)
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            yield parse_submission_line(line, line_number)
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    # The output file is the checkpoint: every submission with an "ok" line is done ("partial" and
+    # "error" ones are retried). A line cut short by a crash is dropped so the resumed run appends after a clean newline.
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[: data.rfind(b"\n") + 1]
+    done = set()
+    for line in data.decode("utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if record.get("status") == "ok":
+            done.add(record["id"])
+    return done
+
+
+class TokenMeter:
+    # FUNCTION_INVOCATION filter adding up Bedrock usage from prompt functions (the extraction prompt)
+    def __init__(self):
+        self.totals = {"llm_calls": 0, "prompt_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0, "completion_tokens": 0}
+
+    async def __call__(self, context: FunctionInvocationContext, next):
+        await next(context)
+        if not context.function.metadata.is_prompt or context.result is None:
+            return
+        for message in context.result.value or []:
+            usage = getattr(message, "metadata", {}).get("usage")
+            if usage is None:
+                continue
+            self.totals["llm_calls"] += 1
+            self.totals["prompt_tokens"] += usage.prompt_tokens or 0
+            self.totals["completion_tokens"] += usage.completion_tokens or 0
+            self.totals["cache_read_tokens"] += getattr(usage, "cache_read_tokens", 0)
+            self.totals["cache_write_tokens"] += getattr(usage, "cache_write_tokens", 0)
+
+
+class BatchPipeline:
+    def __init__(
+        self,
+        services: SharedServices,
+        models: Sequence[str] = DEFAULT_MODELS,
+        workers: int = BATCH_WORKERS,
+        cache: Optional[ExtractionCache] = None,
+        progress: Optional[TextIO] = sys.stderr,
+        progress_every: int = 50
+    ):
+        unknown = set(models) - set(MODELS)
+        if unknown:
+            raise ValueError(f"Unknown models: {', '.join(sorted(unknown))}")
+        self.services = services
+        self.models = tuple(models)
+        self.workers = workers
+        self.progress = progress
+        self.progress_every = progress_every
+        self.tokens = TokenMeter()
+        kernel = Kernel()
+        kernel.add_service(services.chat_completion)
+        kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, self.tokens)
+        self.cache = cache or get_extraction_cache()
+        self.structure = StructureClaimData(kernel, cache=self.cache)
+        self.premium_endpoint = InsurancePremiumEstimator(runtime=services.sagemaker)
+        self.latency = LatencyHistogram()
+        self.counts = {"ok": 0, "partial": 0, "error": 0, "skipped": 0}
+
+    def _model_calls(self, claim_data: dict) -> Dict[str, Callable]:
+        calls = {
+            "failure_score": lambda: self.services.failure_score_checker.retrieve_failure_rating(claim_data),
+            "risk": lambda: self.services.risk_evaluator.assess_risk(claim_data),
+            "premium": lambda: self.services.premium_estimator.estimate_size(claim_data),
+            "premium_endpoint": lambda: self.premium_endpoint.estimate_size(claim_data),
+        }
+        return {name: calls[name] for name in self.models}
+
+    async def process(self, submission: Submission) -> dict:
+        started = time.perf_counter()
+        record = {"id": submission.submission_id}
+        try:
+            claim_text = await asyncio.to_thread(submission.load)
+            raw = await self.structure.StructureClaimData(claim_text)
+            claim_data = parse_claim_json(raw)
+            if claim_data is None:
+                raise ValueError(f"Extraction did not return JSON: {raw[:200]}")
+            record["claim_data"] = {field: claim_data[field] for field in CLAIM_FIELDS}
+
+            # The models only depend on claim_data, so they run side by side; one failing does not
+            # lose the others, but leaves the submission to be retried on --resume
+            calls = self._model_calls(claim_data)
+            outcomes = await asyncio.gather(*(call() for call in calls.values()), return_exceptions=True)
+            record["models"] = {
+                name: {"error": repr(outcome)} if isinstance(outcome, Exception) else outcome
+                for name, outcome in zip(calls, outcomes)
+            }
+            record["status"] = "partial" if any(isinstance(outcome, Exception) for outcome in outcomes) else "ok"
+        except Exception as error:
+            record["status"] = "error"
+            record["error"] = repr(error)
+        record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self.latency.record(record["elapsed_ms"])
+        return record
+
+    async def run(self, input_path: str, output_path: str, resume: bool = False, limit: Optional[int] = None) -> dict:
+        done = completed_ids(output_path) if resume else set()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * BATCH_READ_AHEAD)
+        cache_before = self.cache.stats()
+        started = time.perf_counter()
+
+        async def produce():
+            queued = 0
+            for submission in iter_submissions(input_path):
+                if submission.submission_id in done:
+                    self.counts["skipped"] += 1
+                    continue
+                if limit is not None and queued >= limit:
+                    break
+                await queue.put(submission)
+                queued += 1
+            for _ in range(self.workers):
+                await queue.put(None)
+
+        async def work(output: TextIO):
+            while True:
+                submission = await queue.get()
+                if submission is None:
+                    return
+                record = await self.process(submission)
+                # Written and flushed as each submission finishes, so a crash loses at most the ones in flight
+                output.write(json.dumps(record, default=str) + "\n")
+                output.flush()
+                self.counts[record["status"]] += 1
+                finished = self.counts["ok"] + self.counts["partial"] + self.counts["error"]
+                if self.progress is not None and finished % self.progress_every == 0:
+                    rate = finished / (time.perf_counter() - started)
+                    print(f"{finished} done ({self.counts['error']} errors), {rate:.1f}/s", file=self.progress, flush=True)
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with open(output_path, "a" if resume else "w", encoding="utf-8") as output:
+            tasks = [asyncio.ensure_future(produce())]
+            tasks.extend(asyncio.ensure_future(work(output)) for _ in range(self.workers))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                # If any of them failed, the rest are stopped before the output file is closed
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        wall_seconds = time.perf_counter() - started
+        processed = self.counts["ok"] + self.counts["partial"] + self.counts["error"]
+        cache_after = self.cache.stats()
+        return {
+            "processed": processed,
+            **self.counts,
+            "workers": self.workers,
+            "models": list(self.models),
+            "wall_seconds": round(wall_seconds, 3),
+            "submissions_per_second": round(processed / wall_seconds, 2) if wall_seconds else 0.0,
+            "latency": self.latency.snapshot(),
+            "tokens": dict(self.tokens.totals),
+            "extraction_cache": {key: cache_after[key] - cache_before[key] for key in ("hits", "misses", "stores")},
+        }
@@ -0,0 +1,194 @@
+import json
+import os
+from typing import List, Optional, Tuple
+
+from semantic_kernel.agents import ChatHistoryAgentThread
+from semantic_kernel.contents import ChatMessageContent, FunctionCallContent, FunctionResultContent, TextContent
+from semantic_kernel.contents.history_reducer.chat_history_reducer import ChatHistoryReducer
+from semantic_kernel.contents.utils.author_role import AuthorRole
+
+# Prompt budget for the replayed history (the agent instructions and tool schemas come on top)
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", 6000))
+# The latest turns are replayed verbatim so follow-up questions keep their full context
+KEEP_RECENT_TURNS = 1
+# Older function results / user messages above this are replaced with a digest
+MAX_RESULT_TOKENS = 200
+MAX_USER_MESSAGE_TOKENS = 300
+MAX_SUMMARY_TOKENS = 800
+# Results that later tool calls depend on are never compacted; they are carried into the summary instead
+PRESERVED_FUNCTIONS = ("StructureClaimData",)
+
+SUMMARY_MARKER = "history_summary"
+SUMMARY_HEADER = "Summary of the earlier conversation (older turns were condensed to save tokens):"
+SUMMARY_ACK = "Understood, I will use this summary as context."
+
+
+def estimate_tokens(text: str) -> int:
+    # Same rough ratio used elsewhere when a connector reports no usage
+    return len(text) // 4
+
+
+def _item_text(item) -> str:
+    if isinstance(item, TextContent):
+        return item.text or ""
+    if isinstance(item, FunctionCallContent):
+        arguments = item.arguments
+        return f"{item.name}{arguments if isinstance(arguments, str) else json.dumps(arguments, default=str)}"
+    if isinstance(item, FunctionResultContent):
+        return str(item.result)
+    return ""
+
+
+def message_tokens(message: ChatMessageContent) -> int:
+    # A few tokens of per-message framing on top of the content
+    return 4 + sum(estimate_tokens(_item_text(item)) for item in message.items)
+
+
+def _shorten(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    head, tail = text[: max_chars * 3 // 4], text[-max_chars // 4:]
+    return f"{head} [... {len(text) - len(head) - len(tail)} chars omitted ...] {tail}"
+
+
+def digest_result(result, max_tokens: int = MAX_RESULT_TOKENS) -> str:
+    # JSON objects keep every key with short values shortened; anything else keeps its head and tail
+    text = str(result)
+    try:
+        data = json.loads(text) if isinstance(result, str) else result
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        budget = max(8, max_tokens // max(len(data), 1))
+        text = json.dumps({key: _shorten(str(value), budget) for key, value in data.items()}, default=str)
+    return _shorten(text, max_tokens)
+
+
+def _is_turn_start(message: ChatMessageContent) -> bool:
+    return (
+        message.role == AuthorRole.USER
+        and not (message.metadata or {}).get(SUMMARY_MARKER)
+        and any(isinstance(item, TextContent) for item in message.items)
+    )
+
+
+def _is_preserved(result: FunctionResultContent) -> bool:
+    return (result.plugin_name or result.function_name or "") in PRESERVED_FUNCTIONS or any(
+        (result.name or "").startswith(name) for name in PRESERVED_FUNCTIONS
+    )
+
+
+class TokenBudgetReducer(ChatHistoryReducer):
+    # Compacts first (old tool results, pasted documents), then drops the oldest whole turns into a
+    # running text summary. Whole turns go together so every toolUse keeps its toolResult.
+    target_count: int = 1
+    token_budget: int = HISTORY_TOKEN_BUDGET
+    keep_recent_turns: int = KEEP_RECENT_TURNS
+    max_result_tokens: int = MAX_RESULT_TOKENS
+    max_user_message_tokens: int = MAX_USER_MESSAGE_TOKENS
+    max_summary_tokens: int = MAX_SUMMARY_TOKENS
+    total_tokens_saved: int = 0
+    last_reduction: dict = {}
+
+    def history_tokens(self) -> int:
+        return sum(message_tokens(message) for message in self.messages)
+
+    def _turns(self) -> Tuple[List[ChatMessageContent], List[List[ChatMessageContent]]]:
+        prefix, turns = [], []
+        for message in self.messages:
+            if _is_turn_start(message):
+                turns.append([message])
+            elif turns:
+                turns[-1].append(message)
+            else:
+                prefix.append(message)
+        return prefix, turns
+
+    def _compact(self, turn: List[ChatMessageContent]):
+        for message in turn:
+            if _is_turn_start(message) and message_tokens(message) > self.max_user_message_tokens:
+                message.content = _shorten(message.content or "", self.max_user_message_tokens)
+                continue
+            for index, item in enumerate(message.items):
+                if (
+                    isinstance(item, FunctionResultContent)
+                    and not _is_preserved(item)
+                    and estimate_tokens(str(item.result)) > self.max_result_tokens
+                ):
+                    message.items[index] = item.model_copy(update={"result": digest_result(item.result, self.max_result_tokens)})
+
+    def _summarise(self, previous: Optional[str], dropped: List[List[ChatMessageContent]]) -> str:
+        lines = previous.splitlines()[1:] if previous else []
+        for turn in dropped:
+            for message in turn:
+                if _is_turn_start(message):
+                    lines.append(f"- User asked: {_shorten(message.content or '', 60)}")
+                elif message.role == AuthorRole.ASSISTANT and message.content:
+                    lines.append(f"- Assistant answered: {_shorten(message.content, 80)}")
+                for item in message.items:
+                    if isinstance(item, FunctionResultContent) and _is_preserved(item):
+                        # claim_data stays verbatim (latest only): later tool calls are built from it
+                        lines = [line for line in lines if "claim_data:" not in line]
+                        lines.append(f"- {item.name} returned claim_data: {item.result}")
+                    elif isinstance(item, FunctionResultContent):
+                        lines.append(f"- {item.name} returned: {digest_result(item.result, 40)}")
+        # Oldest lines go first once the summary itself is over budget, except the claim_data ones
+        while sum(estimate_tokens(line) for line in lines) > self.max_summary_tokens and len(lines) > 1:
+            droppable = next((i for i, line in enumerate(lines) if "claim_data:" not in line), None)
+            if droppable is None:
+                break
+            lines.pop(droppable)
+        return "\n".join([SUMMARY_HEADER, *lines])
+
+    async def reduce(self) -> Optional["TokenBudgetReducer"]:
+        before = self.history_tokens()
+        self.last_reduction = {"tokens_before": before, "tokens_after": before, "tokens_saved": 0, "turns_dropped": 0}
+        if before <= self.token_budget:
+            return None
+
+        prefix, turns = self._turns()
+        older = turns[:-self.keep_recent_turns] if self.keep_recent_turns else turns
+        for turn in older:
+            self._compact(turn)
+
+        dropped = []
+        tokens = sum(message_tokens(m) for m in prefix) + sum(message_tokens(m) for turn in turns for m in turn)
+        while tokens > self.token_budget and len(dropped) < len(older):
+            turn = older[len(dropped)]
+            dropped.append(turn)
+            tokens -= sum(message_tokens(m) for m in turn)
+
+        if dropped:
+            previous = next((m.content for m in prefix if (m.metadata or {}).get(SUMMARY_MARKER)), None)
+            summary = self._summarise(previous, dropped)
+            prefix = [
+                ChatMessageContent(role=AuthorRole.USER, content=summary, metadata={SUMMARY_MARKER: True}),
+                ChatMessageContent(role=AuthorRole.ASSISTANT, content=SUMMARY_ACK, metadata={SUMMARY_MARKER: True}),
+            ]
+        kept = [message for turn in turns[len(dropped):] for message in turn]
+        self.messages[:] = prefix + kept
+
+        after = self.history_tokens()
+        self.total_tokens_saved += before - after
+        self.last_reduction = {
+            "tokens_before": before,
+            "tokens_after": after,
+            "tokens_saved": before - after,
+            "turns_dropped": len(dropped),
+        }
+        return self
+
+
+class BudgetedChatHistoryAgentThread(ChatHistoryAgentThread):
+    # A ChatHistoryAgentThread whose history is trimmed to a token budget before each turn
+    def __init__(self, reducer: Optional[TokenBudgetReducer] = None, thread_id: Optional[str] = None):
+        self.reducer = reducer if reducer is not None else TokenBudgetReducer()
+        super().__init__(chat_history=self.reducer, thread_id=thread_id)
+        # An empty history is falsy, so the base class would swap it for a plain ChatHistory
+        self._chat_history = self.reducer
+
+    async def reduce_for_turn(self) -> dict:
+        if self.id is not None:
+            await self.reduce()
+        return {**self.reducer.last_reduction, "total_tokens_saved": self.reducer.total_tokens_saved}
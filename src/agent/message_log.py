@@ -0,0 +1,142 @@
+import json
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.agent.agent_message import AgentMessage
+
+# Bodies longer than this (pasted documents, DnB results, tool arguments carrying claim text) are kept
+# compressed and shown as a preview until someone asks for the full text
+INLINE_MAX_CHARS = 2000
+PREVIEW_CHARS = 600
+# Compressed bytes kept per session; past this the oldest bodies are dropped and only previews remain
+MAX_PAYLOAD_BYTES = 4 * 1024 * 1024
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "cache_read_tokens", "cache_write_tokens")
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    try:
+        return json.dumps(value, indent=2, default=str)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def step_kind(message: AgentMessage) -> str:
+    if message.function_call:
+        return "function"
+    if message.function_response:
+        return "result"
+    return message.role.lower()
+
+
+def compact_usage(usage: Any) -> Dict[str, int]:
+    # The usage objects are pydantic models; only their counters are worth keeping
+    return {key: getattr(usage, key, 0) or 0 for key in USAGE_FIELDS}
+
+
+@dataclass(slots=True)
+class StoredMessage:
+    role: str
+    content: Optional[str] = None
+    name: Optional[str] = None
+    function_call: Optional[Dict[str, Any]] = None
+    function_response: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    # Field name -> payload id for bodies cut down to a preview
+    offloaded: Dict[str, int] = field(default_factory=dict)
+
+
+class MessageLog:
+    # Per-session chat record for the Streamlit app. Totals and the timeline are kept up to date as
+    # messages arrive, so a rerun never walks the whole history to redraw the Diagnostics tab.
+    def __init__(self, max_payload_bytes: int = MAX_PAYLOAD_BYTES):
+        self.max_payload_bytes = max_payload_bytes
+        self.messages: List[StoredMessage] = []
+        self.kinds: List[str] = []
+        self.totals = dict.fromkeys(USAGE_FIELDS, 0)
+        self._payloads: Dict[int, bytes] = {}
+        self._payload_bytes = 0
+        self._next_payload_id = 0
+        self.dropped_payloads = 0
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def _offload(self, text: str) -> int:
+        payload_id = self._next_payload_id
+        self._next_payload_id += 1
+        data = zlib.compress(text.encode("utf-8"), 6)
+        self._payloads[payload_id] = data
+        self._payload_bytes += len(data)
+        # Dicts keep insertion order, so the first key is always the oldest body
+        while self._payload_bytes > self.max_payload_bytes and len(self._payloads) > 1:
+            oldest = next(iter(self._payloads))
+            self._payload_bytes -= len(self._payloads.pop(oldest))
+            self.dropped_payloads += 1
+        return payload_id
+
+    def _compact(self, text: str, name: str, offloaded: Dict[str, int]) -> str:
+        if len(text) <= INLINE_MAX_CHARS:
+            return text
+        offloaded[name] = self._offload(text)
+        return f"{text[:PREVIEW_CHARS]}\n… ({len(text):,} characters in total)"
+
+    def append(self, message: AgentMessage):
+        offloaded: Dict[str, int] = {}
+        metadata = dict(message.metadata or {})
+        if "usage" in metadata:
+            metadata["usage"] = compact_usage(metadata["usage"])
+            for key in USAGE_FIELDS:
+                self.totals[key] += metadata["usage"][key]
+
+        function_call = None
+        if message.function_call:
+            arguments = message.function_call.get("arguments")
+            if len(_as_text(arguments)) > INLINE_MAX_CHARS:
+                arguments = self._compact(_as_text(arguments), "arguments", offloaded)
+            function_call = {"name": message.function_call.get("name"), "arguments": arguments}
+
+        self.messages.append(StoredMessage(
+            role=message.role,
+            content=self._compact(message.content, "content", offloaded) if message.content else message.content,
+            name=message.name,
+            function_call=function_call,
+            function_response=(
+                self._compact(_as_text(message.function_response), "function_response", offloaded)
+                if message.function_response else None
+            ),
+            metadata=metadata,
+            offloaded=offloaded,
+        ))
+        self.kinds.append(step_kind(message))
+
+    def extend(self, messages: Iterable[AgentMessage]):
+        for message in messages:
+            self.append(message)
+
+    def full_text(self, index: int, name: str) -> Optional[str]:
+        # None once the body has been dropped to stay within the payload budget
+        message = self.messages[index]
+        payload_id = message.offloaded.get(name)
+        if payload_id is None:
+            value = message.function_call["arguments"] if name == "arguments" else getattr(message, name)
+            return _as_text(value)
+        data = self._payloads.get(payload_id)
+        return zlib.decompress(data).decode("utf-8") if data is not None else None
+
+    def page_count(self, page_size: int) -> int:
+        return max(1, -(-len(self.messages) // page_size))
+
+    def page(self, page: int, page_size: int) -> List[Tuple[int, StoredMessage]]:
+        start = page * page_size
+        return list(enumerate(self.messages[start:start + page_size], start=start))
+
+    def stats(self) -> dict:
+        return {
+            "messages": len(self.messages),
+            "payloads": len(self._payloads),
+            "payload_bytes": self._payload_bytes,
+            "dropped_payloads": self.dropped_payloads,
+        }
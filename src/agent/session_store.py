@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from semantic_kernel.agents import ChatHistoryAgentThread
+
+from src.services.document_reference import DEFAULT_UPLOAD_MODE
+
+MAX_SERVICE_SESSIONS = int(os.environ.get("MAX_SERVICE_SESSIONS", 1000))
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", 30 * 60))
+
+
+@dataclass
+class ServiceSession:
+    session_id: str
+    claim_text: Optional[str] = None
+    upload_mode: str = DEFAULT_UPLOAD_MODE
+    # The document goes out with the first message after it is set, like the Streamlit app
+    document_sent: bool = False
+    thread: Optional[ChatHistoryAgentThread] = None
+    turns: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    # One turn at a time per session: the thread is appended to as the turn runs
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def set_document(self, claim_text: Optional[str], upload_mode: Optional[str] = None):
+        self.claim_text = claim_text or None
+        self.upload_mode = upload_mode or self.upload_mode
+        self.document_sent = False
+
+    def summary(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "has_document": self.claim_text is not None,
+            "upload_mode": self.upload_mode,
+            "turns": self.turns,
+            "busy": self.lock.locked(),
+        }
+
+
+class SessionStore:
+    # Conversation state per session for the HTTP service; agents and warm resources stay in the
+    # AgentFactory. Idle sessions expire after the TTL and the least recently used go first when full.
+    def __init__(
+        self,
+        max_sessions: int = MAX_SERVICE_SESSIONS,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        on_drop: Optional[Callable[[str], None]] = None
+    ):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.on_drop = on_drop
+        self._sessions: "OrderedDict[str, ServiceSession]" = OrderedDict()
+        self.expired = 0
+        self.evicted = 0
+
+    def _drop(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        if self.on_drop is not None:
+            self.on_drop(session_id)
+
+    def _expire(self):
+        deadline = time.monotonic() - self.ttl_seconds
+        stale = [
+            session_id for session_id, session in self._sessions.items()
+            if session.last_used < deadline and not session.lock.locked()
+        ]
+        for session_id in stale:
+            self._drop(session_id)
+        self.expired += len(stale)
+
+    def _evict(self):
+        # A session in the middle of a turn is never evicted; the store may briefly run over instead
+        idle: List[str] = [session_id for session_id, session in self._sessions.items() if not session.lock.locked()]
+        while len(self._sessions) > self.max_sessions and idle:
+            self._drop(idle.pop(0))
+            self.evicted += 1
+
+    def create(self, claim_text: Optional[str] = None, upload_mode: Optional[str] = None) -> ServiceSession:
+        self._expire()
+        session = ServiceSession(session_id=str(uuid.uuid4()))
+        session.set_document(claim_text, upload_mode)
+        self._sessions[session.session_id] = session
+        self._evict()
+        return session
+
+    def get(self, session_id: str) -> Optional[ServiceSession]:
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def drop(self, session_id: str) -> bool:
+        if session_id not in self._sessions:
+            return False
+        self._drop(session_id)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "busy": sum(session.lock.locked() for session in self._sessions.values()),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from semantic_kernel.filters.auto_function_invocation.auto_function_invocation_context import AutoFunctionInvocationContext
+from semantic_kernel.functions import FunctionResult
+
+# Semantic Kernel already gathers every function call of one model response; this caps how many of
+# them run at once and stops a hung endpoint from holding up the whole turn
+TOOL_CALL_CONCURRENCY = 4
+TOOL_CALL_TIMEOUT_SECONDS = 30.0
+# Per plugin or per "Plugin-function" overrides
+TOOL_CALL_TIMEOUTS = {
+    "StructureClaimData": 60.0,
+}
+
+
+class ToolCallLimiter:
+    def __init__(
+        self,
+        max_concurrency: int = TOOL_CALL_CONCURRENCY,
+        timeout_seconds: float = TOOL_CALL_TIMEOUT_SECONDS,
+        timeouts: Optional[Dict[str, float]] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.timeouts = TOOL_CALL_TIMEOUTS if timeouts is None else timeouts
+        # (chat history, request index) -> [semaphore, calls in flight]; one entry per model response
+        self._turns: Dict[Tuple[int, int], List] = {}
+
+    def timeout_for(self, context: AutoFunctionInvocationContext) -> float:
+        function = context.function
+        return self.timeouts.get(
+            function.fully_qualified_name,
+            self.timeouts.get(function.plugin_name, self.timeout_seconds)
+        )
+
+    async def __call__(self, context: AutoFunctionInvocationContext, next):
+        key = (id(context.chat_history), context.request_sequence_index)
+        turn = self._turns.setdefault(key, [asyncio.Semaphore(self.max_concurrency), 0])
+        turn[1] += 1
+        queued_at = time.time()
+        timed_out = False
+        try:
+            async with turn[0]:
+                started_at = time.time()
+                timeout = self.timeout_for(context)
+                try:
+                    await asyncio.wait_for(next(context), timeout)
+                except asyncio.TimeoutError:
+                    # Hand the model an error it can explain rather than failing the whole turn
+                    timed_out = True
+                    context.function_result = FunctionResult(
+                        function=context.function.metadata,
+                        value=f"Error: {context.function.fully_qualified_name} timed out after {timeout:g}s"
+                    )
+        finally:
+            turn[1] -= 1
+            if not turn[1]:
+                self._turns.pop(key, None)
+
+        # Carried onto the FunctionResultContent, so the trace can show which calls overlapped
+        context.function_result.metadata["timing"] = {
+            "queued_at": queued_at,
+            "started_at": started_at,
+            "finished_at": time.time(),
+            "timed_out": timed_out,
+        }
@@ -0,0 +1,13 @@
+from semantic_kernel.filters.functions.function_invocation_context import FunctionInvocationContext
+
+from src.services.tracing import span
+
+
+async def trace_kernel_function(context: FunctionInvocationContext, next):
+    # Prompt functions (e.g. StructureClaimData's extraction prompt) are Bedrock calls of their own
+    kind = "llm" if context.function.metadata.is_prompt else "kernel_function"
+    with span(context.function.fully_qualified_name, kind, plugin=context.function.plugin_name or "") as current:
+        await next(context)
+    if current is not None and context.result is not None:
+        # Ends up on the FunctionResultContent, so main can attach it to the function_response message
+        context.result.metadata["span"] = current.summary()
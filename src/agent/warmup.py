@@ -0,0 +1,111 @@
+import importlib
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.services.lazy_imports import import_timings
+
+# Loads what the first turn would otherwise wait for while the UI is already up. Set WARMUP=0 to
+# load everything on first use instead (e.g. scripts that never run a turn).
+WARMUP_ENABLED = os.environ.get("WARMUP", "1") != "0"
+WARMUP_TEXT = "warm-up"
+
+
+def _import_agent():
+    # Semantic Kernel, the plugins and the Bedrock connector
+    importlib.import_module("src.agent.agent_factory")
+
+
+def _open_clients():
+    from src.agent.agent_factory import get_agent_factory
+    get_agent_factory().services
+
+
+def _load_embedding_model():
+    # One encode loads the model and runs its first forward pass
+    from src.agent.agent_factory import get_agent_factory
+    get_agent_factory().services.embeddings.encode([WARMUP_TEXT])
+
+
+def _load_vector_index():
+    importlib.import_module("faiss")
+
+
+def _load_name_index():
+    from src.agent.agent_factory import get_agent_factory
+    get_agent_factory().services.failure_score_checker.name_index.index
+
+
+WARMUP_STAGES: List[Tuple[str, Callable[[], None]]] = [
+    ("import_agent", _import_agent),
+    ("aws_clients", _open_clients),
+    ("embedding_model", _load_embedding_model),
+    ("faiss", _load_vector_index),
+    ("dnb_name_index", _load_name_index),
+]
+
+
+class Warmup:
+    # Runs the stages in order on a daemon thread. A failed stage is recorded and the rest still run,
+    # so a missing table does not stop the embedding model from loading.
+    def __init__(self, stages: List[Tuple[str, Callable[[], None]]] = WARMUP_STAGES):
+        self.stages = stages
+        self.state = "pending"
+        self.stage_seconds: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.total_seconds: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self) -> "Warmup":
+        with self._lock:
+            if self._thread is None:
+                self.state = "running"
+                self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def run(self):
+        started = time.perf_counter()
+        for name, stage in self.stages:
+            stage_started = time.perf_counter()
+            try:
+                stage()
+            except Exception as error:
+                self.errors[name] = repr(error)
+            self.stage_seconds[name] = round(time.perf_counter() - stage_started, 4)
+        self.total_seconds = round(time.perf_counter() - started, 4)
+        self.state = "failed" if self.errors else "done"
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def report(self) -> dict:
+        return {
+            "state": self.state,
+            "stage_seconds": dict(self.stage_seconds),
+            "total_seconds": self.total_seconds,
+            "errors": dict(self.errors),
+            "import_seconds": import_timings(),
+        }
+
+
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup()
+    return _warmup
+
+
+def start_warmup() -> Warmup:
+    # Once per process; later Streamlit sessions and reruns get the same report
+    return get_warmup().start()
@@ -1,16 +1,115 @@
-import boto3
-from typing import Annotated
+import asyncio
+import threading
+from decimal import Decimal
+from typing import Annotated, Any, List, Optional
+
+from cachetools import TTLCache
 from semantic_kernel.functions import kernel_function
 
+from src.services.lazy_imports import lazy_import
+from src.services.organisation_index import MIN_MATCH_SCORE, NameCandidate, RefreshingNameIndex
+from src.services.tracing import span
+
+boto3 = lazy_import("boto3")
+dynamodb_types = lazy_import("boto3.dynamodb.types")
+
+DNB_TABLE_NAME = "dnb_data"
+DNB_REGION = "eu-west-2"
+DNB_KEY_ATTRIBUTE = "organisation_name"
+# Only what the underwriter needs goes back to the LLM, not the whole record
+DNB_PROJECTION = ("organisation_name", "failure_score", "failure_score_commentary")
+DNB_CACHE_TTL_SECONDS = 15 * 60
+DNB_CACHE_MAX_ITEMS = 2048
+
+# Shared by every session in the process; keyed by the organisation key that was looked up
+_failure_score_cache = TTLCache(maxsize=DNB_CACHE_MAX_ITEMS, ttl=DNB_CACHE_TTL_SECONDS)
+_failure_score_cache_lock = threading.Lock()
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
 class FailureScoreChecker:
+    def __init__(self, client=None, table_name: str = DNB_TABLE_NAME, name_index: RefreshingNameIndex = None):
+        # Low-level clients (unlike boto3 resources) are thread-safe and reuse their connection pool
+        self.client = client or boto3.client("dynamodb", region_name=DNB_REGION)
+        self.deserializer = dynamodb_types.TypeDeserializer()
+        self.table_name = table_name
+        self.name_index = name_index or RefreshingNameIndex(self.scan_organisation_keys)
+
+    def scan_organisation_keys(self):
+        # Only the key column is read, to build the local fuzzy-match snapshot
+        paginator = self.client.get_paginator("scan")
+        for page in paginator.paginate(
+            TableName=self.table_name,
+            ProjectionExpression="#k",
+            ExpressionAttributeNames={"#k": DNB_KEY_ATTRIBUTE},
+        ):
+            for item in page.get("Items", []):
+                yield item[DNB_KEY_ATTRIBUTE]["S"]
+
+    def match_organisation(self, organisation_name: str) -> List[NameCandidate]:
+        try:
+            with span("organisation_index.search", "name_index"):
+                return self.name_index.search(organisation_name, limit=3, min_score=MIN_MATCH_SCORE)
+        except Exception:
+            # Without a name snapshot we can still try the name as given as an exact key
+            return [NameCandidate(key=organisation_name, name=organisation_name, score=1.0)]
+
+    def _get_item(self, organisation_key: str) -> Optional[dict]:
+        with span("dynamodb.get_item", "dynamodb", table=self.table_name):
+            response = self.client.get_item(
+                TableName=self.table_name,
+                Key={DNB_KEY_ATTRIBUTE: {"S": organisation_key}},
+                ProjectionExpression=", ".join(f"#f{i}" for i in range(len(DNB_PROJECTION))),
+                ExpressionAttributeNames={f"#f{i}": name for i, name in enumerate(DNB_PROJECTION)},
+            )
+        item = response.get("Item")
+        if not item:
+            return None
+        return {name: _plain(self.deserializer.deserialize(value)) for name, value in item.items()}
+
+    def lookup(self, organisation_key: str) -> Optional[dict]:
+        cache_key = (self.table_name, organisation_key)
+        with _failure_score_cache_lock:
+            if cache_key in _failure_score_cache:
+                return _failure_score_cache[cache_key]
+        item = self._get_item(organisation_key)
+        # Misses are cached too, so repeated questions about an unknown company stay off DynamoDB
+        with _failure_score_cache_lock:
+            _failure_score_cache[cache_key] = item
+        return item
+
     @kernel_function(description="Retrieve the failure score and failure score commentary for an organisation from the Dun & Bradstreed Database.")
     async def retrieve_failure_rating(
         self,
         claim_data: Annotated[dict, "Structured claim object containing organisation_name."]
     ) -> dict:
-        dynamodb = boto3.resource('dynamodb', region_name="eu-west-2")
-        dnb_table = dynamodb.Table("dnb_data")
-        organisation_name = claim_data.get("organisation_name", "N/A")
-        response = dnb_table.scan()
-        items = response.get('Items', [])
-        return items
+        organisation_name = (claim_data.get("organisation_name") or "").strip()
+        if not organisation_name:
+            return {"found": False, "reason": "claim_data has no organisation_name"}
+        candidates = await asyncio.to_thread(self.match_organisation, organisation_name)
+        if not candidates:
+            return {"organisation_name": organisation_name, "found": False}
+
+        best = candidates[0]
+        if best.ambiguous:
+            # Several companies differ only in legal form; let the model ask which one is meant
+            return {
+                "organisation_name": organisation_name,
+                "found": False,
+                "ambiguous": True,
+                "candidates": [c.name for c in candidates],
+            }
+        item = await asyncio.to_thread(self.lookup, best.key)
+        if item is None:
+            return {"organisation_name": organisation_name, "found": False}
+        result = {**item, "found": True, "match_score": best.score}
+        if best.score < 1.0:
+            result["other_candidates"] = [
+                {"organisation_name": c.name, "match_score": c.score} for c in candidates[1:]
+            ]
+        return result
@@ -1,11 +1,27 @@
-import boto3
+import asyncio
 import json
-from typing import Annotated
+import numpy as np
+from typing import Annotated, Any, List
 from semantic_kernel.functions import kernel_function
 
+from src.services.portfolio import as_rows, chunk_ranges, coverage_amounts, region_lookup
+from src.services.sagemaker_client import AsyncSageMakerRuntime
+
+# Region encoding the endpoint was trained with; anything else is "other"
+REGION_CODES = {
+    "gb": 0,
+    "usa": 1,
+    "eu": 2,
+    "asia": 3,
+    "africa": 4,
+}
+OTHER_REGION_CODE = 5
+# Rows per text/csv request; keeps each payload well under the 6 MB endpoint limit
+CSV_ROWS_PER_REQUEST = 1000
+
 class InsurancePremiumEstimator:
-    def __init__(self):
-        self.runtime = boto3.client("sagemaker-runtime")
+    def __init__(self, runtime: AsyncSageMakerRuntime = None):
+        self.runtime = runtime or AsyncSageMakerRuntime()
         self.endpoint_name = "claim-amount-linear-v2-endpoint"
 
     @kernel_function(description="Estimate the likely insurance premium range using model in GBP.")
@@ -16,29 +32,48 @@ class InsurancePremiumEstimator:
         coverage_amount = claim_data.get("coverage_amount", "")
         region_of_operation = claim_data.get("region_of_operation", "").lower()
         coverage_amount = int(coverage_amount) // 1000 if coverage_amount else 0
-        if region_of_operation == "gb":
-            region_value = 0
-        elif region_of_operation == "usa":
-            region_value = 1
-        elif region_of_operation == "eu":
-            region_value = 2
-        elif region_of_operation == "asia":
-            region_value = 3
-        elif region_of_operation == "africa":
-            region_value = 4
-        else:
-            region_value = 5
+        region_value = REGION_CODES.get(region_of_operation, OTHER_REGION_CODE)
         payload = f"{coverage_amount},{region_value}"
-        response = self.runtime.invoke_endpoint(
-            EndpointName=self.endpoint_name,
-            ContentType="text/csv",
-            Body=payload
-        )
-        result = json.loads(response["Body"].read().decode())
+        body = await self.runtime.invoke(self.endpoint_name, payload, content_type="text/csv")
+        result = json.loads(body.decode())
         prediction = result["predictions"][0]["score"]
         return {
             "estimated_insurance_premium": round(prediction, 2),
             "currency": "GBP",
-            "service_used": self.runtime,
-            "model_used": self.endpoint_name 
+            "model_used": self.endpoint_name
         }
+
+    async def _estimate_rows(self, rows: List[str]) -> List[float]:
+        body = await self.runtime.invoke(self.endpoint_name, "\n".join(rows), content_type="text/csv")
+        predictions = json.loads(body.decode())["predictions"]
+        return [prediction["score"] for prediction in predictions]
+
+    async def estimate_portfolio(self, table: Any, rows_per_request: int = CSV_ROWS_PER_REQUEST) -> List[dict]:
+        # Multi-row CSV payloads sent concurrently (bounded by the runtime's pool); results line up with the input
+        table = as_rows(table)
+        coverage = coverage_amounts(table)
+        regions = region_lookup(table, REGION_CODES, OTHER_REGION_CODE).astype(np.int64)
+        valid = np.flatnonzero(~np.isnan(coverage))
+        rows = [
+            f"{amount},{region}"
+            for amount, region in zip((coverage[valid] // 1000).astype(np.int64), regions[valid])
+        ]
+
+        ranges = list(chunk_ranges(len(rows), rows_per_request))
+        chunks = await asyncio.gather(*(self._estimate_rows(rows[start:end]) for start, end in ranges))
+
+        results = [{"error": "invalid coverage_amount", "model_used": self.endpoint_name} for _ in range(len(coverage))]
+        for (start, end), predictions in zip(ranges, chunks):
+            if len(predictions) != end - start:
+                # Predictions cannot be matched to rows, so none of this request's rows gets one
+                error = f"endpoint returned {len(predictions)} predictions for {end - start} rows"
+                for row in valid[start:end]:
+                    results[row] = {"error": error, "model_used": self.endpoint_name}
+                continue
+            for row, score in zip(valid[start:end], predictions):
+                results[row] = {
+                    "estimated_insurance_premium": round(score, 2),
+                    "currency": "GBP",
+                    "model_used": self.endpoint_name
+                }
+        return results
@@ -1,8 +1,13 @@
-import boto3
 import json
-from typing import Annotated
+import numpy as np
+from typing import Annotated, Any, List
 from semantic_kernel.functions import kernel_function
 
+from src.services.lazy_imports import lazy_import
+from src.services.portfolio import as_rows, coverage_amounts, region_lookup
+
+boto3 = lazy_import("boto3")
+
 
 REGION_MODIFIERS = {
     "gb": 2.2,
@@ -11,10 +16,11 @@ REGION_MODIFIERS = {
     "asia": 3.0,
     "africa": 4.5,
 }
+DEFAULT_REGION_MODIFIER = 1.5
 
 class MockInsurancePremiumEstimator:
-    def __init__(self):
-        self.runtime = boto3.client("sagemaker-runtime")
+    def __init__(self, runtime=None):
+        self.runtime = runtime or boto3.client("sagemaker-runtime")
         self.endpoint_name = "claim-amount-linear-v2-endpoint"
 
     @kernel_function(description="Estimate the likely insurance premium range using model in GBP.")
@@ -26,13 +32,32 @@ class MockInsurancePremiumEstimator:
         coverage_amount = int(coverage_amount) // 100 if coverage_amount else 0
 
         region_of_operation = claim_data.get("region_of_operation", "").lower()
-        modifier = REGION_MODIFIERS.get(region_of_operation, 1.5)
+        modifier = REGION_MODIFIERS.get(region_of_operation, DEFAULT_REGION_MODIFIER)
         premium = coverage_amount * modifier
 
 
         return {
             "estimated_insurance_premium": round(premium, 2),
             "currency": "GBP",
-            "service_used": self.runtime,
-            "model_used": self.endpoint_name 
+            "model_used": self.endpoint_name
         }
+
+    def premium_array(self, table: Any) -> np.ndarray:
+        # Same pricing as estimate_size for every row at once; NaN marks an unparseable coverage_amount
+        table = as_rows(table)
+        coverage = coverage_amounts(table)
+        modifiers = region_lookup(table, REGION_MODIFIERS, DEFAULT_REGION_MODIFIER)
+        return np.round(np.floor_divide(coverage, 100) * modifiers, 2)
+
+    def estimate_portfolio(self, table: Any) -> List[dict]:
+        # One result per input row, in input order
+        return [
+            {
+                "estimated_insurance_premium": premium,
+                "currency": "GBP",
+                "model_used": self.endpoint_name
+            }
+            if premium == premium else
+            {"error": "invalid coverage_amount", "model_used": self.endpoint_name}
+            for premium in self.premium_array(table).tolist()
+        ]
@@ -1,11 +1,14 @@
-import boto3
 import json
 from typing import Annotated
 from semantic_kernel.functions import kernel_function
 
+from src.services.lazy_imports import lazy_import
+
+boto3 = lazy_import("boto3")
+
 class RiskEvaluator:
-    def __init__(self):
-        self.runtime = boto3.client("sagemaker-runtime")
+    def __init__(self, runtime=None):
+        self.runtime = runtime or boto3.client("sagemaker-runtime")
         self.endpoint_name = "risk-evaluator-xgb-v1"
 
     @kernel_function(description="Determine the overall risk exposure rating of an organization based on our model to help support underwriters")
@@ -1,32 +1,119 @@
+import json
+import re
 from semantic_kernel.functions import kernel_function
-from typing import Annotated
+from typing import Annotated, Dict, Optional
 from semantic_kernel import Kernel
 
-class StructureClaimData:
-    def __init__(self, kernel: Kernel):
-        self.kernel = kernel
+from src.services.extraction_cache import ExtractionCache, get_extraction_cache
+from src.services.rule_extractor import confident_fields, extract_fields
 
-    @kernel_function(description="Return a JSON containing structured claim_data, use before calling other plugins")
-    async def StructureClaimData(self, claim_text: Annotated[str, "The unstructured claim_text string input"]) -> str:
-        prompt = f"""
+# Bump whenever EXTRACTION_PROMPT, CLAIM_FIELDS or the rule extractor change so cached extractions are not reused
+PROMPT_VERSION = "v3"
+
+CLAIM_FIELDS = (
+    "organisation_name",
+    "region_of_operation",
+    "coverage_amount",
+    "premium",
+    "export_destination",
+    "client_priorities",
+)
+
+EXTRACTION_PROMPT = """
 Extract the following fields from the text below. If a field is not present, leave it blank. for coverage_amount, extract the number. For example USD 150,000,000 should be coverage_amount: 150000000
 
 Required fields (as JSON):
-{{
-    "organisation_name": "",
-    "region_of_operation": "",
-    "coverage_amount": "",
-    "premium": "",
-    "export_destination": "",
-    "client_priorities": ""
-}}
+{fields_json}
 
 Text:
 \"\"\"{claim_text}\"\"\"
 
 Respond ONLY with a valid JSON object. Do not include any text before or after the JSON.
 """
+
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def parse_claim_json(raw: str) -> Optional[dict]:
+    # Tolerates code fences or stray prose around the object; anything else is not cached
+    match = _JSON_OBJECT_RE.search(raw)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return {field: "" if data.get(field) is None else str(data.get(field)) for field in CLAIM_FIELDS}
+
+
+def _prompt_tokens(completion, prompt: str) -> int:
+    for message in getattr(completion, "value", None) or []:
+        usage = getattr(message, "metadata", {}).get("usage")
+        if usage is not None and getattr(usage, "prompt_tokens", None):
+            return usage.prompt_tokens
+    # Rough fallback when the connector reports no usage
+    return len(prompt) // 4
+
+def extraction_version(kernel: Kernel) -> str:
+    # Extractions depend on the chat model as well as the prompt, so both key the cache
+    try:
+        return f"{PROMPT_VERSION}|{kernel.get_service().ai_model_id}"
+    except Exception:
+        return PROMPT_VERSION
+
+def _fields_json(fields) -> str:
+    return json.dumps({field: "" for field in fields}, indent=4)
+
+class StructureClaimData:
+    def __init__(self, kernel: Kernel, cache: ExtractionCache = None, documents: Optional[Dict[str, str]] = None):
+        self.kernel = kernel
+        self.cache = cache or get_extraction_cache()
+        # Uploaded documents by id, so the model can pass a handle instead of the full text
+        self.documents = documents or {}
+
+    def _resolve(self, claim_text: str, document_id: str) -> Optional[str]:
+        if document_id:
+            return self.documents.get(document_id.strip().strip("`"))
+        if not claim_text.strip() and len(self.documents) == 1:
+            return next(iter(self.documents.values()))
+        return claim_text
+
+    @kernel_function(description="Return a JSON containing structured claim_data, use before calling other plugins")
+    async def StructureClaimData(
+        self,
+        claim_text: Annotated[str, "The unstructured claim_text string input; leave empty when passing document_id"] = "",
+        document_id: Annotated[str, "Id of an uploaded document, e.g. doc-1a2b3c4d5e6f"] = ""
+    ) -> str:
+        claim_text = self._resolve(claim_text, document_id)
+        if claim_text is None:
+            return f"Error: no uploaded document with id {document_id}. Known ids: {', '.join(self.documents) or 'none'}"
+
+        version = extraction_version(self.kernel)
+        cached = self.cache.get(claim_text, version)
+        if cached is not None:
+            return json.dumps(cached)
+
+        # Fast path: fields stated in predictable formats are filled by rules; the LLM is only
+        # asked for whatever the rules could not fill confidently
+        rule_fields = confident_fields(extract_fields(claim_text))
+        missing = [field for field in CLAIM_FIELDS if field not in rule_fields]
+        if not missing:
+            claim_data = {field: rule_fields[field] for field in CLAIM_FIELDS}
+            self.cache.put(claim_text, version, claim_data)
+            return json.dumps(claim_data)
+
+        prompt = EXTRACTION_PROMPT.format(fields_json=_fields_json(missing), claim_text=claim_text)
         completion = await self.kernel.invoke_prompt(prompt)
         if hasattr(completion, "result"):
-            return str(completion.result).strip()
-        return str(completion).strip()
+            raw = str(completion.result).strip()
+        else:
+            raw = str(completion).strip()
+
+        llm_fields = parse_claim_json(raw)
+        if llm_fields is None:
+            return raw
+        claim_data = {**llm_fields, **rule_fields}
+        self.cache.put(claim_text, version, claim_data, _prompt_tokens(completion, prompt))
+        return json.dumps(claim_data)
@@ -1,29 +1,145 @@
-import faiss
-from sentence_transformers import SentenceTransformer
 from semantic_kernel.functions import kernel_function
-from typing import Annotated
+from typing import Annotated, Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple, Union
+
+import numpy as np
+
+from src.services.bulk_ingest import BULK_INGEST_WORKERS, BulkDocument, BulkIngestor, encode_chunks
+from src.services.chunker import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNKER_VERSION
+from src.services.embedding_service import EmbeddingService, get_embedding_service
+from src.services.index_cache import CachedIndex, IndexCache, get_index_cache, hash_file, hash_text, make_cache_key
+from src.services.organisation_index import normalise_name
+from src.services.vector_store import VectorStore
+
+
+def chunk_params(max_tokens: int, overlap_tokens: int) -> dict:
+    return {"chunker": CHUNKER_VERSION, "max_tokens": max_tokens, "overlap_tokens": overlap_tokens}
+
+
+def organisation_key(organisation_name: str) -> str:
+    # "Acme Ltd" in the document and "ACME LIMITED" from the model filter to the same documents
+    return normalise_name(organisation_name)
+
 
 class VectorMemoryRAGPlugin:
-    def __init__(self):
-        self.text_chunks = []
-        self.index = None
-        self.embeddings = SentenceTransformer("all-MiniLM-L6-v2")
-
-    def add_document(self, doc_text: str, chunk_size: int = 500):
-        self.text_chunks = [
-            doc_text[i:i + chunk_size]
-            for i in range(0, len(doc_text), chunk_size)
-        ]
-        vectors = self.embeddings.encode(self.text_chunks, convert_to_numpy=True)
-        dim = vectors.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(vectors)
+    def __init__(self, embeddings: EmbeddingService = None, index_cache: IndexCache = None):
+        self.embeddings = embeddings or get_embedding_service()
+        self.index_cache = index_cache or get_index_cache()
+        self.store: Optional[VectorStore] = None
+
+    def _build_index(self, source: Union[str, Iterable[str]], max_tokens: int, overlap_tokens: int):
+        text_chunks, vectors, _ = encode_chunks(self.embeddings, source, max_tokens, overlap_tokens)
+        return text_chunks, vectors
+
+    def _is_cached(self, doc_hash: str, max_tokens: int, overlap_tokens: int) -> bool:
+        key = make_cache_key(doc_hash, chunk_params(max_tokens, overlap_tokens), self.embeddings.model_name)
+        return self.index_cache.contains(key)
+
+    def _get_or_build(
+        self,
+        doc_hash: str,
+        build: Callable[[], Tuple[List[str], np.ndarray]],
+        max_tokens: int,
+        overlap_tokens: int
+    ) -> CachedIndex:
+        # Same document + chunking + model is only ever encoded once; later loads are mmapped from disk
+        return self.index_cache.get_or_build(
+            doc_hash, chunk_params(max_tokens, overlap_tokens), self.embeddings.model_name, build
+        )
+
+    def _add_cached(self, cached: CachedIndex, document_id: Optional[str], metadata: Optional[Dict[str, Any]]) -> str:
+        document_id = document_id or cached.key[:16]
+        if metadata and metadata.get("organisation_name"):
+            metadata = {**metadata, "organisation_key": organisation_key(metadata["organisation_name"])}
+        if self.store is None:
+            self.store = VectorStore(dimension=cached.embeddings.shape[1])
+        self.store.add_document(document_id, cached.text_chunks, cached.embeddings, metadata)
+        return document_id
+
+    def _add_source(
+        self,
+        doc_hash: str,
+        source: Callable[[], Union[str, Iterable[str]]],
+        max_tokens: int,
+        overlap_tokens: int,
+        document_id: Optional[str],
+        metadata: Optional[Dict[str, Any]]
+    ) -> str:
+        cached = self._get_or_build(
+            doc_hash, lambda: self._build_index(source(), max_tokens, overlap_tokens), max_tokens, overlap_tokens
+        )
+        return self._add_cached(cached, document_id, metadata)
+
+    def add_document(
+        self,
+        doc_text: str,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        document_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        return self._add_source(hash_text(doc_text), lambda: doc_text, max_tokens, overlap_tokens, document_id, metadata)
+
+    def add_document_file(
+        self,
+        path: str,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        document_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        # Large submissions are streamed line by line rather than read into one string
+        def read_lines():
+            with open(path, encoding="utf-8", errors="replace") as f:
+                yield from f
+        return self._add_source(hash_file(path), read_lines, max_tokens, overlap_tokens, document_id, metadata)
+
+    def add_documents(
+        self,
+        documents: Iterable[BulkDocument],
+        workers: int = BULK_INGEST_WORKERS,
+        create_embeddings: Optional[Callable[[], EmbeddingService]] = None,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        progress: Optional[TextIO] = None
+    ) -> dict:
+        # Bulk load across a pool of encoder processes; same store contents as adding one at a time
+        ingestor = BulkIngestor(self, workers, create_embeddings, max_tokens, overlap_tokens, progress)
+        return ingestor.run(documents)
+
+    def update_document(
+        self,
+        document_id: str,
+        doc_text: str,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        return self.add_document(doc_text, max_tokens, overlap_tokens, document_id, metadata)
+
+    def remove_document(self, document_id: str) -> bool:
+        return self.store is not None and self.store.remove_document(document_id)
+
+    async def search(self, query: str, k: int = 3, filters: Optional[Dict[str, Any]] = None):
+        if self.store is None or not len(self.store):
+            return []
+        query_vec = await self.embeddings.encode_async([query])
+        return self.store.search(query_vec, k=k, filters=filters)[0]
 
     @kernel_function(description="retrieve relevant chunks from uploaded claim documents.")
-    async def retrieve_chunks(self, query: Annotated[str, "Query to summmarise / retrieve relevant claim information"]) -> str:
-        if not self.index:
+    async def retrieve_chunks(
+        self,
+        query: Annotated[str, "Query to summmarise / retrieve relevant claim information"],
+        organisation_name: Annotated[Optional[str], "Only search documents about this organisation"] = None,
+        document_id: Annotated[Optional[str], "Only search this uploaded document, e.g. doc-1a2b3c4d5e6f"] = None
+    ) -> str:
+        if self.store is None or not len(self.store):
             return "No documents indexed yet."
-        query_vec = self.embeddings.encode([query], convert_to_numpy=True)
-        D, I = self.index.search(query_vec, k=3)
-        relevant_chunks = [self.text_chunks[i] for i in I[0] if i < len(self.text_chunks)]
-        return "\n---\n".join(relevant_chunks)
+        filters = {}
+        if organisation_name:
+            filters["organisation_key"] = organisation_key(organisation_name)
+        if document_id:
+            filters["document_id"] = document_id
+        hits = await self.search(query, k=3, filters=filters or None)
+        if not hits and filters:
+            return "No indexed documents match that organisation or document_id."
+        return "\n---\n".join(hit.text for hit in hits)
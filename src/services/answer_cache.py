@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+# Near-identical questions about the same document get the earlier answer back without a Bedrock call.
+# Set ANSWER_CACHE=0 to send every question to the agent.
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE", "1") != "0"
+# Cosine similarity between question embeddings; high enough that "risk rating for X" does not
+# match "premium for X"
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", 0.92))
+ANSWER_CACHE_TTL_SECONDS = float(os.environ.get("ANSWER_CACHE_TTL_SECONDS", 60 * 60))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", 1024))
+
+# "10m", "£2,500,000", "3.5%": paraphrases score alike whatever the figures, so the figures must match
+_NUMBER_RE = re.compile(r"(?P<number>\d+(?:[,.]\d+)*)(?:\s*(?P<unit>%|(?:k|m|bn|million|thousand|billion)\b))?", re.IGNORECASE)
+_UNITS = {"thousand": "k", "million": "m", "billion": "bn"}
+
+
+def history_digest(messages: Iterable[dict]) -> str:
+    # The conversation before the question; empty for the first turn of a thread
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(json.dumps(message, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def answer_scope(claim_text: str, signature: str, history: str = "") -> str:
+    # Answers are only shared between questions about the same document under the same models, asked
+    # after the same conversation ("can you explain that?" means something else in another thread)
+    return hashlib.sha256(f"{signature}|{history}|{claim_text}".encode("utf-8")).hexdigest()
+
+
+def question_numbers(question: str) -> Tuple[str, ...]:
+    numbers = []
+    for match in _NUMBER_RE.finditer(question):
+        unit = (match.group("unit") or "").lower()
+        numbers.append(match.group("number").replace(",", "") + _UNITS.get(unit, unit))
+    return tuple(sorted(numbers))
+
+
+@dataclass
+class CachedAnswer:
+    scope: str
+    question: str
+    numbers: Tuple[str, ...]
+    vector: np.ndarray
+    content: str
+    name: Optional[str]
+    created_at: float
+
+
+@dataclass
+class AnswerHit:
+    answer: CachedAnswer
+    similarity: float
+
+    def summary(self) -> dict:
+        return {
+            "hit": True,
+            "similarity": round(self.similarity, 4),
+            "cached_question": self.answer.question,
+            "age_seconds": round(time.time() - self.answer.created_at, 1),
+        }
+
+
+class AnswerCache:
+    # Process-wide and in memory, shared by every session like the extraction cache; the least
+    # recently used answers go first when full and none is served past the TTL
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        enabled: bool = ANSWER_CACHE_ENABLED
+    ):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], CachedAnswer]" = OrderedDict()
+        self._signature: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evicted": 0, "invalidations": 0}
+
+    @staticmethod
+    def _normalise(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_signature(self, signature: str):
+        # New chat model, instructions or endpoints: every stored answer may be wrong now
+        if self._signature is not None and signature != self._signature:
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+        self._signature = signature
+
+    def _expire(self):
+        deadline = time.time() - self.ttl_seconds
+        stale = [key for key, entry in self._entries.items() if entry.created_at < deadline]
+        for key in stale:
+            del self._entries[key]
+        self._stats["expired"] += len(stale)
+
+    def lookup(self, scope: str, signature: str, question: str, vector: np.ndarray) -> Optional[AnswerHit]:
+        vector = self._normalise(vector)
+        numbers = question_numbers(question)
+        with self._lock:
+            self._check_signature(signature)
+            self._expire()
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry.scope == scope and entry.numbers == numbers
+            ]
+            if candidates:
+                similarities = np.stack([entry.vector for _, entry in candidates]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return AnswerHit(answer=entry, similarity=float(similarities[best]))
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, scope: str, signature: str, question: str, vector: np.ndarray, content: str, name: Optional[str] = None):
+        entry = CachedAnswer(
+            scope=scope,
+            question=question,
+            numbers=question_numbers(question),
+            vector=self._normalise(vector),
+            content=content,
+            name=name,
+            created_at=time.time(),
+        )
+        with self._lock:
+            self._check_signature(signature)
+            key = (scope, " ".join(question.lower().split()))
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache: Optional[AnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def set_answer_cache(cache: Optional[AnswerCache]):
+    # Swaps the process-wide cache, e.g. a disabled one for benchmarks that repeat questions
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def get_answer_cache() -> AnswerCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
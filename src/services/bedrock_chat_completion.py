@@ -0,0 +1,101 @@
+import os
+from typing import Any
+
+from semantic_kernel.connectors.ai.bedrock.services.bedrock_chat_completion import BedrockChatCompletion
+from semantic_kernel.connectors.ai.completion_usage import CompletionUsage
+from semantic_kernel.contents import ChatMessageContent, FunctionCallContent, StreamingChatMessageContent
+
+# Bedrock prompt caching: the tool schemas and agent instructions are identical on every request, a
+# large first message (a pasted document) on every request of a session, and each request in the
+# auto-invoke loop resends the whole previous request. Cache points mark those prefixes.
+# Set BEDROCK_PROMPT_CACHE=0 for models without prompt caching support.
+PROMPT_CACHE_ENABLED = os.environ.get("BEDROCK_PROMPT_CACHE", "1") != "0"
+# Bedrock ignores checkpoints on shorter prefixes (1,024 tokens for Claude 3.7 Sonnet), and a request
+# may carry at most four, so small first messages are not pinned on their own
+PINNED_MESSAGE_MIN_TOKENS = 1024
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+
+class BedrockCompletionUsage(CompletionUsage):
+    # prompt_tokens are the fresh input tokens; cached ones are billed at their own rates
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    @classmethod
+    def from_bedrock(cls, usage: dict) -> "BedrockCompletionUsage":
+        return cls(
+            prompt_tokens=usage["inputTokens"],
+            completion_tokens=usage["outputTokens"],
+            cache_read_tokens=usage.get("cacheReadInputTokens") or 0,
+            cache_write_tokens=usage.get("cacheWriteInputTokens") or 0,
+        )
+
+
+def _estimate_tokens(blocks: list) -> int:
+    return sum(len(block.get("text", "")) for block in blocks) // 4
+
+
+def _with_cache_point(message: dict) -> dict:
+    return {**message, "content": [*message["content"], CACHE_POINT]}
+
+
+def add_cache_points(request: dict, pin_first_message: bool = True, cache_history: bool = True) -> dict:
+    # Cached prefixes run tools -> system -> messages, so the point after the system prompt covers the
+    # tool schemas too. Lists are copied: the tool list is shared with every request's settings.
+    if request.get("system"):
+        request["system"] = [*request["system"], CACHE_POINT]
+    messages = list(request.get("messages") or [])
+    if (
+        pin_first_message
+        and messages
+        and messages[0]["role"] == "user"
+        and _estimate_tokens(messages[0]["content"]) >= PINNED_MESSAGE_MIN_TOKENS
+    ):
+        messages[0] = _with_cache_point(messages[0])
+    # The next request of the turn starts with this whole request, so it reads it back from cache
+    if cache_history and messages and "cachePoint" not in messages[-1]["content"][-1]:
+        messages[-1] = _with_cache_point(messages[-1])
+    if messages:
+        request["messages"] = messages
+    return request
+
+
+class BedrockStreamingChatCompletion(BedrockChatCompletion):
+    # The stock connector drops contentBlockIndex from streamed tool-use chunks, so when one response
+    # holds several tool calls Semantic Kernel glues every argument fragment onto the first call.
+    # Tagging each chunk with its block index lets the fragments merge into the call they belong to.
+    # It also marks the static request prefix for prompt caching and reports cached tokens in usage.
+    prompt_cache: bool = PROMPT_CACHE_ENABLED
+
+    def _prepare_settings_for_request(self, chat_history, settings) -> dict[str, Any]:
+        request = super()._prepare_settings_for_request(chat_history, settings)
+        return add_cache_points(request) if self.prompt_cache else request
+
+    def _parse_metadata_event(self, event: dict[str, Any]) -> StreamingChatMessageContent:
+        message = super()._parse_metadata_event(event)
+        message.metadata["usage"] = BedrockCompletionUsage.from_bedrock(event["metadata"]["usage"])
+        return message
+
+    def _create_chat_message_content(self, response: dict[str, Any]) -> ChatMessageContent:
+        message = super()._create_chat_message_content(response)
+        message.metadata["usage"] = BedrockCompletionUsage.from_bedrock(response["usage"])
+        return message
+
+    def _parse_content_block_start_event(self, event: dict[str, Any]) -> StreamingChatMessageContent:
+        message = super()._parse_content_block_start_event(event)
+        return self._with_block_index(message, event["contentBlockStart"])
+
+    def _parse_content_block_delta_event(
+        self, event: dict[str, Any], function_invoke_attempt: int
+    ) -> StreamingChatMessageContent:
+        message = super()._parse_content_block_delta_event(event, function_invoke_attempt)
+        return self._with_block_index(message, event["contentBlockDelta"])
+
+    @staticmethod
+    def _with_block_index(message: StreamingChatMessageContent, block: dict) -> StreamingChatMessageContent:
+        index = block.get("contentBlockIndex")
+        if index is not None:
+            for item in message.items:
+                if isinstance(item, FunctionCallContent):
+                    item.index = index
+        return message
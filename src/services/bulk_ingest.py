@@ -0,0 +1,192 @@
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple, Union
+
+import numpy as np
+
+from src.services.chunker import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, ENCODE_BATCH_SIZE, batched, iter_chunks
+from src.services.embedding_service import EmbeddingService
+from src.services.index_cache import hash_file, hash_text
+
+if TYPE_CHECKING:
+    from src.kernel_functions.vector_memory_rag_plugin import VectorMemoryRAGPlugin
+
+# --- Bulk loading of the vector memory: chunking and encoding run in a pool of encoder processes,
+# each loading the model once; hashing, the index cache and the vector store stay in this process.
+BULK_INGEST_WORKERS = int(os.environ.get("BULK_INGEST_WORKERS", os.cpu_count() or 1))
+# Documents submitted but not yet added to the store, per worker; bounds memory however large the
+# backlog is, since finished documents wait here until every earlier one has been added
+BULK_INGEST_PENDING_PER_WORKER = 4
+STAGES = ("hash", "chunk", "encode", "wait", "index")
+
+
+@dataclass
+class BulkDocument:
+    # Exactly one of text or path; files are streamed line by line in the worker
+    text: Optional[str] = None
+    path: Optional[str] = None
+    document_id: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+    def source(self) -> Union[str, Iterable[str]]:
+        if self.text is not None:
+            return self.text
+        return _read_lines(self.path)
+
+
+def _read_lines(path: str) -> Iterable[str]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        yield from f
+
+
+def encode_chunks(
+    embeddings: EmbeddingService,
+    source: Union[str, Iterable[str]],
+    max_tokens: int,
+    overlap_tokens: int
+) -> Tuple[List[str], np.ndarray, float]:
+    # Chunks are encoded in fixed-size batches as the chunker produces them, so only one batch of
+    # chunk texts is waiting on the encoder at a time. Returns the seconds spent in the encoder too.
+    text_chunks, vector_batches = [], []
+    encode_seconds = 0.0
+    for batch in batched(iter_chunks(source, max_tokens, overlap_tokens), ENCODE_BATCH_SIZE):
+        started = time.perf_counter()
+        vector_batches.append(embeddings.encode(batch))
+        encode_seconds += time.perf_counter() - started
+        text_chunks.extend(batch)
+    vectors = np.vstack(vector_batches) if vector_batches else np.zeros((0, embeddings.dimension), dtype=np.float32)
+    return text_chunks, vectors, encode_seconds
+
+
+# Set in each encoder process by _init_worker
+_worker_embeddings: Optional[EmbeddingService] = None
+
+
+def _init_worker(create_embeddings: Callable[[], EmbeddingService], threads: int):
+    global _worker_embeddings
+    _worker_embeddings = create_embeddings()
+    # Loads the model (and torch) now rather than inside the first document's timing
+    _worker_embeddings.dimension
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        # N workers x all cores each would oversubscribe the machine
+        torch.set_num_threads(threads)
+
+
+def _encode_document(document: BulkDocument, max_tokens: int, overlap_tokens: int) -> Tuple[List[str], np.ndarray, Dict[str, float]]:
+    started = time.perf_counter()
+    text_chunks, vectors, encode_seconds = encode_chunks(_worker_embeddings, document.source(), max_tokens, overlap_tokens)
+    chunk_seconds = time.perf_counter() - started - encode_seconds
+    return text_chunks, vectors, {"chunk": chunk_seconds, "encode": encode_seconds}
+
+
+@dataclass
+class _Pending:
+    document: BulkDocument
+    doc_hash: str
+    future: Optional[Future] = None
+
+
+class BulkIngestor:
+    # Documents are added to the store in input order, so the result is the same as calling
+    # add_document / add_document_file on each of them in turn. Documents already in the index
+    # cache are never sent to a worker.
+    def __init__(
+        self,
+        plugin: "VectorMemoryRAGPlugin",
+        workers: int = BULK_INGEST_WORKERS,
+        create_embeddings: Optional[Callable[[], EmbeddingService]] = None,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        progress: Optional[TextIO] = sys.stderr,
+        progress_every: int = 100
+    ):
+        self.plugin = plugin
+        self.workers = max(1, workers)
+        # Must be picklable: the workers are spawned, not forked, so the app's threads are not copied
+        self.create_embeddings = create_embeddings or partial(EmbeddingService, plugin.embeddings.model_name)
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.max_pending = self.workers * BULK_INGEST_PENDING_PER_WORKER
+        self.progress = progress
+        self.progress_every = progress_every
+
+    def run(self, documents: Iterable[BulkDocument]) -> dict:
+        started = time.perf_counter()
+        stage_seconds = dict.fromkeys(STAGES, 0.0)
+        counts = {"documents": 0, "cached": 0, "encoded": 0, "chunks": 0}
+        document_ids: List[str] = []
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.create_embeddings, threads),
+        )
+        pending: "deque[_Pending]" = deque()
+
+        def finish(item: _Pending):
+            if item.future is not None:
+                wait_started = time.perf_counter()
+                result = item.future.result()
+                stage_seconds["wait"] += time.perf_counter() - wait_started
+                build = lambda: self._from_worker(result, stage_seconds)
+            else:
+                # Only reached if the cache entry was evicted since the lookup; encoded here instead
+                build = lambda: self.plugin._build_index(item.document.source(), self.max_tokens, self.overlap_tokens)
+            index_started = time.perf_counter()
+            cached = self.plugin._get_or_build(item.doc_hash, build, self.max_tokens, self.overlap_tokens)
+            document_ids.append(self.plugin._add_cached(cached, item.document.document_id, item.document.metadata))
+            stage_seconds["index"] += time.perf_counter() - index_started
+            counts["encoded" if item.future is not None else "cached"] += 1
+            counts["chunks"] += len(cached.text_chunks)
+            done = len(document_ids)
+            if self.progress is not None and done % self.progress_every == 0:
+                rate = done / (time.perf_counter() - started)
+                print(f"{done} documents indexed ({counts['chunks']} chunks), {rate:.1f}/s", file=self.progress, flush=True)
+
+        try:
+            for document in documents:
+                hash_started = time.perf_counter()
+                doc_hash = hash_text(document.text) if document.text is not None else hash_file(document.path)
+                stage_seconds["hash"] += time.perf_counter() - hash_started
+                counts["documents"] += 1
+                item = _Pending(document, doc_hash)
+                if not self.plugin._is_cached(doc_hash, self.max_tokens, self.overlap_tokens):
+                    item.future = pool.submit(_encode_document, document, self.max_tokens, self.overlap_tokens)
+                pending.append(item)
+                # Add whatever is ready at the head, and block on it once the window is full
+                while pending and (len(pending) >= self.max_pending or pending[0].future is None or pending[0].future.done()):
+                    finish(pending.popleft())
+            while pending:
+                finish(pending.popleft())
+        finally:
+            for item in pending:
+                if item.future is not None:
+                    item.future.cancel()
+            pool.shutdown(wait=True)
+
+        wall_seconds = time.perf_counter() - started
+        return {
+            **counts,
+            "document_ids": document_ids,
+            "workers": self.workers,
+            "wall_seconds": round(wall_seconds, 3),
+            "documents_per_second": round(counts["documents"] / wall_seconds, 2) if wall_seconds else 0.0,
+            "chunks_per_second": round(counts["chunks"] / wall_seconds, 2) if wall_seconds else 0.0,
+            # chunk and encode are summed over the workers, so they can exceed the wall time
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()},
+        }
+
+    @staticmethod
+    def _from_worker(result: Tuple[List[str], np.ndarray, Dict[str, float]], stage_seconds: Dict[str, float]):
+        text_chunks, vectors, timings = result
+        for stage, seconds in timings.items():
+            stage_seconds[stage] += seconds
+        return text_chunks, vectors
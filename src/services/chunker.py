@@ -0,0 +1,129 @@
+import re
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar, Union
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces; word/punctuation tokens stay comfortably below that
+CHUNK_MAX_TOKENS = 160
+CHUNK_OVERLAP_TOKENS = 32
+ENCODE_BATCH_SIZE = 32
+CHUNKER_VERSION = "boundary-v1"
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;])\s+(?=[\"'(\[]?[A-Z0-9])")
+_HEADING_RE = re.compile(r"^(#{1,6}\s|\d+(\.\d+)*[.)]?\s+[A-Z]|[A-Z][A-Z0-9 &/,\-]{3,}:?$)")
+_TABLE_ROW_RE = re.compile(r"^\s*\|.*\|\s*$|\t")
+
+T = TypeVar("T")
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+def batched(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _iter_lines(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    if isinstance(source, str):
+        # splitlines on a str would materialise every line at once; finditer walks it lazily
+        for match in re.finditer(r"[^\n]*\n|[^\n]+$", source):
+            yield match.group(0).rstrip("\r\n")
+    else:
+        for piece in source:
+            yield from piece.splitlines()
+
+
+def iter_segments(source: Union[str, Iterable[str]]) -> Iterator[tuple]:
+    # Yields (segment_text, starts_section). Table rows and headings are never split or merged
+    # into prose; paragraphs are split into sentences.
+    paragraph: List[str] = []
+
+    def flush():
+        text = " ".join(paragraph).strip()
+        paragraph.clear()
+        if text:
+            for sentence in _SENTENCE_END_RE.split(text):
+                if sentence.strip():
+                    yield sentence.strip(), False
+
+    for line in _iter_lines(source):
+        stripped = line.strip()
+        if not stripped:
+            yield from flush()
+        elif _TABLE_ROW_RE.search(line):
+            yield from flush()
+            yield stripped, False
+        elif _HEADING_RE.match(stripped):
+            yield from flush()
+            yield stripped, True
+        else:
+            paragraph.append(stripped)
+    yield from flush()
+
+
+def _split_long_segment(segment: str, max_tokens: int, overlap_tokens: int) -> Iterator[str]:
+    words = segment.split()
+    start = 0
+    while start < len(words):
+        window: List[str] = []
+        tokens = 0
+        for word in words[start:]:
+            word_tokens = count_tokens(word)
+            if window and tokens + word_tokens > max_tokens:
+                break
+            window.append(word)
+            tokens += word_tokens
+        yield " ".join(window)
+        if start + len(window) >= len(words):
+            return
+        overlap = min(overlap_tokens, len(window) - 1)
+        start += max(1, len(window) - overlap)
+
+
+def iter_chunks(
+    source: Union[str, Iterable[str]],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> Iterator[str]:
+    # Greedily packs whole sentences/rows into chunks of at most max_tokens. Each new chunk starts
+    # with the trailing segments of the previous one (up to overlap_tokens), unless a heading
+    # opened a new section.
+    current: List[tuple] = []
+    current_tokens = 0
+
+    def carry_over() -> List[tuple]:
+        carried, tokens = [], 0
+        for segment, segment_tokens in reversed(current):
+            if tokens + segment_tokens > overlap_tokens:
+                break
+            carried.insert(0, (segment, segment_tokens))
+            tokens += segment_tokens
+        return carried
+
+    for segment, starts_section in iter_segments(source):
+        segment_tokens = count_tokens(segment)
+        if segment_tokens > max_tokens:
+            pieces = [(piece, count_tokens(piece)) for piece in _split_long_segment(segment, max_tokens, overlap_tokens)]
+        else:
+            pieces = [(segment, segment_tokens)]
+
+        for piece, piece_tokens in pieces:
+            if current and (starts_section or current_tokens + piece_tokens > max_tokens):
+                yield " ".join(text for text, _ in current)
+                current = [] if starts_section else carry_over()
+                current_tokens = sum(tokens for _, tokens in current)
+                # Drop carried context that would not leave room for the new piece
+                while current and current_tokens + piece_tokens > max_tokens:
+                    current_tokens -= current.pop(0)[1]
+            current.append((piece, piece_tokens))
+            current_tokens += piece_tokens
+            starts_section = False
+
+    if current:
+        yield " ".join(text for text, _ in current)
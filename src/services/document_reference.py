@@ -0,0 +1,86 @@
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from src.services.rule_extractor import confident_fields, extract_fields
+
+# "reference" sends only a handle and a short summary; "inline" pastes the whole document into the message
+UPLOAD_MODES = ("reference", "inline")
+DEFAULT_UPLOAD_MODE = os.environ.get("UPLOAD_MODE", "reference")
+SUMMARY_MAX_CHARS = 600
+# Both upload modes append the document after this divider
+DOCUMENT_DIVIDER = "\n\n-----\n"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def document_id_for(claim_text: str) -> str:
+    # Stable across sessions and processes, so the id in an old message still resolves to the same text
+    return "doc-" + hashlib.sha256(claim_text.encode("utf-8")).hexdigest()[:12]
+
+
+def document_metadata(claim_text: str) -> Dict[str, str]:
+    # Stored with the document's chunks, so retrieve_chunks can be narrowed to one organisation
+    organisation_name = confident_fields(extract_fields(claim_text)).get("organisation_name")
+    return {"organisation_name": organisation_name} if organisation_name else {}
+
+
+@dataclass
+class DocumentReference:
+    document_id: str
+    chars: int
+    approx_tokens: int
+    fields: Dict[str, str]
+    excerpt: str
+
+    def to_message(self, user_input: str, name: Optional[str] = None) -> str:
+        fields = "\n".join(f"- {field}: {value}" for field, value in self.fields.items()) or "- (none found by rules)"
+        return (
+            f"{user_input}{DOCUMENT_DIVIDER}"
+            f"Uploaded document: `{self.document_id}`{f' ({name})' if name else ''}, "
+            f"{self.chars:,} characters (~{self.approx_tokens:,} tokens), not included here.\n"
+            "Use StructureClaimData with this document_id for claim_data, and retrieve_chunks for any other details.\n"
+            f"Fields found by rules:\n{fields}\n"
+            f"Opening excerpt:\n```text\n{self.excerpt}\n```\n"
+            "-----\n"
+        )
+
+
+def describe_document(claim_text: str, max_chars: int = SUMMARY_MAX_CHARS) -> DocumentReference:
+    excerpt = _WHITESPACE_RE.sub(" ", claim_text[: max_chars * 2]).strip()
+    if len(excerpt) > max_chars:
+        excerpt = excerpt[:max_chars].rsplit(" ", 1)[0] + " ..."
+    return DocumentReference(
+        document_id=document_id_for(claim_text),
+        chars=len(claim_text),
+        approx_tokens=len(claim_text) // 4,
+        fields=confident_fields(extract_fields(claim_text)),
+        excerpt=excerpt,
+    )
+
+
+def inline_document(user_input: str, claim_text: str) -> str:
+    return (
+        f"{user_input}{DOCUMENT_DIVIDER}"
+        "Uploaded Document Contents:\n"
+        "-----\n"
+        "```text\n"
+        f"{claim_text.rstrip()}\n\n"
+        "-----\n"# Ensures the last line gets its own newline
+        "```\n"
+    )
+
+
+def with_document(user_input: str, claim_text: str, mode: str = DEFAULT_UPLOAD_MODE, name: Optional[str] = None) -> str:
+    if mode not in UPLOAD_MODES:
+        raise ValueError(f"Unknown upload mode: {mode}")
+    if mode == "inline":
+        return inline_document(user_input, claim_text)
+    return describe_document(claim_text).to_message(user_input, name)
+
+
+def question_from(user_input: str) -> str:
+    # The user's own words, without a document attached by with_document
+    return user_input.split(DOCUMENT_DIVIDER, 1)[0].strip()
@@ -0,0 +1,164 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+
+from src.services.lazy_imports import lazy_import
+from src.services.tracing import span
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# Importing sentence_transformers pulls in torch; it waits until the model is first needed
+sentence_transformers = lazy_import("sentence_transformers")
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+MAX_BATCH_SIZE = 64
+MAX_WAIT_SECONDS = 0.005
+
+
+@dataclass
+class _EncodeRequest:
+    texts: List[str]
+    future: Future = field(default_factory=Future)
+
+
+class EmbeddingService:
+    # One model per process. Encode requests from every session (each Streamlit session runs its
+    # own event loop on its own thread) are queued and coalesced into micro-batches by a worker thread.
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_seconds: float = MAX_WAIT_SECONDS,
+        model: Optional["SentenceTransformer"] = None
+    ):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._model = model
+        self._model_lock = threading.Lock()
+        self._queue: "queue.Queue[_EncodeRequest]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "texts": 0,
+            "batches": 0,
+            "encode_seconds": 0.0,
+            "max_queue_depth": 0,
+        }
+
+    @property
+    def model(self) -> "SentenceTransformer":
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = sentence_transformers.SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def submit(self, texts: List[str]) -> Future:
+        request = _EncodeRequest(texts=list(texts))
+        if not request.texts:
+            request.future.set_result(np.zeros((0, self.dimension), dtype=np.float32))
+            return request.future
+        self._ensure_worker()
+        self._queue.put(request)
+        with self._stats_lock:
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue.qsize())
+        return request.future
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        with span("embedding.encode", "embedding", texts=len(texts)):
+            return self.submit(texts).result()
+
+    async def encode_async(self, texts: List[str]) -> np.ndarray:
+        # Awaiting the worker's future keeps the caller's event loop free while the model runs
+        with span("embedding.encode", "embedding", texts=len(texts)):
+            return await asyncio.wrap_future(self.submit(texts))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch_size"] = stats["texts"] / stats["batches"] if stats["batches"] else 0.0
+        stats["texts_per_second"] = (
+            stats["texts"] / stats["encode_seconds"] if stats["encode_seconds"] else 0.0
+        )
+        return stats
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-service", daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self) -> List[_EncodeRequest]:
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait_seconds
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for request in batch for text in request.texts]
+            started = time.perf_counter()
+            try:
+                vectors = self.model.encode(
+                    texts, batch_size=self.max_batch_size, convert_to_numpy=True
+                ).astype(np.float32, copy=False)
+            except Exception as exc:
+                for request in batch:
+                    request.future.set_exception(exc)
+                continue
+            elapsed = time.perf_counter() - started
+
+            offset = 0
+            for request in batch:
+                count = len(request.texts)
+                request.future.set_result(vectors[offset:offset + count])
+                offset += count
+
+            with self._stats_lock:
+                self._stats["requests"] += len(batch)
+                self._stats["texts"] += len(texts)
+                self._stats["batches"] += 1
+                self._stats["encode_seconds"] += elapsed
+
+
+_service: Optional[EmbeddingService] = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+EXTRACTION_CACHE_PATH = os.environ.get(
+    "EXTRACTION_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "iua", "extractions.sqlite3")
+)
+EXTRACTION_CACHE_MAX_ROWS = int(os.environ.get("EXTRACTION_CACHE_MAX_ROWS", 50_000))
+EXTRACTION_CACHE_TTL_SECONDS = float(os.environ.get("EXTRACTION_CACHE_TTL_SECONDS", 30 * 24 * 60 * 60))
+# Expired and excess rows are deleted once every this many stores (per process)
+EXTRACTION_CACHE_PRUNE_EVERY = int(os.environ.get("EXTRACTION_CACHE_PRUNE_EVERY", 100))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalise_claim_text(claim_text: str) -> str:
+    # Re-pasted documents differ in line endings, indentation and trailing space, not in content
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", claim_text)).strip()
+
+
+def make_extraction_key(claim_text: str, prompt_version: str) -> str:
+    normalised = normalise_claim_text(claim_text)
+    return hashlib.sha256(f"{prompt_version}|{normalised}".encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    # SQLite keeps the cache shared by every worker process on the host and survives restarts. Every
+    # prune_every stores, rows past the TTL and the oldest rows over max_rows are deleted. Rows from
+    # other prompt or model versions are left to expire: processes on different versions (a rolling
+    # deploy, batch.py with another model) share the file.
+    def __init__(
+        self,
+        path: str = EXTRACTION_CACHE_PATH,
+        max_rows: int = EXTRACTION_CACHE_MAX_ROWS,
+        ttl_seconds: float = EXTRACTION_CACHE_TTL_SECONDS,
+        prune_every: int = EXTRACTION_CACHE_PRUNE_EVERY
+    ):
+        self.path = path
+        self.max_rows = max_rows
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = max(1, prune_every)
+        self._puts = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "pruned": 0, "prompt_tokens_saved": 0}
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                " key TEXT PRIMARY KEY,"
+                " prompt_version TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " prompt_tokens INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS extractions_created_at ON extractions (created_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, claim_text: str, prompt_version: str) -> Optional[dict]:
+        key = make_extraction_key(claim_text, prompt_version)
+        row = self._connection().execute(
+            "SELECT result, prompt_tokens FROM extractions WHERE key = ? AND created_at >= ?",
+            (key, time.time() - self.ttl_seconds),
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["prompt_tokens_saved"] += row[1]
+        return json.loads(row[0])
+
+    def put(self, claim_text: str, prompt_version: str, result: dict, prompt_tokens: int = 0):
+        key = make_extraction_key(claim_text, prompt_version)
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO extractions (key, prompt_version, result, prompt_tokens, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, prompt_version, json.dumps(result), prompt_tokens, time.time()),
+            )
+        with self._lock:
+            self._stats["stores"] += 1
+            self._puts += 1
+            due = self._puts % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        with self._connection() as connection:
+            deleted = self._prune(connection)
+        with self._lock:
+            self._stats["pruned"] += deleted
+        return deleted
+
+    def _prune(self, connection: sqlite3.Connection) -> int:
+        deleted = connection.execute(
+            "DELETE FROM extractions WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        excess = connection.execute("SELECT COUNT(*) FROM extractions").fetchone()[0] - self.max_rows
+        if excess > 0:
+            deleted += connection.execute(
+                "DELETE FROM extractions WHERE key IN"
+                " (SELECT key FROM extractions ORDER BY created_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        # Every hit is one Bedrock call that did not happen
+        stats["llm_calls_saved"] = stats["hits"]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache()
+    return _cache
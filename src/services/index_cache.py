@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_CACHE_DIR = os.environ.get(
+    "INDEX_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "iua", "index")
+)
+MAX_CACHE_BYTES = int(os.environ.get("INDEX_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+CHUNKS_FILE = "chunks.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+
+
+@dataclass
+class CachedIndex:
+    key: str
+    text_chunks: List[str]
+    # Memory-mapped, read-only; every worker process shares the same page cache
+    embeddings: np.ndarray
+
+
+def hash_text(doc_text: str) -> str:
+    return hashlib.sha256(doc_text.encode("utf-8")).hexdigest()
+
+
+def hash_file(path: str, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_cache_key(doc_hash: str, chunk_params: dict, model_name: str) -> str:
+    params = json.dumps(chunk_params, sort_keys=True)
+    return hashlib.sha256(f"{doc_hash}|{params}|{model_name}".encode("utf-8")).hexdigest()
+
+
+class IndexCache:
+    def __init__(self, cache_dir: str = INDEX_CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def contains(self, key: str) -> bool:
+        return os.path.isdir(self._entry_dir(key))
+
+    def load(self, key: str) -> Optional[CachedIndex]:
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, CHUNKS_FILE), encoding="utf-8") as f:
+                text_chunks = json.load(f)
+            embeddings = np.load(os.path.join(entry_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        # Touch the entry so eviction treats it as recently used
+        os.utime(entry_dir, None)
+        return CachedIndex(key=key, text_chunks=text_chunks, embeddings=embeddings)
+
+    def store(self, key: str, text_chunks: List[str], embeddings: np.ndarray):
+        entry_dir = self._entry_dir(key)
+        if os.path.isdir(entry_dir):
+            return
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key}.", dir=self.cache_dir)
+        try:
+            with open(os.path.join(tmp_dir, CHUNKS_FILE), "w", encoding="utf-8") as f:
+                json.dump(text_chunks, f)
+            np.save(os.path.join(tmp_dir, EMBEDDINGS_FILE), np.ascontiguousarray(embeddings, dtype=np.float32))
+            # Atomic publish; another process may have won the race, in which case we keep theirs
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        with self._lock:
+            self._stats["stores"] += 1
+        self.evict()
+
+    def get_or_build(
+        self,
+        doc_hash: str,
+        chunk_params: dict,
+        model_name: str,
+        build: Callable[[], Tuple[List[str], np.ndarray]]
+    ) -> CachedIndex:
+        key = make_cache_key(doc_hash, chunk_params, model_name)
+        cached = self.load(key)
+        if cached is not None:
+            with self._lock:
+                self._stats["hits"] += 1
+            return cached
+
+        with self._lock:
+            self._stats["misses"] += 1
+        text_chunks, embeddings = build()
+        self.store(key, text_chunks, embeddings)
+        return self.load(key) or CachedIndex(key=key, text_chunks=text_chunks, embeddings=embeddings)
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(
+                    os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+                )
+                entries.append((os.path.getmtime(path), size, path))
+            except OSError:
+                # Evicted by another worker process while we were scanning
+                continue
+        return entries
+
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        # Least recently used entries go first until the cache fits its byte budget
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            with self._lock:
+                self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["size_bytes"] = self.size_bytes()
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+_cache: Optional[IndexCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_index_cache() -> IndexCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = IndexCache()
+    return _cache
@@ -0,0 +1,44 @@
+import importlib
+import sys
+import threading
+import time
+from typing import Dict
+
+# Seconds each lazily imported module took to import, in the order they were first used
+_import_seconds: Dict[str, float] = {}
+_import_lock = threading.Lock()
+
+
+class LazyModule:
+    # Stands in for a heavy module (boto3, faiss, sentence_transformers) until an attribute is first
+    # used, so importing the app or agent does not pay for dependencies the current path never touches
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            already_loaded = self._name in sys.modules
+            started = time.perf_counter()
+            # import_module holds the per-module import lock, so racing threads import it once
+            module = importlib.import_module(self._name)
+            if not already_loaded:
+                with _import_lock:
+                    _import_seconds.setdefault(self._name, round(time.perf_counter() - started, 4))
+            self._module = module
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r} ({'loaded' if self._module is not None else 'not loaded'})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def import_timings() -> Dict[str, float]:
+    with _import_lock:
+        return dict(_import_seconds)
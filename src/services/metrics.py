@@ -0,0 +1,51 @@
+import bisect
+import threading
+from typing import Dict, Sequence
+
+# Upper bounds in milliseconds; anything slower lands in the overflow bucket
+DEFAULT_LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets_ms, elapsed_ms)] += 1
+            self._count += 1
+            self._total_ms += elapsed_ms
+            self._max_ms = max(self._max_ms, elapsed_ms)
+
+    def percentile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th percentile observation
+        with self._lock:
+            if not self._count:
+                return 0.0
+            target = q / 100 * self._count
+            running = 0
+            for bound, count in zip(self.buckets_ms + (self._max_ms,), self._counts):
+                running += count
+                if running >= target:
+                    return round(float(min(bound, self._max_ms)), 2)
+            return round(self._max_ms, 2)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            buckets = {f"le_{bound}": count for bound, count in zip(self.buckets_ms, self._counts)}
+            buckets["le_inf"] = self._counts[-1]
+            count, total_ms, max_ms = self._count, self._total_ms, self._max_ms
+        return {
+            "count": count,
+            "mean_ms": round(total_ms / count, 2) if count else 0.0,
+            "max_ms": round(max_ms, 2),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": buckets,
+        }
@@ -0,0 +1,199 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+NAME_INDEX_REFRESH_SECONDS = 60 * 60
+# After a failed scan the table is not scanned again for this long
+NAME_INDEX_RETRY_SECONDS = 60
+MIN_MATCH_SCORE = 0.45
+
+_LEGAL_SUFFIXES = {
+    "limited": "ltd",
+    "ltd": "ltd",
+    "plc": "plc",
+    "incorporated": "inc",
+    "inc": "inc",
+    "llc": "llc",
+    "llp": "llp",
+    "corporation": "corp",
+    "corp": "corp",
+    "company": "co",
+    "co": "co",
+    "gmbh": "gmbh",
+    "ag": "ag",
+    "sa": "sa",
+    "bv": "bv",
+    "holdings": "holdings",
+    "group": "group",
+}
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def split_name(name: str) -> Tuple[str, str]:
+    # Returns (normalised name, canonical legal suffix), e.g. "ACME LIMITED" -> ("acme", "ltd")
+    words = _NON_ALNUM_RE.sub(" ", name.lower().replace("&", " and ")).split()
+    if words and words[0] == "the":
+        words = words[1:]
+    suffix = []
+    while len(words) > 1 and words[-1] in _LEGAL_SUFFIXES:
+        suffix.insert(0, _LEGAL_SUFFIXES[words.pop()])
+    return " ".join(words), " ".join(suffix)
+
+
+def normalise_name(name: str) -> str:
+    # Legal-form suffixes carry little signal for fuzzy matching ("Acme Ltd" vs "ACME LIMITED"), so
+    # they are dropped; they only break ties between exact matches
+    return split_name(name)[0]
+
+
+def trigrams(normalised: str) -> set:
+    padded = f"  {normalised} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class NameCandidate:
+    key: str
+    name: str
+    score: float
+    # Several records share the normalised name and the query's suffix does not pick one out
+    ambiguous: bool = False
+
+
+class OrganisationNameIndex:
+    def __init__(self, names: Iterable[str] = ()):
+        self._keys: List[str] = []
+        self._trigram_counts: List[int] = []
+        self._suffixes: List[str] = []
+        # "Acme Ltd", "Acme PLC" and "Acme Inc" all normalise to "acme", so each key holds every record
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for name in names:
+            self._add(name)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _add(self, key: str):
+        normalised, suffix = split_name(key)
+        record = len(self._keys)
+        self._keys.append(key)
+        self._suffixes.append(suffix)
+        grams = trigrams(normalised)
+        self._trigram_counts.append(len(grams))
+        self._exact[normalised].append(record)
+        for gram in grams:
+            self._postings[gram].append(record)
+
+    def search(self, name: str, limit: int = 5, min_score: float = 0.0) -> List[NameCandidate]:
+        normalised, suffix = split_name(name)
+        if not normalised:
+            return []
+        exact = self._exact.get(normalised)
+        if exact:
+            if len(exact) > 1:
+                same_suffix = [record for record in exact if self._suffixes[record] == suffix]
+                exact = same_suffix or exact
+            return [
+                NameCandidate(key=self._keys[record], name=self._keys[record], score=1.0, ambiguous=len(exact) > 1)
+                for record in exact
+            ]
+
+        query_grams = trigrams(normalised)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+
+        # Dice coefficient over trigram sets
+        candidates = []
+        for record, overlap in shared.items():
+            score = 2 * overlap / (len(query_grams) + self._trigram_counts[record])
+            if score >= min_score:
+                candidates.append((round(score, 4), self._suffixes[record] == suffix, record))
+        # Equal scores (names differing only in legal form) go to the record with the query's suffix
+        candidates.sort(key=lambda candidate: candidate[:2], reverse=True)
+        return [
+            NameCandidate(key=self._keys[record], name=self._keys[record], score=score)
+            for score, _, record in candidates[:limit]
+        ]
+
+    def resolve(self, name: str, min_score: float = MIN_MATCH_SCORE) -> Optional[NameCandidate]:
+        candidates = self.search(name, limit=1, min_score=min_score)
+        return candidates[0] if candidates and not candidates[0].ambiguous else None
+
+
+class RefreshingNameIndex:
+    # Holds a snapshot of the table's name column and swaps in a fresh one in the background
+    # once it is older than refresh_seconds; lookups never wait on a refresh after the first load.
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[str]],
+        refresh_seconds: float = NAME_INDEX_REFRESH_SECONDS,
+        retry_seconds: float = NAME_INDEX_RETRY_SECONDS
+    ):
+        self.loader = loader
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self._index: Optional[OrganisationNameIndex] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        # Held across the first load, so concurrent first lookups share one scan
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self._failed_at: Optional[float] = None
+        self._load_error: Optional[Exception] = None
+
+    def _load(self):
+        try:
+            index = OrganisationNameIndex(self.loader())
+        except Exception as error:
+            with self._lock:
+                self._failed_at = time.monotonic()
+                self._load_error = error
+            raise
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.monotonic()
+            self._refreshing = False
+            self._failed_at = None
+            self._load_error = None
+
+    def _backing_off(self) -> bool:
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_seconds
+
+    def _first_load(self):
+        with self._load_lock:
+            if self._index is not None:
+                return
+            if self._backing_off():
+                raise RuntimeError(f"Organisation name index unavailable: {self._load_error!r}")
+            self._load()
+
+    def _refresh_in_background(self):
+        try:
+            self._load()
+        except Exception:
+            # Keep serving the previous snapshot; a lookup after retry_seconds will try again
+            with self._lock:
+                self._refreshing = False
+
+    @property
+    def index(self) -> OrganisationNameIndex:
+        if self._index is None:
+            self._first_load()
+        elif time.monotonic() - self._loaded_at > self.refresh_seconds and not self._backing_off():
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._refresh_in_background, name="name-index-refresh", daemon=True).start()
+        return self._index
+
+    def search(self, name: str, limit: int = 5, min_score: float = 0.0) -> List[NameCandidate]:
+        return self.index.search(name, limit, min_score)
+
+    def resolve(self, name: str, min_score: float = MIN_MATCH_SCORE) -> Optional[NameCandidate]:
+        return self.index.resolve(name, min_score)
@@ -0,0 +1,75 @@
+from typing import Any, Iterable, Sequence, Tuple
+
+import numpy as np
+
+# Portfolio tables are either a sequence of claim_data dicts or a pandas DataFrame with the same
+# columns. DataFrames stay columnar end to end; dict rows need one Python pass to pull fields out.
+
+
+def _is_frame(table: Any) -> bool:
+    return hasattr(table, "columns") and hasattr(table, "to_numpy")
+
+
+def _parse_amount(value: Any) -> float:
+    try:
+        return float(int(value))
+    except (TypeError, ValueError):
+        pass
+    if value is None or value == "":
+        return 0.0
+    try:
+        return float(int(str(value).replace(",", "").strip()))
+    except ValueError:
+        return np.nan
+
+
+def coverage_amounts(table: Any) -> np.ndarray:
+    # Blank coverage counts as 0 like the single-row estimators; unparseable values become NaN
+    if _is_frame(table):
+        import pandas as pd
+
+        if "coverage_amount" not in table.columns:
+            return np.zeros(len(table))
+        column = table["coverage_amount"]
+        if pd.api.types.is_numeric_dtype(column):
+            return column.fillna(0).to_numpy(dtype=np.float64)
+        text = column.fillna("").astype(str).str.replace(",", "", regex=False).str.strip()
+        return pd.to_numeric(text.mask(text == "", "0"), errors="coerce").to_numpy(dtype=np.float64)
+
+    return np.fromiter(
+        (_parse_amount(record.get("coverage_amount", "")) for record in table),
+        dtype=np.float64,
+        count=len(table),
+    )
+
+
+def region_lookup(table: Any, mapping: dict, default: float) -> np.ndarray:
+    if _is_frame(table):
+        import pandas as pd
+
+        if "region_of_operation" not in table.columns:
+            return np.full(len(table), default, dtype=np.float64)
+        # Each distinct region is mapped once, then gathered back to the rows by code
+        codes, uniques = pd.factorize(table["region_of_operation"])
+        values = np.array([mapping.get(str(region).lower(), default) for region in uniques] + [default])
+        return values[codes]
+
+    # Lower-casing is memoised per distinct raw value, so each row costs two dict lookups
+    values = {}
+    lookup = np.empty(len(table), dtype=np.float64)
+    for row, record in enumerate(table):
+        region = record.get("region_of_operation", "")
+        value = values.get(region)
+        if value is None:
+            value = values[region] = mapping.get(str(region or "").lower(), default)
+        lookup[row] = value
+    return lookup
+
+
+def as_rows(table: Any) -> Sequence:
+    return table if _is_frame(table) or isinstance(table, Sequence) else list(table)
+
+
+def chunk_ranges(total: int, chunk_size: int) -> Iterable[Tuple[int, int]]:
+    for start in range(0, total, chunk_size):
+        yield start, min(start + chunk_size, total)
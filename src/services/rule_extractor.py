@@ -0,0 +1,209 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Fields at or above this confidence are trusted without asking the LLM
+CONFIDENCE_THRESHOLD = 0.8
+
+LABELLED_CONFIDENCE = 0.95
+LABELLED_FREE_TEXT_CONFIDENCE = 0.9
+UNIQUE_PATTERN_CONFIDENCE = 0.85
+PATTERN_CONFIDENCE = 0.7
+GUESS_CONFIDENCE = 0.5
+# Longer labelled names are more likely a sentence than a company name
+ORGANISATION_NAME_MAX_CHARS = 80
+
+REGION_SYNONYMS = {
+    "gb": ("gb", "uk", "united kingdom", "great britain", "england", "scotland", "wales", "northern ireland", "britain"),
+    "usa": ("usa", "us", "u.s.", "u.s.a.", "united states", "united states of america", "america"),
+    "eu": ("eu", "europe", "european union", "emea"),
+    "asia": ("asia", "apac", "asia pacific", "asia-pacific"),
+    "africa": ("africa",),
+}
+
+_FIELD_LABELS = {
+    "organisation_name": r"(?:organi[sz]ation(?:\s+name)?|company(?:\s+name)?|insured(?:\s+name)?|client(?:\s+name)?|applicant|policyholder|proposer|business\s+name)",
+    "region_of_operation": r"(?:region(?:\s+of\s+operation)?|territory|operating\s+region|country\s+of\s+operation|location)",
+    "coverage_amount": r"(?:coverage(?:\s+amount)?|cover(?:age)?\s+limit|limit\s+of\s+(?:indemnity|liability)|sum\s+insured|insured\s+amount|amount\s+of\s+cover|policy\s+limit)",
+    "premium": r"(?:premium(?:\s+(?:amount|quoted|budget|expected|target))?|target\s+premium|expected\s+premium|quoted\s+premium)",
+    "export_destination": r"(?:export\s+destinations?|exports?\s+to|export\s+markets?|destination\s+markets?)",
+    "client_priorities": r"(?:client\s+priorities|priorities|key\s+priorities|client\s+requirements|key\s+concerns)",
+}
+
+# "Label: value", "Label - value" or a two-cell markdown table row "| Label | value |"
+_LABEL_LINE_RE = {
+    field: re.compile(
+        rf"^\s*(?:[-*•]\s*)?(?:\|\s*)?\**{label}\**\s*(?::|-|–|\|)\s*(?P<value>.+?)\s*\|?\s*$",
+        re.IGNORECASE | re.MULTILINE,
+    )
+    for field, label in _FIELD_LABELS.items()
+}
+
+_AMOUNT_RE = re.compile(
+    r"(?P<currency>USD|GBP|EUR|US\$|\$|£|€)?\s*"
+    r"(?P<number>\d{1,3}(?:[,\s]\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)\s*"
+    r"(?P<scale>bn|billion|b|mn|million|m|k|thousand)?\b",
+    re.IGNORECASE,
+)
+# A labelled number is only an amount with a currency or a magnitude, and never a percentage, a
+# duration or a cross-reference ("Coverage: 5 years", "Premium: 3% of turnover", "see Section 4.2")
+_TRAILING_CURRENCY_RE = re.compile(r"\s*(?:USD|GBP|EUR)\b", re.IGNORECASE)
+_NOT_AN_AMOUNT_AFTER_RE = re.compile(r"\s*(?:%|per\s*cent|percent|years?\b|yrs?\b|months?\b)", re.IGNORECASE)
+_NOT_AN_AMOUNT_BEFORE_RE = re.compile(r"(?:section|clause|schedule|page|paragraph|§)\s*$", re.IGNORECASE)
+# Labelled names end where a description starts: "Acme - a UK manufacturer", "Acme, trading as ...", "Acme (UK)"
+_NAME_END_RE = re.compile(r"\s+[-–]\s+|,|\(")
+_SCALES = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mn": 1e6, "million": 1e6, "b": 1e9, "bn": 1e9, "billion": 1e9}
+_COVERAGE_CONTEXT_RE = re.compile(
+    r"(?:cover(?:age)?|limit|sum\s+insured|indemnity)[^.\n]{0,60}?"
+    r"(?P<amount>(?:USD|GBP|EUR|US\$|\$|£|€)\s*\d[\d,.\s]*(?:bn|billion|mn|million|m|k)?\b)",
+    re.IGNORECASE,
+)
+_PREMIUM_CONTEXT_RE = re.compile(
+    r"premium[^.\n]{0,60}?"
+    r"(?P<amount>(?:USD|GBP|EUR|US\$|\$|£|€)\s*\d[\d,.\s]*(?:bn|billion|mn|million|m|k)?\b)",
+    re.IGNORECASE,
+)
+_COMPANY_RE = re.compile(
+    r"\b(?P<name>(?:[A-Z][\w&'.-]*\s+){0,5}?[A-Z][\w&'.-]*\s+"
+    r"(?:Ltd\.?|Limited|PLC|plc|Inc\.?|LLC|LLP|Corp\.?|Corporation|GmbH|S\.?A\.?|AG|B\.?V\.?|Group|Holdings))(?=\W|$)"
+)
+
+
+@dataclass
+class FieldExtraction:
+    value: str
+    confidence: float
+
+
+def _amount_value(match: re.Match) -> str:
+    number = float(re.sub(r"[,\s]", "", match.group("number")))
+    scale = _SCALES.get((match.group("scale") or "").lower(), 1)
+    return str(int(round(number * scale)))
+
+
+def parse_amount(text: str) -> Optional[str]:
+    match = _AMOUNT_RE.search(text)
+    if not match or not match.group("number"):
+        return None
+    return _amount_value(match)
+
+
+def parse_labelled_amount(text: str) -> Optional[str]:
+    match = _AMOUNT_RE.search(text)
+    if not match or not match.group("number"):
+        return None
+    before, after = text[:match.start("number")], text[match.end("number"):]
+    if _NOT_AN_AMOUNT_BEFORE_RE.search(before) or _NOT_AN_AMOUNT_AFTER_RE.match(after):
+        return None
+    if not (match.group("currency") or match.group("scale") or _TRAILING_CURRENCY_RE.match(text[match.end():])):
+        return None
+    return _amount_value(match)
+
+
+def parse_labelled_name(text: str) -> Optional[str]:
+    name = _NAME_END_RE.split(text, maxsplit=1)[0].strip().rstrip(".")
+    if not name or len(name) > ORGANISATION_NAME_MAX_CHARS:
+        return None
+    return name
+
+
+def _mentions(text: str, synonym: str, strict_codes: bool) -> bool:
+    if strict_codes and len(synonym) <= 3 and synonym.isalpha():
+        # Bare codes in running prose only count in capitals: "US" is a country, "us" a pronoun
+        return re.search(rf"(?<![A-Za-z]){synonym.upper()}(?![A-Za-z])", text) is not None
+    return re.search(rf"(?<![a-z]){re.escape(synonym)}(?![a-z])", text.lower()) is not None
+
+
+def normalise_region(text: str) -> Optional[str]:
+    for region, synonyms in REGION_SYNONYMS.items():
+        if any(_mentions(text, synonym, strict_codes=False) for synonym in synonyms):
+            return region
+    return None
+
+
+def _regions_mentioned(text: str) -> List[str]:
+    return [
+        region for region, synonyms in REGION_SYNONYMS.items()
+        if any(_mentions(text, synonym, strict_codes=True) for synonym in synonyms)
+    ]
+
+
+def _labelled(text: str, field: str) -> Optional[str]:
+    match = _LABEL_LINE_RE[field].search(text)
+    if not match:
+        return None
+    value = match.group("value").strip().strip("*|").strip()
+    return value or None
+
+
+def _unique(values: Iterable[str]) -> List[str]:
+    seen = []
+    for value in values:
+        if value not in seen:
+            seen.append(value)
+    return seen
+
+
+def _amount_field(text: str, field: str, context_re: re.Pattern) -> Optional[FieldExtraction]:
+    labelled = _labelled(text, field)
+    if labelled:
+        # The document states the field here; if it is not a plain amount the LLM reads it instead
+        amount = parse_labelled_amount(labelled)
+        return FieldExtraction(amount, LABELLED_CONFIDENCE) if amount else None
+    candidates = _unique(filter(None, (parse_amount(m.group("amount")) for m in context_re.finditer(text))))
+    if len(candidates) == 1:
+        return FieldExtraction(candidates[0], UNIQUE_PATTERN_CONFIDENCE)
+    if candidates:
+        return FieldExtraction(candidates[0], GUESS_CONFIDENCE)
+    return None
+
+
+def _organisation(text: str) -> Optional[FieldExtraction]:
+    labelled = _labelled(text, "organisation_name")
+    if labelled:
+        name = parse_labelled_name(labelled)
+        return FieldExtraction(name, LABELLED_CONFIDENCE) if name else None
+    candidates = _unique(m.group("name").strip() for m in _COMPANY_RE.finditer(text))
+    if len(candidates) == 1:
+        return FieldExtraction(candidates[0], UNIQUE_PATTERN_CONFIDENCE)
+    if candidates:
+        return FieldExtraction(candidates[0], GUESS_CONFIDENCE)
+    return None
+
+
+def _region(text: str) -> Optional[FieldExtraction]:
+    labelled = _labelled(text, "region_of_operation")
+    if labelled:
+        region = normalise_region(labelled)
+        if region:
+            return FieldExtraction(region, LABELLED_CONFIDENCE)
+    regions = _regions_mentioned(text)
+    if len(regions) == 1:
+        # A single mention is often where the company is based, not where it operates
+        return FieldExtraction(regions[0], PATTERN_CONFIDENCE)
+    if regions:
+        return FieldExtraction(regions[0], GUESS_CONFIDENCE)
+    return None
+
+
+def _free_text(text: str, field: str) -> Optional[FieldExtraction]:
+    labelled = _labelled(text, field)
+    if labelled:
+        return FieldExtraction(labelled, LABELLED_FREE_TEXT_CONFIDENCE)
+    return None
+
+
+def extract_fields(text: str) -> Dict[str, FieldExtraction]:
+    extractors: List[Tuple[str, Optional[FieldExtraction]]] = [
+        ("organisation_name", _organisation(text)),
+        ("region_of_operation", _region(text)),
+        ("coverage_amount", _amount_field(text, "coverage_amount", _COVERAGE_CONTEXT_RE)),
+        ("premium", _amount_field(text, "premium", _PREMIUM_CONTEXT_RE)),
+        ("export_destination", _free_text(text, "export_destination")),
+        ("client_priorities", _free_text(text, "client_priorities")),
+    ]
+    return {field: extraction for field, extraction in extractors if extraction is not None}
+
+
+def confident_fields(extractions: Dict[str, FieldExtraction], threshold: float = CONFIDENCE_THRESHOLD) -> Dict[str, str]:
+    return {field: e.value for field, e in extractions.items() if e.confidence >= threshold}
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from src.services.lazy_imports import lazy_import
+from src.services.metrics import LatencyHistogram
+from src.services.tracing import span
+
+boto3 = lazy_import("boto3")
+botocore_config = lazy_import("botocore.config")
+
+SAGEMAKER_MAX_CONCURRENCY = 16
+SAGEMAKER_TIMEOUT_SECONDS = 10.0
+
+
+class AsyncSageMakerRuntime:
+    # boto3 has no async transport, so endpoint calls run on a bounded thread pool sized to the
+    # client's connection pool; the awaiting coroutine (and every other session) keeps running.
+    def __init__(
+        self,
+        client=None,
+        max_concurrency: int = SAGEMAKER_MAX_CONCURRENCY,
+        timeout_seconds: float = SAGEMAKER_TIMEOUT_SECONDS
+    ):
+        self.client = client or boto3.client(
+            "sagemaker-runtime",
+            config=botocore_config.Config(
+                max_pool_connections=max_concurrency,
+                connect_timeout=timeout_seconds,
+                read_timeout=timeout_seconds,
+                retries={"max_attempts": 2, "mode": "standard"},
+            ),
+        )
+        self.timeout_seconds = timeout_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="sagemaker")
+        self._latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._latency_lock = threading.Lock()
+
+    def _invoke_blocking(self, endpoint_name: str, body: str, content_type: str) -> bytes:
+        response = self.client.invoke_endpoint(
+            EndpointName=endpoint_name,
+            ContentType=content_type,
+            Body=body
+        )
+        return response["Body"].read()
+
+    def _histogram(self, endpoint_name: str) -> LatencyHistogram:
+        with self._latency_lock:
+            return self._latency[endpoint_name]
+
+    async def invoke(
+        self,
+        endpoint_name: str,
+        body: str,
+        content_type: str = "text/csv",
+        timeout_seconds: Optional[float] = None
+    ) -> bytes:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            with span("sagemaker.invoke_endpoint", "sagemaker", endpoint=endpoint_name, payload_bytes=len(body)):
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, self._invoke_blocking, endpoint_name, body, content_type),
+                    timeout=timeout_seconds or self.timeout_seconds,
+                )
+        finally:
+            self._histogram(endpoint_name).record((time.perf_counter() - started) * 1000)
+
+    def latency_stats(self) -> Dict[str, dict]:
+        with self._latency_lock:
+            histograms = dict(self._latency)
+        return {endpoint: histogram.snapshot() for endpoint, histogram in histograms.items()}
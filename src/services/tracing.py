@@ -0,0 +1,235 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+# One JSON object per span, using OpenTelemetry's OTLP/JSON field names so the file can be replayed
+# into a collector. Off unless a path is set; past TRACE_EXPORT_MAX_BYTES the file is rotated to
+# <path>.1, so at most twice that is kept on disk.
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", "")
+TRACE_EXPORT_MAX_BYTES = int(os.environ.get("TRACE_EXPORT_MAX_BYTES", 64 * 1024 * 1024))
+SERVICE_NAME = "iua"
+
+# Spans for calls leaving the process are CLIENT spans in OpenTelemetry terms
+_CLIENT_KINDS = {"llm", "dynamodb", "sagemaker"}
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("iua_trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("iua_span", default=None)
+
+
+def _new_id(length: int) -> str:
+    return uuid.uuid4().hex[:length]
+
+
+def _otel_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def summary(self) -> dict:
+        return {"span_id": self.span_id, "name": self.name, "kind": self.kind, "duration_ms": round(self.duration_ms, 2)}
+
+    def to_otel(self) -> dict:
+        attributes = {"iua.kind": self.kind, **self.attributes}
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": "SPAN_KIND_CLIENT" if self.kind in _CLIENT_KINDS else "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": key, "value": _otel_value(value)} for key, value in attributes.items()],
+            "status": {"code": "STATUS_CODE_ERROR", "message": self.error} if self.error else {"code": "STATUS_CODE_OK"},
+            "resource": {"service.name": SERVICE_NAME},
+        }
+
+
+class Trace:
+    # Spans are started from the event loop and from worker threads (DynamoDB via to_thread)
+    def __init__(self, name: str, **attributes):
+        self.trace_id = _new_id(32)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, "turn", None, **attributes)
+
+    def start_span(self, name: str, kind: str, parent: Optional[Span], **attributes) -> Span:
+        span = Span(
+            name=name,
+            kind=kind,
+            trace_id=self.trace_id,
+            span_id=_new_id(16),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes),
+        )
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None):
+        if error is not None:
+            span.error = repr(error)
+        if span.end_ns is None:
+            span.end_ns = time.time_ns()
+
+    def waterfall(self) -> List[dict]:
+        # Rows in start order with offsets from the start of the turn and nesting depth
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+        by_id = {span.span_id: span for span in spans}
+        rows = []
+        for span in spans:
+            depth, parent = 0, by_id.get(span.parent_id)
+            while parent is not None:
+                depth, parent = depth + 1, by_id.get(parent.parent_id)
+            rows.append({
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "kind": span.kind,
+                "depth": depth,
+                "start_ms": round((span.start_ns - self.root.start_ns) / 1e6, 2),
+                "duration_ms": round(span.duration_ms, 2),
+                "error": span.error,
+                "attributes": span.attributes,
+            })
+        return rows
+
+    def totals(self) -> Dict[str, dict]:
+        # Time per kind; nested spans of the same kind are counted once via their outermost span
+        with self._lock:
+            spans = list(self.spans)
+        by_id = {span.span_id: span for span in spans}
+        totals: Dict[str, dict] = {}
+        for span in spans:
+            if span.kind == "turn":
+                continue
+            parent = by_id.get(span.parent_id)
+            while parent is not None and parent.kind != span.kind:
+                parent = by_id.get(parent.parent_id)
+            entry = totals.setdefault(span.kind, {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            if parent is None:
+                entry["total_ms"] = round(entry["total_ms"] + span.duration_ms, 2)
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "duration_ms": round(self.root.duration_ms, 2),
+            "totals": self.totals(),
+            "spans": self.waterfall(),
+        }
+
+
+class JsonlSpanExporter:
+    def __init__(self, path: str = TRACE_EXPORT_PATH, max_bytes: int = TRACE_EXPORT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        if not self.path:
+            return
+        with trace._lock:
+            lines = [json.dumps(span.to_otel(), default=str) for span in trace.spans]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) >= self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+            except OSError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write("\n".join(lines) + "\n")
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def _reset(variable: contextvars.ContextVar, token: contextvars.Token):
+    # A streaming caller that abandons the generator may finalise it from another context
+    try:
+        variable.reset(token)
+    except ValueError:
+        pass
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes) -> Iterator[Optional[Span]]:
+    # A no-op outside a traced turn, so instrumented code costs nothing in scripts and benchmarks
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    current = trace.start_span(name, kind, _current_span.get(), **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as error:
+        trace.end_span(current, error)
+        raise
+    finally:
+        _reset(_current_span, token)
+        trace.end_span(current)
+
+
+@contextmanager
+def trace_turn(name: str, exporter: Optional[JsonlSpanExporter] = None, **attributes) -> Iterator[Trace]:
+    trace = Trace(name, **attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    except BaseException as error:
+        trace.end_span(trace.root, error)
+        raise
+    finally:
+        _reset(_current_span, span_token)
+        _reset(_current_trace, trace_token)
+        trace.end_span(trace.root)
+        (exporter or get_span_exporter()).export(trace)
+
+
+_exporter: Optional[JsonlSpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_span_exporter() -> JsonlSpanExporter:
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = JsonlSpanExporter()
+    return _exporter
@@ -0,0 +1,88 @@
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from src.services.metrics import LatencyHistogram
+
+# Turns running at once per instance; each holds Bedrock streams, tool calls and encoder time
+MAX_CONCURRENT_TURNS = int(os.environ.get("MAX_CONCURRENT_TURNS", 8))
+# Turns allowed to wait for a slot; beyond this new turns are turned away straight away
+MAX_QUEUED_TURNS = int(os.environ.get("MAX_QUEUED_TURNS", 32))
+QUEUE_TIMEOUT_SECONDS = float(os.environ.get("QUEUE_TIMEOUT_SECONDS", 30.0))
+
+
+class TurnRejected(Exception):
+    # reason is "queue_full" (429, try again shortly) or "queue_timeout" (503, instance saturated)
+    def __init__(self, reason: str, retry_after_seconds: int):
+        super().__init__(f"Turn rejected: {reason}")
+        self.reason = reason
+        self.retry_after_seconds = retry_after_seconds
+
+
+class TurnLimiter:
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_TURNS,
+        max_queued: int = MAX_QUEUED_TURNS,
+        queue_timeout_seconds: float = QUEUE_TIMEOUT_SECONDS
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        # Only touched from the event loop, so plain counters are enough
+        self.active = 0
+        self.queued = 0
+        self._counts = {"admitted": 0, "rejected_queue_full": 0, "rejected_queue_timeout": 0}
+        self.queue_wait = LatencyHistogram()
+        self.turn_latency = LatencyHistogram()
+
+    def retry_after_seconds(self) -> int:
+        # Roughly how long the queue ahead takes to drain at the current turn latency
+        snapshot = self.turn_latency.snapshot()
+        mean_seconds = (snapshot["mean_ms"] or 1000.0) / 1000
+        return max(1, math.ceil(mean_seconds * (self.queued + 1) / self.max_concurrent))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        queued_at = time.perf_counter()
+        if not self._semaphore.locked():
+            # A free slot is taken without suspending, so turns arriving together are counted exactly
+            await self._semaphore.acquire()
+        elif self.queued >= self.max_queued:
+            self._counts["rejected_queue_full"] += 1
+            raise TurnRejected("queue_full", self.retry_after_seconds())
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                self._counts["rejected_queue_timeout"] += 1
+                raise TurnRejected("queue_timeout", self.retry_after_seconds()) from None
+            finally:
+                self.queued -= 1
+
+        started = time.perf_counter()
+        self.queue_wait.record((started - queued_at) * 1000)
+        self._counts["admitted"] += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            self.turn_latency.record((time.perf_counter() - started) * 1000)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "active": self.active,
+            "queued": self.queued,
+            **self._counts,
+            "queue_wait": self.queue_wait.snapshot(),
+            "turn_latency": self.turn_latency.snapshot(),
+        }
@@ -0,0 +1,433 @@
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.lazy_imports import lazy_import
+from src.services.tracing import span
+
+faiss = lazy_import("faiss")
+
+# Corpus-size thresholds (in vectors) at which the store moves to an approximate index
+FLAT_MAX_VECTORS = 20_000
+HNSW_MAX_VECTORS = 1_000_000
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+# Fewer vectors than this cannot train useful IVF centroids; smaller corpora use flat until they get there
+IVF_MIN_TRAIN_VECTORS = 1_000
+# k-means wants at least this many training vectors per centroid
+IVF_MIN_POINTS_PER_LIST = 39
+# IVF centroids and SQ8 / PQ codebooks are retrained once the corpus has grown by this factor since
+# the last training
+IVF_RETRAIN_GROWTH = 2.0
+# Training runs on at most this many vectors, sampled evenly
+TRAIN_SAMPLE_MAX = 50_000
+
+# How the index holds each vector: float32 (exact), fp16 (half size), sq8 (one byte per dimension) or
+# pq (PQ_SUBQUANTIZERS bytes). Compressed indexes return RERANK_FACTOR x k candidates, which are
+# re-ranked against the exact vectors (memory-mapped from the index cache) before the top k go back.
+STORAGE_TYPES = ("float32", "fp16", "sq8", "pq")
+VECTOR_STORAGE = os.environ.get("VECTOR_STORAGE", "float32")
+RERANK_FACTOR = int(os.environ.get("VECTOR_RERANK_FACTOR", 4))
+PQ_SUBQUANTIZERS = 48
+PQ_BITS = 8
+# PQ codebooks need a few thousand vectors to train; smaller corpora use sq8 until they get there
+PQ_MIN_TRAIN_VECTORS = 10_000
+# Filtered searches over at most this many candidate vectors are answered exactly with NumPy
+EXACT_FILTER_MAX_VECTORS = 50_000
+# HNSW cannot delete in place; removed ids are tombstoned until this fraction triggers a rebuild
+MAX_TOMBSTONE_FRACTION = 0.2
+
+
+@dataclass
+class ChunkHit:
+    document_id: str
+    chunk_index: int
+    text: str
+    distance: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _Document:
+    document_id: str
+    ids: np.ndarray
+    text_chunks: List[str]
+    vectors: np.ndarray
+    metadata: Dict[str, Any]
+
+
+def choose_index_type(
+    num_vectors: int,
+    flat_max_vectors: int = FLAT_MAX_VECTORS,
+    hnsw_max_vectors: int = HNSW_MAX_VECTORS
+) -> str:
+    if num_vectors <= flat_max_vectors:
+        return "flat"
+    if num_vectors <= hnsw_max_vectors:
+        return "hnsw"
+    return "ivf"
+
+
+def pq_subquantizers(dimension: int, preferred: int = PQ_SUBQUANTIZERS) -> int:
+    # PQ splits each vector into equal sub-vectors, so the count has to divide the dimension
+    return max(m for m in range(1, min(preferred, dimension) + 1) if dimension % m == 0)
+
+
+def _training_sample(vectors: np.ndarray) -> np.ndarray:
+    if len(vectors) <= TRAIN_SAMPLE_MAX:
+        return vectors
+    step = len(vectors) / TRAIN_SAMPLE_MAX
+    return np.ascontiguousarray(vectors[(np.arange(TRAIN_SAMPLE_MAX) * step).astype(np.int64)])
+
+
+def build_index(
+    index_type: str,
+    dimension: int,
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    storage: str = "float32"
+) -> "faiss.Index":
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown vector storage: {storage}")
+    scalar_types = {"fp16": faiss.ScalarQuantizer.QT_fp16, "sq8": faiss.ScalarQuantizer.QT_8bit}
+    pq_m = pq_subquantizers(dimension)
+    if index_type == "flat":
+        if storage == "float32":
+            inner = faiss.IndexFlatL2(dimension)
+        elif storage == "pq":
+            inner = faiss.IndexPQ(dimension, pq_m, PQ_BITS)
+        else:
+            inner = faiss.IndexScalarQuantizer(dimension, scalar_types[storage])
+        index = faiss.IndexIDMap2(inner)
+    elif index_type == "hnsw":
+        if storage == "float32":
+            inner = faiss.IndexHNSWFlat(dimension, HNSW_M)
+        elif storage == "pq":
+            inner = faiss.IndexHNSWPQ(dimension, pq_m, HNSW_M)
+        else:
+            inner = faiss.IndexHNSWSQ(dimension, scalar_types[storage], HNSW_M)
+        inner.hnsw.efSearch = HNSW_EF_SEARCH
+        index = faiss.IndexIDMap2(inner)
+    elif index_type == "ivf":
+        nlist = max(1, min(int(4 * math.sqrt(len(vectors))), len(vectors) // IVF_MIN_POINTS_PER_LIST))
+        quantizer = faiss.IndexFlatL2(dimension)
+        if storage == "float32":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        elif storage == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, PQ_BITS)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, scalar_types[storage])
+        index.nprobe = IVF_NPROBE
+    else:
+        raise ValueError(f"Unknown index type: {index_type}")
+    if not index.is_trained:
+        index.train(_training_sample(vectors))
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def _matches(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    if not filters:
+        return True
+    for key, expected in filters.items():
+        value = metadata.get(key)
+        if isinstance(expected, (list, tuple, set, frozenset)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class VectorStore:
+    def __init__(
+        self,
+        dimension: int,
+        index_type: str = "auto",
+        flat_max_vectors: int = FLAT_MAX_VECTORS,
+        hnsw_max_vectors: int = HNSW_MAX_VECTORS,
+        storage: str = VECTOR_STORAGE,
+        rerank_factor: int = RERANK_FACTOR
+    ):
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown vector storage: {storage}")
+        self.dimension = dimension
+        self.requested_index_type = index_type
+        self.flat_max_vectors = flat_max_vectors
+        self.hnsw_max_vectors = hnsw_max_vectors
+        self.requested_storage = storage
+        self.rerank_factor = rerank_factor
+        self.index_type = None
+        self.storage = None
+        self._index: Optional["faiss.Index"] = None
+        self._documents: Dict[str, _Document] = {}
+        self._id_lookup: Dict[int, Tuple[str, int]] = {}
+        self._tombstones = 0
+        self._trained_size = 0
+        self._next_id = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._id_lookup)
+
+    @property
+    def document_ids(self) -> List[str]:
+        return list(self._documents)
+
+    def add_document(
+        self,
+        document_id: str,
+        text_chunks: List[str],
+        vectors: np.ndarray,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        if len(text_chunks) != len(vectors):
+            raise ValueError("text_chunks and vectors must have the same length")
+        with self._lock:
+            # Re-adding an existing id is an update: old chunks are dropped first
+            self.remove_document(document_id)
+            ids = np.arange(self._next_id, self._next_id + len(text_chunks), dtype=np.int64)
+            self._next_id += len(text_chunks)
+            metadata = {**(metadata or {}), "document_id": document_id}
+            document = _Document(
+                document_id=document_id,
+                ids=ids,
+                text_chunks=list(text_chunks),
+                vectors=vectors,
+                metadata=metadata,
+            )
+
+            # The document is only registered once the index holds it, so a failed build leaves the
+            # store as it was
+            if self._needs_rebuild(len(self) + len(ids)):
+                self._rebuild(document)
+            elif len(ids):
+                self._index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), ids)
+            self._documents[document_id] = document
+            for position, chunk_id in enumerate(ids):
+                self._id_lookup[int(chunk_id)] = (document_id, position)
+
+    def update_document(
+        self,
+        document_id: str,
+        text_chunks: List[str],
+        vectors: np.ndarray,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.add_document(document_id, text_chunks, vectors, metadata)
+
+    def remove_document(self, document_id: str) -> bool:
+        with self._lock:
+            document = self._documents.pop(document_id, None)
+            if document is None:
+                return False
+            for chunk_id in document.ids:
+                self._id_lookup.pop(int(chunk_id), None)
+
+            if self._target_index_type(len(self)) != self.index_type or self._target_storage(len(self)) != self.storage:
+                self._rebuild()
+            elif self.index_type == "hnsw":
+                self._tombstones += len(document.ids)
+                if self._tombstones > MAX_TOMBSTONE_FRACTION * max(self._index.ntotal, 1):
+                    self._rebuild()
+            elif len(document.ids):
+                self._index.remove_ids(document.ids)
+            return True
+
+    def search(
+        self,
+        query_vectors: np.ndarray,
+        k: int = 3,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[List[ChunkHit]]:
+        query_vectors = np.ascontiguousarray(np.atleast_2d(query_vectors), dtype=np.float32)
+        with span(
+            "faiss.search", "faiss",
+            queries=len(query_vectors), k=k, index_type=self.index_type, storage=self.storage, filtered=bool(filters)
+        ):
+            return self._search(query_vectors, k, filters)
+
+    def _search(self, query_vectors: np.ndarray, k: int, filters: Optional[Dict[str, Any]]) -> List[List[ChunkHit]]:
+        with self._lock:
+            if not self._id_lookup:
+                return [[] for _ in range(len(query_vectors))]
+            if filters:
+                candidates = [d for d in self._documents.values() if _matches(d.metadata, filters)]
+                candidate_count = sum(len(d.ids) for d in candidates)
+                if candidate_count == 0:
+                    return [[] for _ in range(len(query_vectors))]
+                if candidate_count <= EXACT_FILTER_MAX_VECTORS:
+                    return self._exact_search(query_vectors, k, candidates)
+            return self._index_search(query_vectors, k, filters)
+
+    def _exact_search(self, query_vectors: np.ndarray, k: int, documents: Iterable[_Document]) -> List[List[ChunkHit]]:
+        documents = list(documents)
+        ids = np.concatenate([d.ids for d in documents])
+        vectors = np.vstack([np.asarray(d.vectors, dtype=np.float32) for d in documents])
+        distances, positions = faiss.knn(query_vectors, vectors, min(k, len(ids)))
+        return [
+            [self._hit(int(ids[p]), float(dist)) for p, dist in zip(row_positions, row_distances) if p >= 0]
+            for row_positions, row_distances in zip(positions, distances)
+        ]
+
+    @property
+    def reranks(self) -> bool:
+        return self.storage not in (None, "float32") and self.rerank_factor > 0
+
+    def _index_search(self, query_vectors: np.ndarray, k: int, filters: Optional[Dict[str, Any]]) -> List[List[ChunkHit]]:
+        # Over-fetch so tombstoned or filtered-out ids still leave k results where possible
+        wanted = k * self.rerank_factor if self.reranks else k
+        fetch = wanted
+        total = self._index.ntotal
+        while True:
+            distances, ids = self._index.search(query_vectors, min(fetch, total))
+            results = []
+            for row_ids, row_distances in zip(ids, distances):
+                hits = []
+                for chunk_id, distance in zip(row_ids, row_distances):
+                    if chunk_id < 0 or int(chunk_id) not in self._id_lookup:
+                        continue
+                    hit = self._hit(int(chunk_id), float(distance))
+                    if _matches(hit.metadata, filters):
+                        hits.append(hit)
+                    if len(hits) == wanted:
+                        break
+                results.append(hits)
+            if fetch >= total or all(len(hits) == wanted for hits in results):
+                if self.reranks:
+                    return [self._rerank(query, hits, k) for query, hits in zip(query_vectors, results)]
+                return results
+            fetch *= 4
+
+    def _rerank(self, query: np.ndarray, hits: List[ChunkHit], k: int) -> List[ChunkHit]:
+        # Distances from compressed codes are approximate; order the candidates by the exact vectors
+        if not hits:
+            return hits
+        vectors = np.vstack([
+            np.asarray(self._documents[hit.document_id].vectors[hit.chunk_index], dtype=np.float32)
+            for hit in hits
+        ])
+        exact = ((vectors - query) ** 2).sum(axis=1)
+        order = np.argsort(exact, kind="stable")[:k]
+        return [replace(hits[i], distance=float(exact[i])) for i in order]
+
+    def _hit(self, chunk_id: int, distance: float) -> ChunkHit:
+        document_id, position = self._id_lookup[chunk_id]
+        document = self._documents[document_id]
+        return ChunkHit(
+            document_id=document_id,
+            chunk_index=position,
+            text=document.text_chunks[position],
+            distance=distance,
+            metadata=document.metadata,
+        )
+
+    def _needs_rebuild(self, num_vectors: int) -> bool:
+        if (
+            self._index is None
+            or self._target_index_type(num_vectors) != self.index_type
+            or self._target_storage(num_vectors) != self.storage
+        ):
+            return True
+        trained = self.index_type == "ivf" or self.storage in ("sq8", "pq")
+        return trained and num_vectors > IVF_RETRAIN_GROWTH * self._trained_size
+
+    def _target_index_type(self, num_vectors: int) -> str:
+        if self.requested_index_type == "auto":
+            return choose_index_type(num_vectors, self.flat_max_vectors, self.hnsw_max_vectors)
+        if self.requested_index_type == "ivf" and num_vectors < IVF_MIN_TRAIN_VECTORS:
+            return "flat"
+        return self.requested_index_type
+
+    def _target_storage(self, num_vectors: int) -> str:
+        if self.requested_storage == "pq" and num_vectors < PQ_MIN_TRAIN_VECTORS:
+            return "sq8"
+        return self.requested_storage
+
+    def _rebuild(self, pending: Optional[_Document] = None):
+        # pending is a document being added that is not registered yet; the new index only replaces
+        # the current one once it has been built
+        documents = list(self._documents.values()) + ([pending] if pending is not None else [])
+        if documents:
+            ids = np.concatenate([d.ids for d in documents])
+            vectors = np.vstack([np.asarray(d.vectors, dtype=np.float32) for d in documents])
+        else:
+            ids = np.zeros(0, dtype=np.int64)
+            vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        if len(vectors) == 0:
+            # Nothing to train on yet; the first document triggers a proper build
+            index_type, storage = "flat", "float32"
+        else:
+            index_type, storage = self._target_index_type(len(vectors)), self._target_storage(len(vectors))
+        self._index = build_index(index_type, self.dimension, vectors, ids, storage)
+        self.index_type, self.storage = index_type, storage
+        self._tombstones = 0
+        self._trained_size = len(vectors)
+
+    def memory_report(self) -> dict:
+        # Bytes the faiss index holds in RAM; the exact vectors used for re-ranking stay memory-mapped
+        # from the index cache when the store was loaded from it
+        with self._lock:
+            index_bytes = faiss.serialize_index(self._index).nbytes if self._index is not None else 0
+            ntotal = self._index.ntotal if self._index is not None else 0
+            documents = list(self._documents.values())
+        float32_bytes = self.dimension * 4
+        per_vector = index_bytes / ntotal if ntotal else 0.0
+        return {
+            "storage": self.storage,
+            "index_type": self.index_type,
+            "rerank_factor": self.rerank_factor if self.reranks else 0,
+            "num_vectors": ntotal,
+            "index_bytes": index_bytes,
+            "index_bytes_per_vector": round(per_vector, 1),
+            "float32_bytes_per_vector": float32_bytes,
+            "compression": round(float32_bytes / per_vector, 2) if per_vector else None,
+            "exact_vectors_memory_mapped": bool(documents) and all(isinstance(d.vectors, np.memmap) for d in documents),
+        }
+
+
+def recall_latency_report(store: VectorStore, query_vectors: np.ndarray, k: int = 10) -> dict:
+    # Compares the store's current index against an exact flat index over the same vectors
+    query_vectors = np.ascontiguousarray(np.atleast_2d(query_vectors), dtype=np.float32)
+    with store._lock:
+        documents = list(store._documents.values())
+        baseline = build_index(
+            "flat",
+            store.dimension,
+            np.vstack([np.asarray(d.vectors, dtype=np.float32) for d in documents]),
+            np.concatenate([d.ids for d in documents]),
+        )
+
+    def timed_search(search):
+        latencies, results = [], []
+        for query in query_vectors:
+            started = time.perf_counter()
+            ids = search(query[None, :])
+            latencies.append((time.perf_counter() - started) * 1000)
+            results.append(ids)
+        return results, np.array(latencies)
+
+    approx, approx_ms = timed_search(
+        lambda q: {(hit.document_id, hit.chunk_index) for hit in store.search(q, k)[0]}
+    )
+    exact, exact_ms = timed_search(
+        lambda q: {store._id_lookup[int(i)] for i in baseline.search(q, k)[1][0] if i >= 0}
+    )
+
+    recall = [len(a & e) / len(e) for a, e in zip(approx, exact) if e]
+    return {
+        **store.memory_report(),
+        "num_vectors": len(store),
+        "k": k,
+        "queries": len(query_vectors),
+        "recall_at_k": float(np.mean(recall)) if recall else 1.0,
+        "index_latency_ms": {"p50": float(np.percentile(approx_ms, 50)), "p95": float(np.percentile(approx_ms, 95))},
+        "flat_latency_ms": {"p50": float(np.percentile(exact_ms, 50)), "p95": float(np.percentile(exact_ms, 95))},
+    }